@@ -0,0 +1,340 @@
+"""
+HTTP load test for /api/tasks/analyze/ and /api/tasks/suggest/.
+
+Runs against a live instance (--url) or starts one under gunicorn, as in the
+Procfile (--gunicorn, --workers). Reports throughput, latency percentiles and
+error rates per endpoint, strategy and payload size, as a table and as JSON.
+
+    python loadtest.py --gunicorn --workers 4 --concurrency 16 --duration 30 --output load.json
+    python loadtest.py --url http://127.0.0.1:8000 --sizes 10,100,1000 --strategies smart_balance=3,fastest_wins=1
+    python loadtest.py --url ... --baseline load.json   # exits 1 on a throughput or p95 regression
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from tasks.benchmarks.generators import WORKLOADS, payload
+
+PERCENTILES = (50, 95, 99)
+
+
+def weighted(value, option):
+    """Parses "a=3,b=1" (or "a,b", weight 1 each) into {name: weight}."""
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.strip().partition('=')
+        if not name:
+            continue
+        try:
+            weights[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise SystemExit(f"{option}: bad weight in {part!r}")
+    if not weights or any(weight < 0 for weight in weights.values()) or not sum(weights.values()):
+        raise SystemExit(f"{option} needs at least one name with a positive weight")
+    return weights
+
+
+class RequestBodies:
+    """
+    Pre-serialized task lists, one per payload size. By default every request
+    gets a unique first task title, so the analysis cache never answers it.
+    """
+
+    def __init__(self, workload, sizes, seed, cached):
+        self.cached = cached
+        self.bodies = {}
+        for size in sizes:
+            tasks = payload(WORKLOADS[workload](size, seed=seed))
+            self.bodies[size] = (tasks[0], json.dumps(tasks[1:], separators=(',', ':')))
+
+    def body(self, size, serial):
+        first, rest = self.bodies[size]
+        if not self.cached:
+            first = {**first, 'title': f"{first['title']} #{serial}"}
+        first = json.dumps(first, separators=(',', ':'))
+        return ('[' + first + (',' + rest[1:] if rest != '[]' else ']')).encode()
+
+
+class LoadGenerator:
+    def __init__(self, url, endpoints, strategies, sizes, bodies, concurrency, duration, requests, timeout, seed,
+                 keep_alive=False):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.endpoints, self.strategies, self.sizes = endpoints, strategies, sizes
+        self.bodies = bodies
+        self.concurrency, self.duration, self.requests, self.timeout = concurrency, duration, requests, timeout
+        self.seed = seed
+        # gunicorn's sync workers close every connection; so does the client unless asked not to
+        self.keep_alive = keep_alive
+        self.headers = {'Content-Type': 'application/json'}
+        if not keep_alive:
+            self.headers['Connection'] = 'close'
+
+        self.samples = []
+        self._lock = threading.Lock()
+        self._serial = 0
+
+    def _next_serial(self):
+        with self._lock:
+            if self.requests is not None and self._serial >= self.requests:
+                return None
+            self._serial += 1
+            return self._serial
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _worker(self, number, deadline):
+        rng = random.Random(self.seed * 1000 + number)
+        endpoints, endpoint_weights = list(self.endpoints), list(self.endpoints.values())
+        strategies, strategy_weights = list(self.strategies), list(self.strategies.values())
+        samples = []
+        connection = self._connect()
+        try:
+            while time.monotonic() < deadline:
+                serial = self._next_serial()
+                if serial is None:
+                    break
+                endpoint = rng.choices(endpoints, endpoint_weights)[0]
+                strategy = rng.choices(strategies, strategy_weights)[0] if endpoint == 'analyze' else 'smart_balance'
+                size = rng.choice(self.sizes)
+                path = f"/api/tasks/analyze/?strategy={strategy}" if endpoint == 'analyze' else "/api/tasks/suggest/"
+                body = self.bodies.body(size, serial)
+
+                error = None
+                start = time.perf_counter()
+                try:
+                    connection.request('POST', path, body=body, headers=self.headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                    if status >= 400:
+                        error = f"HTTP {status}"
+                    if not self.keep_alive:
+                        # Not every server says it closed; never send on a used connection
+                        connection.close()
+                except (OSError, http.client.HTTPException) as e:
+                    status = None
+                    error = type(e).__name__
+                    # The connection is in an unknown state; start a new one
+                    connection.close()
+                    connection = self._connect()
+                latency = time.perf_counter() - start
+                samples.append((endpoint, strategy, size, status, latency, error))
+        finally:
+            connection.close()
+        with self._lock:
+            self.samples.extend(samples)
+
+    def run(self):
+        deadline = time.monotonic() + (self.duration if self.duration else float('inf'))
+        threads = [threading.Thread(target=self._worker, args=(n, deadline)) for n in range(self.concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample[4] for sample in samples)
+    errors = {}
+    for sample in samples:
+        if sample[5] is not None:
+            errors[sample[5]] = errors.get(sample[5], 0) + 1
+    summary = {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(sum(errors.values()) / len(samples), 4) if samples else 0.0,
+        'errors': errors,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+    for p in PERCENTILES:
+        value = percentile(latencies, p)
+        summary[f'p{p}_ms'] = None if value is None else round(value * 1000, 2)
+    return summary
+
+
+def report(samples, elapsed):
+    groups = {}
+    for sample in samples:
+        groups.setdefault(f"{sample[0]}/{sample[1]}/{sample[2]}", []).append(sample)
+    return {
+        'overall': summarize(samples, elapsed),
+        'groups': {key: summarize(group, elapsed) for key, group in sorted(groups.items())},
+    }
+
+
+def regressions(baseline, result, threshold):
+    """
+    Groups that lost more than `threshold` of their throughput or whose p95 grew
+    by more, and any rise of the overall error rate.
+    """
+    found = []
+    before_groups = {'overall': baseline['overall'], **baseline['groups']}
+    after_groups = {'overall': result['overall'], **result['groups']}
+    for key, before in before_groups.items():
+        after = after_groups.get(key)
+        if after is None:
+            continue
+        if before['throughput_rps'] and after['throughput_rps'] < before['throughput_rps'] * (1 - threshold):
+            found.append(f"{key}: throughput {before['throughput_rps']} -> {after['throughput_rps']} req/s")
+        if before['p95_ms'] and after['p95_ms'] and after['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            found.append(f"{key}: p95 {before['p95_ms']} -> {after['p95_ms']} ms")
+    if result['overall']['error_rate'] > baseline['overall']['error_rate']:
+        found.append(f"error rate {baseline['overall']['error_rate']} -> {result['overall']['error_rate']}")
+    return found
+
+
+def print_table(result):
+    columns = ('requests', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'error_rate')
+    print(f"{'endpoint/strategy/size':<40}" + ''.join(f"{column:>15}" for column in columns))
+    for key, summary in [('overall', result['overall']), *result['groups'].items()]:
+        print(f"{key:<40}" + ''.join(f"{'-' if summary[c] is None else summary[c]:>15}" for c in columns))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workers, threads, timeout=30):
+    """Starts the app as the Procfile does, on a free local port; returns (process, url)."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'smart_task_analyzer.wsgi',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with code {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("gunicorn did not start listening in time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default='http://127.0.0.1:8000', help="Running instance to load (default %(default)s).")
+    target.add_argument('--gunicorn', action='store_true', help="Start the app under gunicorn for the run.")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes (with --gunicorn).")
+    parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker (with --gunicorn).")
+    parser.add_argument('--concurrency', '-c', type=int, default=8, help="Concurrent client connections.")
+    parser.add_argument('--duration', '-d', type=float, default=20.0, help="Seconds to run (0: until --requests).")
+    parser.add_argument('--requests', '-n', type=int, help="Stop after this many requests.")
+    parser.add_argument('--warmup', type=int, default=0, help="Untimed requests sent first.")
+    parser.add_argument('--endpoints', default='analyze=3,suggest=1', help="Endpoint mix, e.g. analyze=3,suggest=1.")
+    parser.add_argument('--strategies', default='smart_balance', help="Analyze strategy mix, e.g. smart_balance=3,fastest_wins=1.")
+    parser.add_argument('--sizes', default='10,100,1000', help="Tasks per request, picked uniformly.")
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), default='fan', help="Task graph shape.")
+    parser.add_argument('--cached', action='store_true', help="Send identical bodies, so analyze answers from cache.")
+    parser.add_argument('--keep-alive', action='store_true', help="Reuse connections between requests.")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-request timeout in seconds.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', '-o', help="Write the JSON report to this file.")
+    parser.add_argument('--json', action='store_true', help="Print the JSON report instead of the table.")
+    parser.add_argument('--baseline', help="Earlier JSON report; exit 1 when throughput or p95 regressed.")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold as a fraction.")
+    args = parser.parse_args(argv)
+
+    endpoints = weighted(args.endpoints, '--endpoints')
+    unknown = set(endpoints) - {'analyze', 'suggest'}
+    if unknown:
+        raise SystemExit(f"--endpoints: unknown endpoint {', '.join(sorted(unknown))}")
+    strategies = weighted(args.strategies, '--strategies')
+    try:
+        sizes = [int(size) for size in args.sizes.split(',')]
+    except ValueError:
+        raise SystemExit("--sizes must be a comma separated list of integers")
+    if any(size < 1 for size in sizes) or args.concurrency < 1:
+        raise SystemExit("--sizes and --concurrency must be positive")
+    if not args.duration and not args.requests:
+        raise SystemExit("Give a --duration or a --requests count")
+
+    bodies = RequestBodies(args.workload, sizes, args.seed, args.cached)
+    server = None
+    url = args.url
+    if args.gunicorn:
+        server, url = start_gunicorn(args.workers, args.threads)
+    try:
+        def generator(duration, requests):
+            return LoadGenerator(url, endpoints, strategies, sizes, bodies, args.concurrency,
+                                 duration, requests, args.timeout, args.seed, args.keep_alive)
+        if args.warmup:
+            generator(0, args.warmup).run()
+        load = generator(args.duration, args.requests)
+        elapsed = load.run()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    result = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'url': url,
+            'gunicorn_workers': args.workers if args.gunicorn else None,
+            'gunicorn_threads': args.threads if args.gunicorn else None,
+            'concurrency': args.concurrency,
+            'elapsed_s': round(elapsed, 3),
+            'endpoints': endpoints,
+            'strategies': strategies,
+            'sizes': sizes,
+            'workload': args.workload,
+            'cached': args.cached,
+            'keep_alive': args.keep_alive,
+            'python': platform.python_version(),
+        },
+        **report(load.samples, elapsed),
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_table(result)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            found = regressions(json.load(f), result, args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
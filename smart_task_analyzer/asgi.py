@@ -2,6 +2,9 @@
 ASGI config for smart_task_analyzer project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Served this way (e.g. ``uvicorn smart_task_analyzer.asgi:application``), the async
+endpoints under /api/async/ score large payloads in a process pool (SCORING_POOL
+in settings) without holding up other requests.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
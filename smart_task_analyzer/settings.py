@@ -114,3 +114,81 @@ if not DEBUG:
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# In-process LRU cache for /api/tasks/analyze/ results.
+# Set BACKEND to a CACHES alias to share entries between worker processes.
+ANALYSIS_CACHE = {
+    'MAX_ENTRIES': 256,
+    'MAX_BYTES': 64 * 1024 * 1024,
+    'TTL': 300,
+    'BACKEND': None,
+}
+
+# Per-stage timing of the analyze and suggest requests: sent as a Server-Timing
+# header and aggregated into histograms served at /api/metrics/ (Prometheus format).
+# Set PROFILE_DIR to a directory to let ?profile=1 save a cProfile of that request there.
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'PROFILE_DIR': None,
+}
+
+# Process pool of the async analyze/suggest views (/api/async/..., served through asgi.py).
+# Bodies up to INLINE_MAX_BYTES are scored in the request; larger ones go to WORKERS
+# processes. Beyond MAX_PENDING queued or running jobs, requests get 429.
+SCORING_POOL = {
+    'WORKERS': 2,
+    'MAX_PENDING': 8,
+    'INLINE_MAX_BYTES': 128 * 1024,
+    'START_METHOD': 'spawn',
+}
+
+# Analysis per cluster of dependent tasks (weakly connected component) for analyze and
+# suggest requests of MIN_TASKS tasks or more. Off by default: with WORKERS > 1 clusters
+# are ranked in that many processes; with CACHE_MAX_ENTRIES > 0 the rankings of unchanged
+# clusters are reused, which pays off on large backlogs where one cluster changes at a time.
+COMPONENT_ANALYSIS = {
+    'WORKERS': 0,
+    'MIN_TASKS': 2000,
+    'CACHE_MAX_ENTRIES': 0,
+    'CACHE_MAX_BYTES': 64 * 1024 * 1024,
+    'CACHE_TTL': 300,
+    'START_METHOD': 'spawn',
+}
+
+# Analysis sessions (/api/tasks/sessions/): task lists kept in memory and patched in place.
+# Sessions live in the process that created them, so run one server process (with threads)
+# or route each session to its process. The least recently used sessions are evicted beyond
+# MAX_SESSIONS sessions or MAX_TASKS tasks in all; sessions unused for TTL seconds expire.
+ANALYSIS_SESSIONS = {
+    'MAX_SESSIONS': 256,
+    'MAX_TASKS': 500_000,
+    'TTL': 3600,
+}
+
+# Bulk task import (/api/tasks/import/): rows per INSERT, and the largest list one import takes
+TASK_IMPORT = {
+    'BATCH_SIZE': 1000,
+    'MAX_TASKS': 100_000,
+}
+
+# SmartBalance weight sensitivity analysis (/api/tasks/sensitivity/, needs NumPy): the most
+# weightings one request ranks, and the length of the reference ranking's head that Kendall
+# tau is measured over (tau compares every pair of those tasks).
+WEIGHT_SENSITIVITY = {
+    'MAX_WEIGHTINGS': 1000,
+    'TAU_TASKS': 300,
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_PARSER_CLASSES': [
+        'tasks.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Parse request bodies and render scored results with orjson (pip install orjson) instead
+# of the standard library json module. Responses are byte for byte the same; without
+# orjson installed the setting has no effect.
+FAST_JSON_CODEC = False
@@ -0,0 +1,188 @@
+import hashlib
+import json
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import JSONRenderer
+
+from .models import Task
+from .scoring_jobs import analyze_job, suggest_job, validate_job
+from .serializers import AnalysisResultSerializer, DailyPlanSerializer
+from .services.analyze_tasks import PlanTasksUseCase
+from .services.request_metrics import NULL_TIMER, StageTimer, get_request_metrics
+from .services.result_cache import analysis_cache_key, etag_for, etag_matches, get_analysis_cache
+from .services.scoring_pool import PoolFull, get_scoring_pool
+from .services.task_scores import SuggestStoredTasksUseCase
+from .views import requested_hours, requested_limit, requested_strategies
+
+# Bodies up to this size are scored in the request, larger ones in the ScoringPool
+DEFAULT_INLINE_MAX_BYTES = 128 * 1024
+
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+
+def _json_response(data, status=200, headers=None):
+    content = data if isinstance(data, bytes) else JSONRenderer().render(data)
+    return HttpResponse(content, status=status, content_type='application/json', headers=headers)
+
+
+def _is_empty_payload(body):
+    # Like `if request.data` in SuggestTasksView: no body, [], {} or null
+    if len(body) > 16:
+        return False
+    try:
+        return not json.loads(body)
+    except ValueError:
+        return False
+
+
+def _too_many_jobs():
+    return _json_response(
+        {"error": "Too many analysis jobs in progress, retry later"},
+        status=429, headers={'Retry-After': '1'},
+    )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncScoringView(View):
+    """
+    Async counterparts of the DRF views, for ASGI servers (smart_task_analyzer/asgi.py).
+
+    Small bodies are scored inline. Larger ones are parsed, validated, scored and
+    rendered in the ScoringPool, so a huge analysis never holds up the event
+    loop. A full pool answers 429 with Retry-After, and a client that
+    disconnects cancels its job. Responses carry Server-Timing like the DRF views.
+    """
+    http_method_names = ['post', 'options']
+    metrics_endpoint = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        metrics = get_request_metrics()
+        if not metrics.enabled:
+            self.timer = NULL_TIMER
+            return await super().dispatch(request, *args, **kwargs)
+
+        self.timer = timer = StageTimer(self.metrics_endpoint)
+        with timer.stage('total'):
+            response = await super().dispatch(request, *args, **kwargs)
+        response['Server-Timing'] = timer.server_timing()
+        metrics.record(timer)
+        return response
+
+    def json_body(self, request):
+        """
+        The raw JSON body (b'' when there is none), or None for a non-JSON body.
+        An empty form is accepted, as it is by the DRF views.
+        """
+        if not request.body or request.content_type == 'application/json':
+            return request.body
+        if request.content_type in FORM_CONTENT_TYPES and not request.POST and not request.FILES:
+            # DRF reads an empty form as an empty task list
+            return b'[]'
+        return None
+
+    def unsupported_media_type(self, request):
+        return _json_response(
+            {'detail': f'Unsupported media type "{request.content_type}" in request.'}, status=415
+        )
+
+    async def run_job(self, body, job, *args):
+        """Runs job(body, *args), inline or in the pool; returns (status, content)."""
+        inline_max_bytes = getattr(settings, 'SCORING_POOL', {}).get('INLINE_MAX_BYTES', DEFAULT_INLINE_MAX_BYTES)
+        if len(body) <= inline_max_bytes:
+            status, content, job_timer = job(body, *args)
+        else:
+            with self.timer.stage('pool'):
+                status, content, job_timer = await get_scoring_pool().run(job, body, *args)
+        self.timer.merge(job_timer.stages)
+        if job_timer.size:
+            self.timer.size = job_timer.size
+        return status, content
+
+
+class AsyncAnalyzeTasksView(AsyncScoringView):
+    metrics_endpoint = 'analyze_async'
+
+    async def post(self, request):
+        body = self.json_body(request)
+        if body is None:
+            return self.unsupported_media_type(request)
+        try:
+            strategy_names, multiple = requested_strategies(request.GET)
+        except ValueError as e:
+            # Like the DRF view, invalid tasks are reported before an invalid strategy
+            try:
+                status, data = await self.run_job(body, validate_job)
+            except PoolFull:
+                return _too_many_jobs()
+            return _json_response(data if status != 200 else {"error": str(e)}, status=400)
+        # In one order, so that a set of strategies makes one metrics series
+        self.timer.label(strategy=','.join(sorted(strategy_names)))
+
+        # Keyed by the raw body: the payload is only parsed if the cache misses
+        today = date.today()
+        with self.timer.stage('cache'):
+            cache_key = analysis_cache_key(
+                hashlib.sha256(body).hexdigest(),
+                strategy_names if multiple else strategy_names[0], None, today,
+            )
+            etag = etag_for(cache_key)
+            if etag_matches(request.headers.get('If-None-Match'), etag):
+                return HttpResponseNotModified(headers={'ETag': etag})
+            cache = get_analysis_cache()
+            data = cache.get(cache_key)
+        if data is not None:
+            return _json_response(data, headers={'ETag': etag, 'X-Cache': 'HIT'})
+
+        try:
+            status, data = await self.run_job(body, analyze_job, strategy_names, multiple, today)
+        except PoolFull:
+            return _too_many_jobs()
+        if status != 200:
+            return _json_response(data, status=status)
+        cache.set(cache_key, data)
+        return _json_response(data, headers={'ETag': etag, 'X-Cache': 'MISS'})
+
+
+class AsyncSuggestTasksView(AsyncScoringView):
+    metrics_endpoint = 'suggest_async'
+
+    async def post(self, request):
+        body = self.json_body(request)
+        if body is None:
+            return self.unsupported_media_type(request)
+        try:
+            limit = requested_limit(request.GET)
+            hours = requested_hours(request.GET)
+        except ValueError as e:
+            return _json_response({"error": str(e)}, status=400)
+        self.timer.label(strategy='smart_balance')
+
+        if _is_empty_payload(body):
+            # Stored tasks: answered from the database, in a worker thread
+            return _json_response(await sync_to_async(self._stored_suggestions)(limit, hours))
+
+        try:
+            status, data = await self.run_job(body, suggest_job, limit, hours, date.today())
+        except PoolFull:
+            return _too_many_jobs()
+        return _json_response(data, status=status)
+
+    def _stored_suggestions(self, limit, hours):
+        if hours is not None:
+            with self.timer.stage('query'):
+                tasks = Task.objects.task_dicts()
+            self.timer.label(task_count=len(tasks))
+            plan = PlanTasksUseCase().execute(tasks, hours, timer=self.timer)
+            with self.timer.stage('serialize'):
+                return DailyPlanSerializer(plan).data
+
+        with self.timer.stage('query'):
+            results = SuggestStoredTasksUseCase().execute(limit=limit)
+        with self.timer.stage('serialize'):
+            return AnalysisResultSerializer(results, many=True).data
@@ -0,0 +1,2 @@
+# Performance benchmarks: seeded task graph generators and per-layer timings.
+# Run with `python manage.py benchmark`, compare runs with `python manage.py benchmark_compare`.
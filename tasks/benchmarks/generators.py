@@ -0,0 +1,126 @@
+import random
+from datetime import date, timedelta
+
+# Every workload is dated from the same day so that runs are comparable
+BENCHMARK_TODAY = date(2026, 1, 15)
+
+HOURS = (0.5, 1, 1, 2, 2, 3, 4, 5, 8, 13)
+
+
+def _task(rng, t_id, dependencies, due_date):
+    return {
+        'id': t_id,
+        'title': f"Task {t_id}",
+        'due_date': due_date,
+        'estimated_hours': float(rng.choice(HOURS)),
+        'importance': rng.randint(1, 10),
+        'dependencies': dependencies,
+    }
+
+
+def _due_date(rng, today):
+    # A fifth without due date, the rest from a month overdue to two months out
+    if rng.random() < 0.2:
+        return None
+    return today + timedelta(days=rng.randint(-30, 60))
+
+
+def chain_tasks(n, seed=0, today=BENCHMARK_TODAY):
+    """One long chain: every task depends on the one before it."""
+    rng = random.Random(seed)
+    return [_task(rng, i, [i - 1] if i > 1 else [], _due_date(rng, today)) for i in range(1, n + 1)]
+
+
+def fan_tasks(n, seed=0, today=BENCHMARK_TODAY):
+    """
+    Wide layered DAG: each task depends on up to three tasks of the layer
+    before (fan-in), and half of them also on one of a few hub tasks that
+    most of the graph waits for (fan-out).
+    """
+    rng = random.Random(seed)
+    width = max(1, int(n ** 0.5))
+    hubs = list(range(1, max(1, n // 100) + 1))
+    tasks = []
+    for i in range(1, n + 1):
+        dependencies = []
+        layer_start = ((i - 1) // width) * width + 1
+        if layer_start > width:
+            previous = range(layer_start - width, layer_start)
+            dependencies = rng.sample(previous, min(len(previous), rng.randint(1, 3)))
+        if i > len(hubs) and rng.random() < 0.5:
+            hub = rng.choice(hubs)
+            if hub not in dependencies:
+                dependencies.append(hub)
+        tasks.append(_task(rng, i, dependencies, _due_date(rng, today)))
+    return tasks
+
+
+def cyclic_tasks(n, seed=0, today=BENCHMARK_TODAY):
+    """Random DAG on earlier tasks, with back edges closing cycles on 5% of tasks."""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(1, n + 1):
+        dependencies = rng.sample(range(1, i), min(i - 1, rng.randint(0, 3)))
+        roll = rng.random()
+        if roll < 0.05 and i < n:
+            dependencies.append(rng.randint(i + 1, min(n, i + 50)))
+        elif roll < 0.055:
+            dependencies.append(i)
+        tasks.append(_task(rng, i, dependencies, _due_date(rng, today)))
+    return tasks
+
+
+def mixed_date_tasks(n, seed=0, today=BENCHMARK_TODAY):
+    """
+    Shallow random dependencies and every kind of due date: dates, ISO strings,
+    missing and invalid ones. Views and serializers reject the invalid ones,
+    so those layers measure the validation error path on this workload.
+    """
+    rng = random.Random(seed)
+    invalid = ('2025-02-30', 'soon', '2025-13-01', '')
+    tasks = []
+    for i in range(1, n + 1):
+        dependencies = rng.sample(range(max(1, i - 20), i), min(i - 1, rng.randint(0, 2)))
+        due_date = _due_date(rng, today)
+        roll = rng.random()
+        if due_date is not None and roll < 0.4:
+            due_date = due_date.isoformat()
+        elif roll < 0.5:
+            due_date = rng.choice(invalid)
+        tasks.append(_task(rng, i, dependencies, due_date))
+    return tasks
+
+
+def clustered_tasks(n, seed=0, today=BENCHMARK_TODAY, cluster_size=50):
+    """
+    Many independent projects: clusters of about cluster_size tasks shaped like
+    cyclic_tasks, with no dependency between clusters, interleaved in the list.
+    """
+    rng = random.Random(seed)
+    tasks = []
+    for offset in range(0, n, cluster_size):
+        size = min(cluster_size, n - offset)
+        for task in cyclic_tasks(size, seed=rng.randrange(2 ** 32), today=today):
+            task['id'] += offset
+            task['title'] = f"Task {task['id']}"
+            task['dependencies'] = [dependency + offset for dependency in task['dependencies']]
+            tasks.append(task)
+    rng.shuffle(tasks)
+    return tasks
+
+
+WORKLOADS = {
+    'chain': chain_tasks,
+    'fan': fan_tasks,
+    'cycles': cyclic_tasks,
+    'mixed_dates': mixed_date_tasks,
+    'clusters': clustered_tasks,
+}
+
+
+def payload(tasks):
+    """The tasks as a JSON-ready request body."""
+    return [
+        {**task, 'due_date': task['due_date'].isoformat()} if isinstance(task['due_date'], date) else dict(task)
+        for task in tasks
+    ]
@@ -0,0 +1,58 @@
+import json
+import platform
+import sys
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from tasks.domain import batch_scoring
+
+# One benchmark in both runs, or in only one of them (the other time is None)
+Comparison = namedtuple('Comparison', ['key', 'base', 'new', 'ratio', 'status'])
+
+
+def environment():
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': batch_scoring.is_available(),
+    }
+
+
+def save_results(path, results, **meta):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': {**environment(), **meta}, 'results': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(base, new, threshold=0.10, min_delta=0.0005, stat='median'):
+    """
+    Compares two saved runs benchmark by benchmark. A benchmark regressed when
+    it got slower by more than `threshold` (a fraction) and by more than
+    min_delta seconds, so that timer noise on tiny benchmarks is not flagged.
+    """
+    base_results, new_results = base['results'], new['results']
+    comparisons = []
+    for key in sorted(base_results.keys() | new_results.keys()):
+        if key not in new_results:
+            comparisons.append(Comparison(key, base_results[key][stat], None, None, 'missing'))
+            continue
+        if key not in base_results:
+            comparisons.append(Comparison(key, None, new_results[key][stat], None, 'new'))
+            continue
+
+        before, after = base_results[key][stat], new_results[key][stat]
+        ratio = after / before if before else float('inf')
+        status = 'ok'
+        if abs(after - before) > min_delta:
+            if ratio > 1 + threshold:
+                status = 'regression'
+            elif ratio < 1 / (1 + threshold):
+                status = 'improvement'
+        comparisons.append(Comparison(key, before, after, ratio, status))
+    return comparisons
@@ -0,0 +1,208 @@
+import gc
+import io
+import json
+import statistics
+import time
+from collections import namedtuple
+
+from django.test import override_settings
+
+from tasks.domain.dependency_graph import (
+    ReachabilityIndex,
+    build_dependency_graph,
+    calculate_dependents_count,
+    detect_cycles,
+)
+from tasks.domain import batch_scoring
+from tasks.domain.dependency_index import DependencyIndex
+from tasks.parsers import FastJSONParser
+from tasks.renderers import OrjsonScoredTaskEncoder, ScoredTaskJSONRenderer, orjson
+from tasks.serializers import AnalysisResultSerializer, task_list_validator
+from tasks.services.analyze_tasks import STRATEGIES, AnalyzeTasksUseCase, PlanTasksUseCase
+from tasks.services.partitioned_analysis import ComponentPartitioner
+from tasks.services.result_cache import AnalysisResultCache, get_analysis_cache
+from tasks.services.weight_sensitivity import WeightSensitivityUseCase
+
+from .generators import BENCHMARK_TODAY, WORKLOADS, payload
+
+LAYERS = ('strategies', 'dependency_graph', 'use_case', 'serializers', 'views')
+
+# prepare(tasks) runs untimed before every repetition and returns the callable to time
+Benchmark = namedtuple('Benchmark', ['layer', 'name', 'prepare'])
+
+
+def _copies(tasks):
+    # For code that writes into the task dicts (calculate_dependents_count)
+    return [dict(task) for task in tasks]
+
+
+def _strategy_benchmarks():
+    for name, strategy in STRATEGIES.items():
+        yield Benchmark(
+            'strategies', name,
+            lambda tasks, strategy=strategy: lambda: strategy.rank_tasks(tasks, today=BENCHMARK_TODAY),
+        )
+
+
+def _dependency_graph_benchmarks():
+    def detect(tasks):
+        graph = build_dependency_graph(tasks)
+        return lambda: detect_cycles(graph)
+
+    def dependents(tasks):
+        copies = _copies(tasks)
+        return lambda: calculate_dependents_count(copies)
+
+    yield Benchmark('dependency_graph', 'build_dependency_graph', lambda tasks: lambda: build_dependency_graph(tasks))
+    yield Benchmark('dependency_graph', 'detect_cycles', detect)
+    yield Benchmark('dependency_graph', 'calculate_dependents_count', dependents)
+    yield Benchmark('dependency_graph', 'dependency_index', lambda tasks: lambda: DependencyIndex.from_tasks(tasks))
+    yield Benchmark('dependency_graph', 'reachability_index', lambda tasks: lambda: ReachabilityIndex.from_tasks(tasks))
+
+
+def _use_case_benchmarks():
+    use_case = AnalyzeTasksUseCase()
+
+    def execute(tasks):
+        copies = _copies(tasks)
+        return lambda: use_case.execute(copies, today=BENCHMARK_TODAY)
+
+    def rank_per_cluster(tasks):
+        # Ranked per cluster, every cluster answered from a warm cache
+        partitioned = AnalyzeTasksUseCase(partitioner=ComponentPartitioner(min_tasks=0, cache=AnalysisResultCache()))
+        partitioned.rank(tasks, today=BENCHMARK_TODAY)
+        return lambda: partitioned.rank(tasks, today=BENCHMARK_TODAY)
+
+    yield Benchmark('use_case', 'execute', execute)
+    yield Benchmark('use_case', 'rank', lambda tasks: lambda: use_case.rank(tasks, today=BENCHMARK_TODAY))
+    yield Benchmark(
+        'use_case', 'rank_many',
+        lambda tasks: lambda: use_case.rank_many(tasks, list(STRATEGIES), today=BENCHMARK_TODAY),
+    )
+    yield Benchmark('use_case', 'rank_per_cluster', rank_per_cluster)
+    yield Benchmark(
+        'use_case', 'plan_8h',
+        lambda tasks: lambda: PlanTasksUseCase().execute(tasks, 8, today=BENCHMARK_TODAY),
+    )
+    yield Benchmark(
+        'use_case', 'forecast_30d',
+        lambda tasks: lambda: use_case.forecast(tasks, start=BENCHMARK_TODAY, days=30),
+    )
+    if batch_scoring.is_available():
+        # 5 x 5 x 4 = 100 SmartBalance weightings
+        grid = {'urgency': [0.1, 0.2, 0.3, 0.4, 0.5], 'importance': [0.1, 0.2, 0.3, 0.4, 0.5], 'effort': [0.0, 0.1, 0.2, 0.3]}
+        yield Benchmark(
+            'use_case', 'weight_sensitivity_100',
+            lambda tasks: lambda: WeightSensitivityUseCase().execute(tasks, grid=grid, today=BENCHMARK_TODAY),
+        )
+
+
+def _serializer_benchmarks():
+    use_case = AnalyzeTasksUseCase()
+
+    def validate(tasks):
+        data = payload(tasks)
+        return lambda: task_list_validator(data).is_valid()
+
+    def serialize(tasks):
+        results = use_case.execute(_copies(tasks), today=BENCHMARK_TODAY)
+        return lambda: AnalysisResultSerializer(results, many=True).data
+
+    def render(tasks):
+        records = use_case.rank(tasks, today=BENCHMARK_TODAY)
+        return lambda: ScoredTaskJSONRenderer.render_records(records)
+
+    def render_orjson(tasks):
+        records = use_case.rank(tasks, today=BENCHMARK_TODAY)
+        return lambda: OrjsonScoredTaskEncoder().encode_list(records)
+
+    def parse(fast):
+        def prepare(tasks):
+            body = json.dumps(payload(tasks)).encode()
+
+            def run():
+                with override_settings(FAST_JSON_CODEC=fast):
+                    return FastJSONParser().parse(io.BytesIO(body), 'application/json', {})
+            return run
+        return prepare
+
+    yield Benchmark('serializers', 'task_input', validate)
+    yield Benchmark('serializers', 'analysis_result', serialize)
+    yield Benchmark('serializers', 'render_records', render)
+    yield Benchmark('serializers', 'parse_json', parse(False))
+    if orjson is not None:
+        yield Benchmark('serializers', 'render_records_orjson', render_orjson)
+        yield Benchmark('serializers', 'parse_json_orjson', parse(True))
+
+
+def _view_benchmarks():
+    from django.test import Client
+
+    client = Client()
+
+    def post(path, clear_cache=False):
+        def prepare(tasks):
+            body = json.dumps(payload(tasks))
+            if clear_cache:
+                get_analysis_cache().clear()
+            return lambda: client.post(path, body, content_type='application/json')
+        return prepare
+
+    yield Benchmark('views', 'analyze', post('/api/tasks/analyze/', clear_cache=True))
+    yield Benchmark('views', 'analyze_cached', post('/api/tasks/analyze/'))
+    yield Benchmark('views', 'suggest', post('/api/tasks/suggest/'))
+    yield Benchmark('views', 'suggest_plan_8h', post('/api/tasks/suggest/?hours=8'))
+
+
+_SUITES = {
+    'strategies': _strategy_benchmarks,
+    'dependency_graph': _dependency_graph_benchmarks,
+    'use_case': _use_case_benchmarks,
+    'serializers': _serializer_benchmarks,
+    'views': _view_benchmarks,
+}
+
+
+def measure(prepare, tasks, repeat):
+    """Seconds taken by each of `repeat` runs, garbage collection paused while timing."""
+    timings = []
+    for _ in range(repeat):
+        func = prepare(tasks)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return timings
+
+
+def run_benchmarks(layers=LAYERS, workloads=tuple(WORKLOADS), sizes=(1000, 10000), repeat=5, seed=0, progress=None):
+    """
+    Times every benchmark of `layers` on every workload and size, returning
+    {key: result} with key "layer.name/workload/size". progress(key, result)
+    is called after each benchmark.
+    """
+    benchmarks = [benchmark for layer in layers for benchmark in _SUITES[layer]()]
+    results = {}
+    for workload in workloads:
+        for size in sizes:
+            tasks = WORKLOADS[workload](size, seed=seed)
+            for benchmark in benchmarks:
+                timings = measure(benchmark.prepare, tasks, repeat)
+                key = f"{benchmark.layer}.{benchmark.name}/{workload}/{size}"
+                results[key] = {
+                    'layer': benchmark.layer,
+                    'name': benchmark.name,
+                    'workload': workload,
+                    'size': size,
+                    'repeat': repeat,
+                    'min': min(timings),
+                    'median': statistics.median(timings),
+                    'mean': statistics.fmean(timings),
+                }
+                if progress is not None:
+                    progress(key, results[key])
+    return results
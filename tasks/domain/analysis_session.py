@@ -0,0 +1,281 @@
+from bisect import bisect_left, insort
+
+from .dependency_index import DependencyIndex, dependency_id
+
+
+class AnalysisSession:
+    """
+    One task list kept across requests and ranked again after every patch.
+
+    Holds the tasks by id, in list order, the dependents of every id, the cycle
+    groups and a sorted score index of (-score, order, id) entries. A patch
+    rescores only the tasks it changes and those whose dependents count it
+    changes, and updates the cycle groups around the edges it adds or removes.
+    ranked() is always what AnalyzeTasksUseCase.rank() returns for the whole
+    list; strategies that are not TASK_LOCAL are ranked again in full instead.
+    Every task needs a unique id.
+    """
+
+    # A patch touching more than this share of the tasks ranks them all again
+    REBUILD_FRACTION = 0.25
+
+    def __init__(self, tasks, strategy, today):
+        self.strategy = strategy
+        self.today = today
+
+        self.tasks = {}
+        self._order = {}
+        self._next_order = 0
+        # Dependent task ids of every id, with multiplicity: {id: {dependent_id: count}}
+        self._dependents = {}
+        self._dependents_count = {}
+        for task in tasks:
+            t_id = task.get('id')
+            if t_id is None:
+                raise ValueError("Session tasks need an id")
+            if t_id in self.tasks:
+                raise ValueError(f"Duplicate task id: {t_id}")
+            self._insert(t_id, task)
+            for dep in _dependency_ids(task):
+                self._link(t_id, dep)
+
+        self._rebuild()
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def refresh(self, today):
+        # Due dates score against today: a new day ranks everything again
+        if today != self.today:
+            self.today = today
+            self._rebuild()
+
+    def ranked(self, limit=None):
+        """ScoredTask records in rank order, the first `limit` of them when given."""
+        entries = self._ranking if limit is None else self._ranking[:limit]
+        records = []
+        for _, _, t_id in entries:
+            record = self._records[t_id]
+            record.has_cycle = t_id in self._cycle_of
+            records.append(record)
+        return records
+
+    def apply(self, add=(), update=(), remove=(), add_dependencies=(), remove_dependencies=()):
+        """
+        Applies one patch, in this order: remove task ids, add tasks, replace tasks
+        (same id), add and remove (task_id, dependency_id) edges. Tasks are
+        validated dicts. Raises ValueError, with the session unchanged, when the
+        patch does not fit the session.
+        """
+        removed = set()
+        for t_id in remove:
+            if t_id not in self.tasks or t_id in removed:
+                raise ValueError(f"Unknown task id: {t_id}")
+            removed.add(t_id)
+
+        # Final version of every task the patch adds or changes
+        changed = {}
+        for task in add:
+            t_id = task.get('id')
+            if t_id is None:
+                raise ValueError("Session tasks need an id")
+            if (t_id in self.tasks and t_id not in removed) or t_id in changed:
+                raise ValueError(f"Duplicate task id: {t_id}")
+            changed[t_id] = dict(task)
+        for task in update:
+            t_id = task.get('id')
+            if t_id not in self.tasks or t_id in removed or t_id in changed:
+                raise ValueError(f"Unknown task id: {t_id}")
+            changed[t_id] = dict(task)
+        for t_id, dep in add_dependencies:
+            task = self._patched(t_id, changed, removed)
+            task['dependencies'] = [*task.get('dependencies', []), dep]
+        for t_id, dep in remove_dependencies:
+            task = self._patched(t_id, changed, removed)
+            dependencies = list(task.get('dependencies', []))
+            if dep not in dependencies:
+                raise ValueError(f"Task {t_id} does not depend on {dep}")
+            dependencies.remove(dep)
+            task['dependencies'] = dependencies
+
+        affected = set()
+        for t_id in removed:
+            self._remove(t_id, affected)
+        for t_id, task in changed.items():
+            self._set(t_id, task, affected)
+
+        affected &= self.tasks.keys()
+        if not self.strategy.TASK_LOCAL or len(affected) > self.REBUILD_FRACTION * len(self.tasks):
+            self._rebuild()
+        else:
+            self._rescore(affected)
+
+    def _patched(self, t_id, changed, removed):
+        task = changed.get(t_id)
+        if task is None:
+            if t_id not in self.tasks or t_id in removed:
+                raise ValueError(f"Unknown task id: {t_id}")
+            task = changed[t_id] = dict(self.tasks[t_id])
+        return task
+
+    # Tasks and edges
+
+    def _insert(self, t_id, task):
+        self.tasks[t_id] = task
+        self._order[t_id] = self._next_order
+        self._next_order += 1
+
+    def _link(self, t_id, dep):
+        dependents = self._dependents.setdefault(dep, {})
+        dependents[t_id] = dependents.get(t_id, 0) + 1
+        self._dependents_count[dep] = self._dependents_count.get(dep, 0) + 1
+
+    def _unlink(self, t_id, dep):
+        dependents = self._dependents[dep]
+        dependents[t_id] -= 1
+        if not dependents[t_id]:
+            del dependents[t_id]
+        self._dependents_count[dep] -= 1
+
+    def _set(self, t_id, task, affected):
+        old = self.tasks.get(t_id)
+        affected.add(t_id)
+        if old is None:
+            self._insert(t_id, task)
+            dependencies = _dependency_ids(task)
+            for dep in dependencies:
+                self._link(t_id, dep)
+                affected.add(dep)
+            # Edges to and from the new task become live
+            for dep in set(dependencies):
+                if dep in self.tasks:
+                    self._edge_added(t_id, dep)
+            for dependent in list(self._dependents.get(t_id, ())):
+                if dependent != t_id:
+                    self._edge_added(dependent, t_id)
+            return
+
+        self.tasks[t_id] = task
+        before = _dependency_ids(old)
+        after = _dependency_ids(task)
+        for dep in before:
+            self._unlink(t_id, dep)
+            affected.add(dep)
+        for dep in after:
+            self._link(t_id, dep)
+            affected.add(dep)
+        before, after = set(before), set(after)
+        for dep in before - after:
+            if dep in self.tasks:
+                self._edge_removed(t_id, dep)
+        for dep in after - before:
+            if dep in self.tasks:
+                self._edge_added(t_id, dep)
+
+    def _remove(self, t_id, affected):
+        self._drop_entry(t_id)
+        task = self.tasks.pop(t_id)
+        del self._order[t_id]
+        del self._records[t_id]
+        for dep in _dependency_ids(task):
+            self._unlink(t_id, dep)
+            affected.add(dep)
+        # Dependents keep their dependency on the id; it is dropped until the id comes back
+        group = self._cycle_of.get(t_id)
+        if group is not None:
+            self._split(group - {t_id})
+            self._cycle_of.pop(t_id, None)
+
+    # Cycle groups: strongly connected components with several tasks, or a task that depends on itself
+
+    def _edge_added(self, t_id, dep):
+        group = self._cycle_of.get(t_id)
+        if group is not None and dep in group:
+            return
+        if t_id == dep:
+            self._cycle_of[t_id] = frozenset((t_id,))
+            return
+        # t_id -> dep closes a cycle when dep reaches t_id; the new group is
+        # everything on the way: reachable from dep and reaching t_id
+        reachable = self._reachable(dep, self._live_dependencies)
+        if t_id not in reachable:
+            return
+        group = frozenset(reachable & self._reachable(t_id, self._live_dependents))
+        for member in group:
+            self._cycle_of[member] = group
+
+    def _edge_removed(self, t_id, dep):
+        # Only an edge inside a cycle group can break it, into groups of its own members
+        group = self._cycle_of.get(t_id)
+        if group is not None and dep in group:
+            self._split(group)
+
+    def _split(self, members):
+        for member in members:
+            del self._cycle_of[member]
+        graph = {
+            member: [dep for dep in _dependency_ids(self.tasks[member]) if dep in members]
+            for member in members
+        }
+        for cycle in DependencyIndex.from_graph(graph).find_cycle_ids():
+            group = frozenset(cycle)
+            for member in group:
+                self._cycle_of[member] = group
+
+    def _live_dependencies(self, t_id):
+        return [dep for dep in _dependency_ids(self.tasks[t_id]) if dep in self.tasks]
+
+    def _live_dependents(self, t_id):
+        return self._dependents.get(t_id, ())
+
+    @staticmethod
+    def _reachable(start, neighbors):
+        seen = {start}
+        stack = [start]
+        while stack:
+            for other in neighbors(stack.pop()):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        return seen
+
+    # Score index
+
+    def _drop_entry(self, t_id):
+        record = self._records.get(t_id)
+        if record is not None:
+            entry = (-record.score, self._order[t_id], t_id)
+            del self._ranking[bisect_left(self._ranking, entry)]
+
+    def _rescore(self, t_ids):
+        t_ids = list(t_ids)
+        # Scored alone, with the dependents count SmartBalance would read from a DependencyIndex
+        scored = [{**self.tasks[t_id], 'dependents_count': self._dependents_count.get(t_id, 0)} for t_id in t_ids]
+        records = self.strategy.evaluate_tasks(scored, today=self.today)
+        for t_id, record in zip(t_ids, records):
+            if t_id in self._records:
+                self._drop_entry(t_id)
+            record.task = self.tasks[t_id]
+            self._records[t_id] = record
+            insort(self._ranking, (-record.score, self._order[t_id], t_id))
+
+    def _rebuild(self):
+        tasks = list(self.tasks.values())
+        t_ids = list(self.tasks)
+        index = DependencyIndex.from_tasks(tasks)
+        records = self.strategy.rank_tasks(tasks, today=self.today, index=index)
+
+        self._records = {t_ids[record.position]: record for record in records}
+        self._ranking = [
+            (-record.score, self._order[t_ids[record.position]], t_ids[record.position])
+            for record in records
+        ]
+        self._cycle_of = {}
+        for cycle in index.find_cycle_ids():
+            group = frozenset(cycle)
+            for member in group:
+                self._cycle_of[member] = group
+
+
+def _dependency_ids(task):
+    return [dependency_id(dep) for dep in task.get('dependencies', []) or []]
@@ -0,0 +1,186 @@
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; strategies fall back to the per-task loop
+    np = None
+
+from .scored_task import ScoredTask
+from .scoring_config import BATCH_SCORING_MIN_TASKS
+
+# Due date states
+DUE_MISSING = 0
+DUE_VALID = 1
+DUE_INVALID = 2
+
+PRIORITY_LABELS = ("Low", "Medium", "High")
+
+
+def is_available():
+    return np is not None
+
+
+def should_use_batch(tasks):
+    if not is_available():
+        return False
+    try:
+        return len(tasks) >= BATCH_SCORING_MIN_TASKS
+    except TypeError:
+        return False
+
+
+class TaskColumns:
+    """
+    Column-oriented view of a task list, built once per scoring call.
+
+    Due dates are resolved to day offsets from `today` with a per-value cache,
+    so repeated dates (the common case in real backlogs) are parsed only once.
+    """
+
+    def __init__(self, tasks, today, index=None):
+        self.tasks = tasks
+        self.today = today
+
+        due_dates = [task.get('due_date') for task in tasks]
+        offsets = {due: _day_offset(due, today) for due in set(due_dates) if due}
+        # None marks both missing and invalid dates; the state column tells them apart
+        day_offsets = [offsets[due] if due else None for due in due_dates]
+
+        due_state = np.array(
+            [
+                DUE_MISSING if not due else (DUE_INVALID if offset is None else DUE_VALID)
+                for due, offset in zip(due_dates, day_offsets)
+            ],
+            dtype=np.int8,
+        )
+        days = np.array(
+            [0.0 if offset is None else offset for offset in day_offsets], dtype=np.float64
+        )
+        importance_values = [task.get('importance', 0) or 0 for task in tasks]
+        hours_values = [task.get('estimated_hours', 0) or 0 for task in tasks]
+        if index is not None:
+            dependents = index.task_dependents_counts()
+        else:
+            dependents = [task.get('dependents_count', 0) for task in tasks]
+
+        self.days_until = days
+        self.due_state = due_state
+        self.has_due = due_state == DUE_VALID
+        # Raw values are kept for explanation strings, which echo the input as given
+        self.importance_values = importance_values
+        self.hours_values = hours_values
+        self.importance = np.array([float(v) for v in importance_values], dtype=np.float64)
+        self.hours = np.array(hours_values, dtype=np.float64)
+        self.dependents_count = np.array(dependents, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.tasks)
+
+
+def _day_offset(due_date, today):
+    if isinstance(due_date, str):
+        try:
+            due_date = date.fromisoformat(due_date)
+        except ValueError:
+            return None
+    return (due_date - today).days
+
+
+def priority_index(scores, thresholds=None):
+    # Index of each score's level in PRIORITY_LABELS, for score arrays of any shape
+    thresholds = thresholds or {}
+    return (
+        (scores >= thresholds.get("MEDIUM", 5.0)).astype(np.int8) +
+        (scores >= thresholds.get("HIGH", 8.0)).astype(np.int8)
+    )
+
+
+def priority_levels(scores, thresholds=None):
+    return [PRIORITY_LABELS[i] for i in priority_index(scores, thresholds).tolist()]
+
+
+def round_scores(scores):
+    # Python's round() is correctly rounded; np.round is not, so keep parity with the loop path
+    return [round(s, 2) for s in scores.tolist()]
+
+
+def score_codes(scores):
+    """
+    Scores rounded like round_scores(), as integer hundredths: same order and ties,
+    without a Python round() per score. np.rint(scores * 100) can only differ from
+    round() within rounding error of a half hundredth, which round-number weights
+    hit often; those scores are compared with the half exactly, ties to even as round() does.
+    """
+    scaled = scores * 100.0
+    codes = np.rint(scaled)
+    lower = np.floor(scaled)
+    near_half = np.abs(scaled - lower - 0.5) < 1e-6
+    if near_half.any():
+        x = scores[near_half]
+        lower = lower[near_half]
+        # Veltkamp split: high keeps 48 bits, so 200 * high and 200 * (x - high) are exact
+        split = 33.0 * x
+        high = split - (split - x)
+        excess = 200.0 * high - (2.0 * lower + 1.0)
+        rest = -200.0 * (x - high)
+        codes[near_half] = lower + ((excess > rest) | ((excess == rest) & (lower % 2 == 1)))
+    return codes.astype(np.int64)
+
+
+def rank_order(rounded_scores):
+    # Stable descending order, matching list.sort(key=..., reverse=True)
+    return np.argsort(-np.array(rounded_scores, dtype=np.float64), kind='stable').tolist()
+
+
+def rank_orders(codes):
+    """Positions of every row of score_codes() in rank order, as rank_tasks() sorts them."""
+    if codes.size and codes.max() <= np.iinfo(np.int16).max:
+        # Stable sorts of 16-bit integers are radix sorts
+        codes = codes.astype(np.int16)
+    return np.argsort(-codes, axis=1, kind='stable')
+
+
+def top_k_order(rounded_scores, k):
+    # Indices of the k best scores in rank_order() order, without sorting the whole column
+    scores = np.array(rounded_scores, dtype=np.float64)
+    if k <= 0:
+        return []
+    if k >= len(scores):
+        return rank_order(rounded_scores)
+
+    cutoff = np.partition(scores, len(scores) - k)[len(scores) - k]
+    # Every score tied with the cutoff is a candidate; the stable sort keeps input order among them
+    candidates = np.flatnonzero(scores >= cutoff)
+    order = np.argsort(-scores[candidates], kind='stable')
+    return candidates[order[:k]].tolist()
+
+
+def scored_tasks(tasks, scores, explain, thresholds=None):
+    # One ScoredTask per task, in input order, as BaseScoringStrategy.evaluate_tasks returns
+    return [
+        ScoredTask(task, position, score, priority_level, explain)
+        for position, (task, score, priority_level) in enumerate(
+            zip(tasks, round_scores(scores), priority_levels(scores, thresholds))
+        )
+    ]
+
+
+def urgency_scores(columns, decay, offsets=None):
+    # With day offsets: one row per reference date, offsets[row] days after columns.today
+    days = columns.days_until
+    if offsets is not None:
+        days = days[None, :] - offsets[:, None]
+    urgency = np.where(
+        days < 0, 10.0,
+        np.where(days == 0, 9.0, np.maximum(0.0, 9.0 - (days * decay)))
+    )
+    return np.where(columns.has_due, urgency, 0.0)
+
+
+def effort_scores(columns):
+    hours = np.where(columns.hours <= 0, 5.0, columns.hours)
+    return np.maximum(0.0, 10.0 - (hours * 0.5))
+
+
+def dependency_scores(dependents, points=2.0):
+    return np.minimum(10.0, dependents * points)
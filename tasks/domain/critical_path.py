@@ -0,0 +1,72 @@
+from array import array
+from collections import namedtuple
+
+from .dependency_index import _to_csr
+from .scoring_config import CRITICAL_PATH_MAX_HOURS
+
+# Per strongly connected component of the dependency graph, in hours:
+# earliest start, longest path of work from its start to the end (its own hours included)
+# and slack, how long it can slip without delaying the whole plan. length is the critical path length.
+CriticalPath = namedtuple(
+    'CriticalPath', ['component_of', 'earliest_start', 'remaining', 'slack', 'length']
+)
+
+
+def critical_path(index, node_hours):
+    """
+    Critical path analysis of a DependencyIndex, O(V+E).
+
+    node_hours[node] is the work of each node (DependencyIndex.node_hours(), where
+    missing and negative estimates count as 0). Each node counts for at most
+    CRITICAL_PATH_MAX_HOURS, so that no sum overflows to infinity and slack is
+    never inf - inf. A task can start once all of its dependencies are done.
+    Cycles cannot be ordered, so every strongly connected component is
+    scheduled as one block whose work is the sum of its members'.
+    """
+    component_of, component_count = index.components()
+    node_count = len(component_of)
+
+    hours = array('d', bytes(8 * component_count))
+    for node in range(node_count):
+        hours[component_of[node]] += min(node_hours[node], CRITICAL_PATH_MAX_HOURS)
+
+    # Members of every component, in component order
+    member_offsets, members = _to_csr(component_count, component_of, range(node_count))
+
+    forward_offsets, forward_targets = index.forward_offsets, index.forward_targets
+    reverse_offsets, reverse_targets = index.reverse_offsets, index.reverse_targets
+
+    # Components are numbered dependencies first, so one pass upwards sees every
+    # dependency finished before its dependents start...
+    earliest_start = array('d', bytes(8 * component_count))
+    for component in range(component_count):
+        start = 0.0
+        for member in members[member_offsets[component]:member_offsets[component + 1]]:
+            for dependency in forward_targets[forward_offsets[member]:forward_offsets[member + 1]]:
+                other = component_of[dependency]
+                if other != component:
+                    finish = earliest_start[other] + hours[other]
+                    if finish > start:
+                        start = finish
+        earliest_start[component] = start
+
+    # ...and one pass downwards sees every dependent's remaining path first
+    remaining = array('d', bytes(8 * component_count))
+    for component in range(component_count - 1, -1, -1):
+        longest = 0.0
+        for member in members[member_offsets[component]:member_offsets[component + 1]]:
+            for dependent in reverse_targets[reverse_offsets[member]:reverse_offsets[member + 1]]:
+                other = component_of[dependent]
+                if other != component and remaining[other] > longest:
+                    longest = remaining[other]
+        remaining[component] = hours[component] + longest
+
+    length = max(
+        (start + rest for start, rest in zip(earliest_start, remaining)), default=0.0
+    )
+    # Clamped: float sums along different paths can land a hair below zero
+    slack = array('d', (
+        max(0.0, length - start - rest) for start, rest in zip(earliest_start, remaining)
+    ))
+
+    return CriticalPath(component_of, earliest_start, remaining, slack, length)
@@ -1,3 +1,10 @@
+from array import array
+
+from .dependency_index import DependencyIndex, _to_csr, dependency_id
+from .scoring_config import REACHABILITY_MAX_BYTES
+
+# Hours are summed as whole hundredths so that bitset sums stay exact
+_HOURS_SCALE = 100
 
 def build_dependency_graph(tasks):
 
@@ -8,75 +15,172 @@ def build_dependency_graph(tasks):
 
             deps = task.get('dependencies', [])
 
-            dep_ids = []
-            for d in deps:
-                if isinstance(d, dict):
-                    dep_ids.append(d.get('id'))
-                elif hasattr(d, 'id'):
-                    dep_ids.append(d.id)
-                else:
-                    dep_ids.append(d)
-            
-            graph[t_id] = dep_ids
+            graph[t_id] = [dependency_id(d) for d in deps]
     return graph
 
 def detect_cycles(graph):
+    """
+    Returns every dependency cycle in `graph` as a list of cycle groups.
 
-    visited = set()
-    recursion_stack = set()
-    
-    def dfs(node, path):
-        visited.add(node)
-        recursion_stack.add(node)
-        path.append(node)
-        
-        for neighbor in graph.get(node, []):
-            if neighbor not in visited:
-                if dfs(neighbor, path):
-                    return True
-            elif neighbor in recursion_stack:
-                return True
-        
-        recursion_stack.remove(node)
-        path.pop()
-        return False
-
-    for node in graph:
-        if node not in visited:
-            path = []
-            if dfs(node, path):
-                return path
-    return None
-
-def calculate_dependents_count(tasks):
-
-    reverse_graph = {}
-    
+    Uses an iterative Tarjan strongly-connected-components pass over a
+    DependencyIndex, so it runs in O(V+E) without recursion limits. A group is
+    a strongly connected component with more than one task, or a single task
+    that depends on itself; tasks that merely lead into a cycle are not
+    included. Returns an empty list if the graph is acyclic.
+    """
 
-    for task in tasks:
-        t_id = task.get('id')
-        if t_id is not None:
-            reverse_graph[t_id] = []
-            
-    for task in tasks:
-        t_id = task.get('id')
-        deps = task.get('dependencies', [])
-        
-
-        dep_ids = []
-        for d in deps:
-            if isinstance(d, dict): dep_ids.append(d.get('id'))
-            elif hasattr(d, 'id'): dep_ids.append(d.id)
-            else: dep_ids.append(d)
-            
-        for dep_id in dep_ids:
-            if dep_id in reverse_graph:
-                reverse_graph[dep_id].append(t_id)
-                
+    return DependencyIndex.from_graph(graph).find_cycle_ids()
 
-    for task in tasks:
-        t_id = task.get('id')
-        if t_id is not None:
-            task['dependents_count'] = len(reverse_graph.get(t_id, []))
+def calculate_dependents_count(tasks, index=None):
+
+    if index is None:
+        index = DependencyIndex.from_tasks(tasks)
+
+    counts = index.task_dependents_counts()
+    for task, count in zip(tasks, counts):
+        if task.get('id') is not None:
+            task['dependents_count'] = count
             
     return tasks
+
+
+class ReachabilityIndex:
+    """
+    What every task transitively unblocks: the number of distinct tasks that
+    depend on it, directly or through other tasks, and their total estimated hours.
+
+    Transitive dependents are bitsets (Python ints) over the strongly connected
+    components of a DependencyIndex, which are numbered in topological order, so
+    one backward pass ORs each component's dependents into it. Components are
+    taken in blocks sized to REACHABILITY_MAX_BYTES: one pass for most backlogs,
+    bounded memory with more passes on very large graphs. Tasks on a cycle
+    unblock each other.
+    """
+
+    def __init__(self, index, node_hours, max_bytes=REACHABILITY_MAX_BYTES):
+        self.index = index
+        component_of, component_count = index.components()
+        node_count = len(component_of)
+
+        sizes = array('q', bytes(8 * component_count))
+        node_units = [round(hours * _HOURS_SCALE) if hours > 0 else 0 for hours in node_hours]
+        units = [0] * component_count
+        for node in range(node_count):
+            sizes[component_of[node]] += 1
+            units[component_of[node]] += node_units[node]
+
+        dependent_offsets, dependent_components = self._condensed_dependents(index, component_count)
+
+        # Highest component that transitively depends on each component; passes skip
+        # the components that cannot reach their block at all
+        furthest = array('q', [-1]) * component_count
+        for component in range(component_count - 1, -1, -1):
+            start, end = dependent_offsets[component], dependent_offsets[component + 1]
+            for dependent in dependent_components[start:end]:
+                furthest[component] = max(furthest[component], dependent, furthest[dependent])
+
+        counts = array('q', bytes(8 * component_count))
+        unit_sums = [0] * component_count
+        block = max(64, (8 * max_bytes) // max(component_count, 1))
+
+        for lo in range(0, component_count, block):
+            hi = min(lo + block, component_count)
+            size_masks = _weight_masks(sizes, lo, hi)
+            # Without cycles in the block every component is one task: plain bit counts
+            plain_sizes = size_masks == [(1, (1 << (hi - lo)) - 1)]
+            unit_masks = _weight_masks(units, lo, hi)
+
+            # reach[c]: bit (t - lo) is set when component t in [lo, hi) depends on c.
+            # Dependents have higher numbers, so they are complete before c is visited.
+            reach = [0] * hi
+            for component in range(hi - 1, -1, -1):
+                if furthest[component] < lo:
+                    continue
+                bits = 0
+                start, end = dependent_offsets[component], dependent_offsets[component + 1]
+                for dependent in dependent_components[start:end]:
+                    if dependent >= hi:
+                        break
+                    bits |= reach[dependent]
+                    if dependent >= lo:
+                        bits |= 1 << (dependent - lo)
+                if bits:
+                    reach[component] = bits
+                    if plain_sizes:
+                        counts[component] += bits.bit_count()
+                    else:
+                        counts[component] += _weighted_bit_count(bits, size_masks)
+                    unit_sums[component] += _weighted_bit_count(bits, unit_masks)
+
+        # Per node: everything its component unblocks, plus the other members of its cycle
+        self.dependents_counts = array('q', (
+            counts[component_of[node]] + sizes[component_of[node]] - 1 for node in range(node_count)
+        ))
+        self.dependents_hours = array('d', (
+            (unit_sums[component_of[node]] + units[component_of[node]] - node_units[node]) / _HOURS_SCALE
+            for node in range(node_count)
+        ))
+
+    @classmethod
+    def from_tasks(cls, tasks, index=None):
+        if index is None:
+            index = DependencyIndex.from_tasks(tasks)
+        return cls(index, index.node_hours(tasks))
+
+    def task_dependents_counts(self):
+        # Transitive dependents count per input task position
+        counts = self.dependents_counts
+        return [counts[node] for node in self.index.task_nodes]
+
+    def task_dependents_hours(self):
+        # Estimated hours of the transitive dependents, per input task position
+        hours = self.dependents_hours
+        return [hours[node] for node in self.index.task_nodes]
+
+    @staticmethod
+    def _condensed_dependents(index, component_count):
+        # Distinct dependent components of every component, ascending, in CSR form
+        component_of = index.components()[0]
+        offsets, targets = index.reverse_offsets, index.reverse_targets
+        member_offsets, members = _to_csr(component_count, component_of, range(len(component_of)))
+
+        sources = array('q')
+        dependents = array('q')
+        for component in range(component_count):
+            found = set()
+            for member in members[member_offsets[component]:member_offsets[component + 1]]:
+                for dependent in targets[offsets[member]:offsets[member + 1]]:
+                    found.add(component_of[dependent])
+            found.discard(component)
+            for dependent in sorted(found):
+                sources.append(component)
+                dependents.append(dependent)
+
+        return _to_csr(component_count, sources, dependents)
+
+
+def _weight_masks(weights, lo, hi):
+    # (weight, mask) pairs such that a weighted bit count over components [lo, hi)
+    # is a handful of plain bit counts: one mask per distinct weight, or one per
+    # binary digit of the weights when that takes fewer masks
+    block = weights[lo:hi]
+    values = set(block)
+    values.discard(0)
+    if len(values) <= max(values, default=0).bit_length():
+        groups = [(value, lambda weight, value=value: weight == value) for value in values]
+    else:
+        groups = [(1 << k, lambda weight, k=k: weight >> k & 1) for k in range(max(values).bit_length())]
+
+    masks = []
+    for weight, selected in groups:
+        mask = int(''.join('1' if selected(w) else '0' for w in reversed(block)), 2)
+        if mask:
+            masks.append((weight, mask))
+    return masks
+
+
+def _weighted_bit_count(bits, masks):
+    total = 0
+    for weight, mask in masks:
+        total += (bits & mask).bit_count() * weight
+    return total
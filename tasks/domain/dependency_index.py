@@ -0,0 +1,268 @@
+from array import array
+
+
+def dependency_id(dep):
+    if isinstance(dep, dict):
+        return dep.get('id')
+    elif hasattr(dep, 'id'):
+        return dep.id
+    return dep
+
+
+def _to_csr(node_count, sources, targets):
+    # Counting sort of (source, target) edge pairs into offsets + flat targets
+    offsets = array('q', bytes(8 * (node_count + 1)))
+    for src in sources:
+        offsets[src + 1] += 1
+    for node in range(node_count):
+        offsets[node + 1] += offsets[node]
+
+    flat = array('q', bytes(8 * len(targets)))
+    cursor = offsets[:-1]
+    for src, dst in zip(sources, targets):
+        flat[cursor[src]] = dst
+        cursor[src] += 1
+    return offsets, flat
+
+
+class DependencyIndex:
+    """
+    Compact dependency graph shared by one analysis request.
+
+    Task ids are mapped to dense node numbers and edges are stored CSR-style:
+    the dependencies of node `n` are `forward_targets[forward_offsets[n]:forward_offsets[n + 1]]`,
+    its dependents are the same slice of the reverse arrays. Tasks without an id get an
+    anonymous node so that their dependencies still count towards dependents.
+    Dependencies on ids that are not in the task list are dropped.
+    """
+
+    def __init__(self, ids, task_nodes, sources, targets):
+        self.ids = ids
+        self.node_of = {t_id: node for node, t_id in enumerate(ids) if t_id is not None}
+        # Node number for every input task position
+        self.task_nodes = task_nodes
+
+        node_count = len(ids)
+        self.forward_offsets, self.forward_targets = _to_csr(node_count, sources, targets)
+        self.reverse_offsets, self.reverse_targets = _to_csr(node_count, targets, sources)
+
+        # Tarjan results, computed on first use
+        self._components = None
+
+    @classmethod
+    def from_tasks(cls, tasks):
+        ids = []
+        node_of = {}
+        task_nodes = array('q')
+        edge_sources = []
+        raw_targets = []
+
+        for task in tasks:
+            t_id = task.get('id')
+            if t_id is None:
+                node = len(ids)
+                ids.append(None)
+            elif t_id in node_of:
+                node = node_of[t_id]
+            else:
+                node = node_of[t_id] = len(ids)
+                ids.append(t_id)
+            task_nodes.append(node)
+
+            for dep in task.get('dependencies', []) or []:
+                edge_sources.append(node)
+                raw_targets.append(dependency_id(dep))
+
+        sources = array('q')
+        targets = array('q')
+        for src, dep_id in zip(edge_sources, raw_targets):
+            dst = node_of.get(dep_id)
+            if dst is not None:
+                sources.append(src)
+                targets.append(dst)
+
+        return cls(ids, task_nodes, sources, targets)
+
+    @classmethod
+    def from_graph(cls, graph):
+        ids = list(graph)
+        node_of = {t_id: node for node, t_id in enumerate(ids)}
+
+        sources = array('q')
+        targets = array('q')
+        for t_id, dep_ids in graph.items():
+            src = node_of[t_id]
+            for dep_id in dep_ids:
+                dst = node_of.get(dep_id)
+                if dst is not None:
+                    sources.append(src)
+                    targets.append(dst)
+
+        return cls(ids, array('q', range(len(ids))), sources, targets)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.forward_targets)
+
+    def dependencies(self, node):
+        return self.forward_targets[self.forward_offsets[node]:self.forward_offsets[node + 1]]
+
+    def dependents(self, node):
+        return self.reverse_targets[self.reverse_offsets[node]:self.reverse_offsets[node + 1]]
+
+    def dependents_counts(self):
+        offsets = self.reverse_offsets
+        return [offsets[node + 1] - offsets[node] for node in range(len(self.ids))]
+
+    def node_hours(self, tasks):
+        # Estimated hours per node; tasks sharing an id share a node, which takes the largest estimate.
+        # Missing, negative and NaN estimates count as 0
+        hours = array('d', bytes(8 * len(self.ids)))
+        for node, task in zip(self.task_nodes, tasks):
+            value = task.get('estimated_hours', 0) or 0
+            if value > hours[node]:
+                hours[node] = value
+        return hours
+
+    def task_dependents_counts(self):
+        # Dependents count per input task position
+        counts = self.dependents_counts()
+        return [counts[node] for node in self.task_nodes]
+
+    def find_cycles(self):
+        """
+        Returns the node groups that form cycles: components with more than one
+        node, or a single node that depends on itself.
+        """
+        return self._strongly_connected()[2]
+
+    def components(self):
+        """
+        Strongly connected components as (component_of, component_count).
+
+        component_of[node] is the component number of every node. Components are
+        numbered dependencies first: a component only depends on components with
+        a lower number, so counting up is a topological order of the condensed graph.
+        """
+        component_of, component_count, _ = self._strongly_connected()
+        return component_of, component_count
+
+    def weak_components(self):
+        """
+        Weakly connected components as (component_of, component_count): nodes
+        linked by dependencies in either direction share a component. One
+        union-find pass over the edges, O(V+E); components are numbered in
+        order of their lowest node.
+        """
+        node_count = len(self.ids)
+        parent = list(range(node_count))
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        offsets = self.forward_offsets
+        targets = self.forward_targets
+        for node in range(node_count):
+            for dependency in targets[offsets[node]:offsets[node + 1]]:
+                a, b = find(node), find(dependency)
+                if a != b:
+                    parent[a] = b
+
+        component_of = array('q', bytes(8 * node_count))
+        number_of = {}
+        for node in range(node_count):
+            root = find(node)
+            component = number_of.get(root)
+            if component is None:
+                component = number_of[root] = len(number_of)
+            component_of[node] = component
+        return component_of, len(number_of)
+
+    def _strongly_connected(self):
+        if self._components is None:
+            self._components = self._tarjan()
+        return self._components
+
+    def _tarjan(self):
+        # Iterative Tarjan SCC pass over the forward edges, O(V+E).
+        # A component is completed only after every component it can reach,
+        # so completion order numbers components dependencies first.
+        offsets = self.forward_offsets
+        targets = self.forward_targets
+        node_count = len(self.ids)
+
+        unvisited = -1
+        index_of = [unvisited] * node_count
+        lowlink = [0] * node_count
+        on_stack = [False] * node_count
+        stack = []
+        cycles = []
+        next_index = 0
+        component_of = array('q', bytes(8 * node_count))
+        component_count = 0
+
+        for root in range(node_count):
+            if index_of[root] != unvisited:
+                continue
+
+            index_of[root] = lowlink[root] = next_index
+            next_index += 1
+            stack.append(root)
+            on_stack[root] = True
+            # (node, position of the next edge to visit)
+            work = [[root, offsets[root]]]
+
+            while work:
+                frame = work[-1]
+                node = frame[0]
+                end = offsets[node + 1]
+                advanced = False
+                while frame[1] < end:
+                    neighbor = targets[frame[1]]
+                    frame[1] += 1
+                    if index_of[neighbor] == unvisited:
+                        index_of[neighbor] = lowlink[neighbor] = next_index
+                        next_index += 1
+                        stack.append(neighbor)
+                        on_stack[neighbor] = True
+                        work.append([neighbor, offsets[neighbor]])
+                        advanced = True
+                        break
+                    elif on_stack[neighbor] and index_of[neighbor] < lowlink[node]:
+                        lowlink[node] = index_of[neighbor]
+
+                if advanced:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
+
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component_of[member] = component_count
+                        component.append(member)
+                        if member == node:
+                            break
+                    component_count += 1
+
+                    if len(component) > 1 or node in self.dependencies(node):
+                        component.reverse()
+                        cycles.append(component)
+
+        return component_of, component_count, cycles
+
+    def find_cycle_ids(self):
+        ids = self.ids
+        return [[ids[node] for node in group] for group in self.find_cycles()]
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from .batch_scoring import PRIORITY_LABELS, np
+from .scoring_config import PRIORITY_THRESHOLDS
+
+# Levels a task can rise into, with their PRIORITY_THRESHOLDS key
+CROSSING_LEVELS = (("Medium", "MEDIUM"), ("High", "HIGH"))
+
+
+def forecast_dates(start, days):
+    return [start + timedelta(days=offset) for offset in range(days)]
+
+
+def threshold_crossings(scores):
+    """
+    Per level of CROSSING_LEVELS, the row (date) of a (dates x tasks) score array
+    on which each task reaches the level's threshold while the row before is
+    below it: {level: array of rows, -1 for tasks that do not cross}.
+    """
+    if len(scores) < 2:
+        return {level: np.full(scores.shape[1], -1) for level, _ in CROSSING_LEVELS}
+    crossings = {}
+    for level, key in CROSSING_LEVELS:
+        reached = scores >= PRIORITY_THRESHOLDS[key]
+        crossed = reached[1:] & ~reached[:-1]
+        crossings[level] = np.where(crossed.any(axis=0), crossed.argmax(axis=0) + 1, -1)
+    return crossings
+
+
+def level_crossings(levels_by_date):
+    """
+    threshold_crossings() without NumPy, from the priority level of every task
+    (by position) on every date: {level: list of rows, -1 for tasks that do not cross}.
+    """
+    task_count = len(levels_by_date[0]) if levels_by_date else 0
+    crossings = {level: [-1] * task_count for level, _ in CROSSING_LEVELS}
+    ranks = {label: rank for rank, label in enumerate(PRIORITY_LABELS)}
+    for row in range(1, len(levels_by_date)):
+        for position, (before, after) in enumerate(zip(levels_by_date[row - 1], levels_by_date[row])):
+            if before == after:
+                continue
+            for level, _ in CROSSING_LEVELS:
+                if ranks[before] < ranks[level] <= ranks[after] and crossings[level][position] < 0:
+                    crossings[level][position] = row
+    return crossings
@@ -0,0 +1,64 @@
+import heapq
+from itertools import chain, islice
+
+from .scored_task import ScoredTask
+
+# Clusters of dependent tasks (weakly connected components of the dependency graph)
+# do not affect each other's scores under component-local strategies, so they can
+# be ranked apart. Rankings are exchanged as rows, ScoredTask.as_row() tuples:
+# (position, score, priority_level, explanation, has_cycle).
+
+
+def component_positions(index):
+    """
+    Task positions of every weakly connected component of a DependencyIndex,
+    ascending, components in order of their first task.
+    """
+    component_of, component_count = index.weak_components()
+    positions = [[] for _ in range(component_count)]
+    for position, node in enumerate(index.task_nodes):
+        positions[component_of[node]].append(position)
+    return positions
+
+
+def balanced_chunks(components, chunk_count):
+    """
+    Groups components into at most chunk_count chunks of similar task counts,
+    largest components first. Each chunk is its task positions, ascending.
+    """
+    chunks = [[] for _ in range(chunk_count)]
+    loads = [(0, chunk) for chunk in range(chunk_count)]
+    for positions in sorted(components, key=len, reverse=True):
+        load, chunk = heapq.heappop(loads)
+        chunks[chunk].append(positions)
+        heapq.heappush(loads, (load + len(positions), chunk))
+    return [list(heapq.merge(*chunk)) for chunk in chunks if chunk]
+
+
+def merge_rankings(rankings, limit=None):
+    """
+    k-way merge of the row rankings of disjoint task sets: score descending,
+    ties by position, the order one stable sort of all the tasks gives.
+
+    The first `limit` rows come from a heap merge. Whole rankings are merged by
+    sorting the concatenated runs instead: timsort merges presorted runs in C,
+    about 3x faster than heapq.merge's Python loop.
+    """
+    if limit is None:
+        return sorted(chain.from_iterable(rankings), key=_rank_key)
+    return list(islice(heapq.merge(*rankings, key=_rank_key), limit))
+
+
+def _rank_key(row):
+    return (-row[1], row[0])
+
+
+def records_from_rows(tasks, rows):
+    # ScoredTask records of tasks for rows of task positions, explanations as given
+    explain = {row[0]: row[3] for row in rows}.__getitem__
+    records = []
+    for position, score, priority_level, _, has_cycle in rows:
+        record = ScoredTask(tasks[position], position, score, priority_level, explain)
+        record.has_cycle = has_cycle
+        records.append(record)
+    return records
@@ -0,0 +1,330 @@
+import heapq
+from collections import namedtuple
+from math import ceil, floor
+
+from .dependency_index import DependencyIndex
+from .scoring_config import PLANNER_DP_MAX_CELLS, PLANNER_HOURS_UNIT, PLANNER_MAX_GROUP_OPTIONS, PLANNER_MAX_HOURS
+
+# Planned task positions in working order, their estimated hours and total score,
+# and whether the plan is proven optimal (False when the greedy planner was used)
+Plan = namedtuple('Plan', ['positions', 'hours', 'score', 'exact'])
+
+
+def plan_tasks(tasks, scores, budget_hours, index=None):
+    """
+    Picks the tasks that maximize their total score within budget_hours.
+
+    scores holds the score of every task position. A task is only picked together
+    with the tasks it depends on (dependencies outside the list count as done),
+    and the tasks of a cycle are picked all together or not at all. Hours are
+    counted in PLANNER_HOURS_UNIT steps, rounded up, so a plan never runs over;
+    budgets above PLANNER_MAX_HOURS count as PLANNER_MAX_HOURS.
+
+    When every scored task fits, together with what it depends on, the plan
+    holds them all. Otherwise each weakly connected cluster of dependent tasks
+    becomes one group whose options are its dependency-closed subsets; a
+    multiple-choice knapsack DP over the budget then picks one option per group,
+    which is exact. When a cluster has more than PLANNER_MAX_GROUP_OPTIONS subsets
+    or the DP would exceed PLANNER_DP_MAX_CELLS, a greedy pass by score per hour
+    is used instead.
+    """
+    if index is None:
+        index = DependencyIndex.from_tasks(tasks)
+    capacity = floor(min(budget_hours, PLANNER_MAX_HOURS) / PLANNER_HOURS_UNIT + 1e-9)
+
+    items = _PlanItems(index, tasks, scores)
+    selected = items.needed()
+    exact = sum(items.units[component] for component in selected) <= capacity
+    if not exact:
+        # Only tasks that fit the budget together with everything they depend on
+        candidates = items.fitting(capacity)
+        groups = _groups(items, candidates)
+        options = [_group_options(items, group, capacity) for group in groups]
+        if all(option is not None for option in options):
+            options = _drop_crowded_options(options, capacity)
+            cells = sum(len(group_options) for group_options in options) * (capacity + 1)
+            if cells <= PLANNER_DP_MAX_CELLS:
+                selected = _knapsack(options, capacity)
+                exact = True
+        if not exact:
+            selected = _greedy(items, candidates, capacity)
+
+    positions = items.working_order(selected)
+    return Plan(
+        positions,
+        sum(items.hours[component] for component in selected),
+        round(sum(items.scores[component] for component in selected), 2),
+        exact,
+    )
+
+
+class _PlanItems:
+    """Tasks condensed to the strongly connected components of the dependency graph."""
+
+    def __init__(self, index, tasks, scores):
+        component_of, component_count = index.components()
+        self.component_of = component_of
+        self.count = component_count
+
+        # Tasks sharing an id share a node; its best scored task stands for it
+        representative = [None] * len(index)
+        for position, node in enumerate(index.task_nodes):
+            best = representative[node]
+            if best is None or scores[position] > scores[best]:
+                representative[node] = position
+
+        # Hours past the largest budget (infinite ones included) never fit: count them as just that
+        max_hours = PLANNER_MAX_HOURS + PLANNER_HOURS_UNIT
+        node_hours = index.node_hours(tasks)
+        self.members = [[] for _ in range(component_count)]
+        self.scores = [0.0] * component_count
+        self.hours = [0.0] * component_count
+        self.units = [0] * component_count
+        for node, position in enumerate(representative):
+            component = component_of[node]
+            hours = max(node_hours[node], 0.0)
+            self.hours[component] += hours
+            self.units[component] += ceil(min(hours, max_hours) / PLANNER_HOURS_UNIT - 1e-9)
+            if position is not None:
+                self.members[component].append(position)
+                self.scores[component] += scores[position]
+
+        self.dependencies = [set() for _ in range(component_count)]
+        self.dependents = [[] for _ in range(component_count)]
+        for node in range(len(index)):
+            component = component_of[node]
+            for dependency in index.dependencies(node):
+                dependency = component_of[dependency]
+                if dependency != component and dependency not in self.dependencies[component]:
+                    self.dependencies[component].add(dependency)
+                    self.dependents[dependency].append(component)
+
+    def closure(self, component, excluded=(), max_units=None):
+        """
+        The component and everything it depends on, leaving out `excluded` and
+        what only they lead to; None once its units pass max_units.
+        """
+        closure = {component}
+        units = self.units[component]
+        stack = [component]
+        while stack:
+            for dependency in self.dependencies[stack.pop()]:
+                if dependency not in closure and dependency not in excluded:
+                    closure.add(dependency)
+                    units += self.units[dependency]
+                    stack.append(dependency)
+            if max_units is not None and units > max_units:
+                return None
+        return closure
+
+    def needed(self):
+        # Every component with a score, and everything it depends on
+        needed = set()
+        for component in range(self.count):
+            if self.scores[component] > 0 and component not in needed:
+                needed |= self.closure(component, needed)
+        return needed
+
+    def fitting(self, capacity):
+        """Components that fit the budget together with everything they depend on, ascending."""
+        fits = [False] * self.count
+        # Units of each fitting closure, or an upper bound: shared dependencies count once per path
+        bound = [0] * self.count
+        for component in range(self.count):
+            # Dependencies have lower numbers, so they are settled already
+            dependencies = self.dependencies[component]
+            if not all(fits[dependency] for dependency in dependencies):
+                continue
+            units = self.units[component] + sum(bound[dependency] for dependency in dependencies)
+            if units > capacity:
+                closure = self.closure(component, max_units=capacity)
+                if closure is None:
+                    continue
+                units = sum(self.units[c] for c in closure)
+            fits[component] = True
+            bound[component] = units
+        return [component for component in range(self.count) if fits[component]]
+
+    def working_order(self, selected):
+        # Dependencies first; among the tasks that can start, the best scored one
+        selected = set(selected)
+        waiting = {c: len(self.dependencies[c]) for c in selected}
+        dependents = {c: [] for c in selected}
+        for component in selected:
+            for dependency in self.dependencies[component]:
+                dependents[dependency].append(component)
+
+        ready = [(-self.scores[c], c) for c, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        positions = []
+        while ready:
+            _, component = heapq.heappop(ready)
+            positions.extend(sorted(self.members[component]))
+            for dependent in dependents[component]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, (-self.scores[dependent], dependent))
+        return positions
+
+
+def _groups(items, candidates):
+    # Weakly connected clusters of the candidates, by union-find
+    parent = {c: c for c in candidates}
+
+    def find(c):
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    for component in candidates:
+        for dependency in items.dependencies[component]:
+            a, b = find(component), find(dependency)
+            if a != b:
+                parent[a] = b
+
+    groups = {}
+    for component in candidates:
+        groups.setdefault(find(component), []).append(component)
+    return list(groups.values())
+
+
+def _group_options(items, group, capacity):
+    """
+    Dependency-closed subsets of one group as (units, score, components), keeping
+    those that beat every cheaper subset. None when the group has too many subsets.
+    """
+    # Each member fits with its closure, and those closures are distinct subsets
+    if len(group) >= PLANNER_MAX_GROUP_OPTIONS:
+        return None
+
+    # (units, score, chosen components); group is in dependencies-first order
+    subsets = [(0, 0.0, frozenset())]
+    for component in group:
+        units = items.units[component]
+        score = items.scores[component]
+        dependencies = items.dependencies[component]
+        extended = [
+            (cost + units, total + score, chosen | {component})
+            for cost, total, chosen in subsets
+            if cost + units <= capacity and dependencies <= chosen
+        ]
+        subsets.extend(extended)
+        if len(subsets) > PLANNER_MAX_GROUP_OPTIONS:
+            return None
+
+    # Only options that score more than every cheaper one can be worth picking
+    options = []
+    for option in sorted(subsets, key=lambda subset: (subset[0], -subset[1])):
+        if option[1] > (options[-1][1] if options else 0):
+            options.append(option)
+    return options
+
+
+def _drop_crowded_options(options, capacity):
+    """
+    Drops groups that cannot be in any best plan. A group with a single option of
+    cost c loses to the capacity // c best single options of that cost: a plan
+    holds at most that many, so one of those is free to take its place.
+    """
+    kept = [group_options for group_options in options if len(group_options) != 1]
+    by_cost = {}
+    for group_options in options:
+        if len(group_options) == 1:
+            by_cost.setdefault(group_options[0][0], []).append(group_options)
+    for cost, singles in by_cost.items():
+        if cost and len(singles) > capacity // cost:
+            singles.sort(key=lambda group_options: group_options[0][1], reverse=True)
+            singles = singles[:capacity // cost]
+        kept.extend(singles)
+    return kept
+
+
+def _knapsack(options, capacity):
+    # Multiple-choice knapsack: at most one option per group, best total score
+    best = [0.0] * (capacity + 1)
+    choices = []
+    for group_options in options:
+        previous = best[:]
+        choice = [None] * (capacity + 1)
+        for option in group_options:
+            cost, total, _ = option
+            for budget in range(capacity, cost - 1, -1):
+                candidate = previous[budget - cost] + total
+                if candidate > best[budget]:
+                    best[budget] = candidate
+                    choice[budget] = option
+        choices.append(choice)
+
+    selected = []
+    budget = capacity
+    for choice in reversed(choices):
+        option = choice[budget]
+        if option is not None:
+            selected.extend(option[2])
+            budget -= option[0]
+    return selected
+
+
+def _greedy(items, candidates, capacity):
+    # Repeatedly take the candidate whose missing closure adds the most score per
+    # hour and still fits; taking tasks makes the closures that share them cheaper.
+    # The units and score each candidate still misses drop as its members are taken,
+    # so no closure is summed again.
+    selected = set()
+    remaining = capacity
+    is_candidate = set(candidates)
+    missing_units = {}
+    missing_scores = {}
+    for component in candidates:
+        dependencies = items.dependencies[component]
+        if len(dependencies) == 1:
+            # Along chains the closure is the dependency's one plus itself
+            (dependency,) = dependencies
+            missing_units[component] = items.units[component] + missing_units[dependency]
+            missing_scores[component] = items.scores[component] + missing_scores[dependency]
+        else:
+            closure = items.closure(component)
+            missing_units[component] = sum(items.units[c] for c in closure)
+            missing_scores[component] = sum(items.scores[c] for c in closure)
+    versions = dict.fromkeys(candidates, 0)
+
+    def entry(component):
+        units, score = missing_units[component], missing_scores[component]
+        ratio = score / units if units else float('inf')
+        return (-ratio, -score, component, versions[component])
+
+    heap = [entry(c) for c in candidates if items.scores[c] > 0]
+    heapq.heapify(heap)
+    while heap:
+        _, _, component, version = heapq.heappop(heap)
+        if component in selected or version != versions[component]:
+            # Taken since, or queued before part of its closure was taken
+            continue
+        missing = items.closure(component, selected)
+        units = sum(items.units[c] for c in missing)
+        score = sum(items.scores[c] for c in missing)
+        if units > remaining or score <= 0:
+            continue
+
+        selected |= missing
+        remaining -= units
+        # Every candidate depending on a newly taken component misses that much less
+        touched = set()
+        for member in missing:
+            seen = {member}
+            stack = [member]
+            while stack:
+                for dependent in items.dependents[stack.pop()]:
+                    if dependent not in seen and dependent in is_candidate and dependent not in selected:
+                        seen.add(dependent)
+                        stack.append(dependent)
+                        missing_units[dependent] -= items.units[member]
+                        missing_scores[dependent] -= items.scores[member]
+                        touched.add(dependent)
+        for holder in touched:
+            versions[holder] += 1
+            if items.scores[holder] > 0:
+                heapq.heappush(heap, entry(holder))
+
+    return sorted(selected)
@@ -0,0 +1,76 @@
+CYCLE_PREFIX = "[CYCLE DETECTED] "
+
+
+class ScoredTask:
+    """
+    Result of scoring one task, without copying the task.
+
+    Holds a reference to the input task plus its score and priority level.
+    The explanation is only formatted when read: `explain` is shared by all
+    records of one scoring call and turns a position back into its text.
+    """
+
+    __slots__ = ('task', 'position', 'score', 'priority_level', 'has_cycle', '_explain')
+
+    def __init__(self, task, position, score, priority_level, explain):
+        self.task = task
+        self.position = position
+        self.score = score
+        self.priority_level = priority_level
+        self.has_cycle = False
+        self._explain = explain
+
+    @property
+    def explanation(self):
+        explanation = self._explain(self.position)
+        return CYCLE_PREFIX + explanation if self.has_cycle else explanation
+
+    def as_dict(self):
+        # The enriched dict shape returned by score_tasks() and AnalyzeTasksUseCase.execute()
+        result = {
+            **self.task,
+            'score': self.score,
+            'priority_level': self.priority_level,
+            'explanation': self.explanation,
+        }
+        if self.has_cycle:
+            result['has_cycle'] = True
+        return result
+
+    def as_row(self):
+        # Plain values (position, score, priority_level, explanation, has_cycle), e.g. to
+        # send the record across processes; the explanation has no cycle prefix
+        return (self.position, self.score, self.priority_level, self._explain(self.position), self.has_cycle)
+
+    def __repr__(self):
+        return f"<ScoredTask {self.task.get('id')!r} score={self.score!r}>"
+
+
+class ColumnExplainer:
+    """
+    explain(position) formats `template` with every column's value at that position.
+    `template` is one string for all tasks, or a column of templates, one per task.
+    """
+
+    __slots__ = ('template', 'columns')
+
+    def __init__(self, template, *columns):
+        self.template = template
+        self.columns = columns
+
+    def __call__(self, position):
+        template = self.template if isinstance(self.template, str) else self.template[position]
+        return template.format(*[column[position] for column in self.columns])
+
+
+class RowExplainer:
+    """explain(position) formats `template` with rows[position], a tuple of values."""
+
+    __slots__ = ('template', 'rows')
+
+    def __init__(self, template, rows):
+        self.template = template
+        self.rows = rows
+
+    def __call__(self, position):
+        return self.template.format(*self.rows[position])
@@ -6,6 +6,14 @@ DEFAULT_SMART_BALANCE_WEIGHTS = {
     "effort": 0.2,
     "dependencies": 0.1,
 }
+MAX_SMART_BALANCE_WEIGHT = 1e6 # Largest weight a request may give a component
+
+# SmartBalance dependency score per unit of the chosen dependency measure (capped at 10)
+DEPENDENCY_POINTS = {
+    "direct": 2.0, # per task waiting on this one
+    "transitive": 1.0, # per task unblocked, directly or through other tasks
+    "transitive_hours": 0.25, # per estimated hour of work unblocked
+}
 
 # Priority Thresholds
 PRIORITY_THRESHOLDS = {
@@ -18,3 +26,18 @@ DEFAULT_IMPORTANCE = 5
 DEFAULT_EFFORT_SCORE_FOR_MISSING = 5  # Medium effort if unknown
 MAX_IMPORTANCE = 10
 MAX_EFFORT_HOURS = 100 # Cap for normalization
+
+# Batch scoring (NumPy, optional)
+BATCH_SCORING_MIN_TASKS = 500 # Below this the per-task loop is faster than building columns
+
+# Critical path: hours per task are capped so that path lengths, and slack, stay finite
+CRITICAL_PATH_MAX_HOURS = 1e12
+
+# Reachability bitsets (transitive dependents)
+REACHABILITY_MAX_BYTES = 64 * 1024 * 1024 # Bitset memory budget; larger graphs take several passes
+
+# Daily planner (suggest with an hours budget)
+PLANNER_HOURS_UNIT = 0.25 # Hours are planned in quarter hours, rounded up
+PLANNER_MAX_HOURS = 24 * 7 # Largest budget a plan may have
+PLANNER_MAX_GROUP_OPTIONS = 4096 # Dependency-closed subsets enumerated per cluster of dependent tasks
+PLANNER_DP_MAX_CELLS = 250_000 # Knapsack DP size (options x budget units) above which the greedy planner runs
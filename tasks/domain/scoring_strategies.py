@@ -1,21 +1,95 @@
+import heapq
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from datetime import date
 
+from . import batch_scoring
+from .batch_scoring import np
+from .critical_path import critical_path
+from .dependency_graph import ReachabilityIndex
+from .dependency_index import DependencyIndex
+from .scoring_config import DEPENDENCY_POINTS
+from .scored_task import ColumnExplainer, RowExplainer, ScoredTask
+
 class BaseScoringStrategy(ABC):
+    # Scores only depend on the task's own cluster of dependent tasks (weakly
+    # connected component), so clusters can be ranked apart (domain/partitioning)
+    COMPONENT_LOCAL = True
+    # Scores only depend on the task itself and its number of direct dependents
+    # (SmartBalance: with the default dependency measure), so a task can be
+    # scored again on its own (domain/analysis_session)
+    TASK_LOCAL = True
+    # Scores change with the reference date (urgency); forecast_scores() scores
+    # many dates in one batch
+    DATE_DEPENDENT = False
+
     @abstractmethod
-    def score_tasks(self, tasks, config=None, today=None):
+    def evaluate_tasks(self, tasks, config=None, today=None, index=None, columns=None):
+        """
+        tasks: sequence of domain task objects/dicts
+        config: optional configuration overrides
+        today: optional reference date (defaults to date.today())
+        index: optional DependencyIndex built from the same tasks
+        columns: optional batch_scoring.TaskColumns built from the same tasks and today,
+                 shared when several strategies score one task list
+
+        returns: one ScoredTask per task, in input order
+        """
+        pass
+
+    def score_tasks(self, tasks, config=None, today=None, index=None):
         """
         tasks: iterable of domain task objects/dicts
         config: optional configuration overrides
         today: optional reference date (defaults to date.today())
-        
+        index: optional DependencyIndex built from the same tasks
+
         returns: list of enriched task dicts with score, priority_level, explanation
         """
-        pass
+        return [
+            record.as_dict()
+            for record in self.rank_tasks(tasks, config=config, today=today, index=index)
+        ]
+
+    def rank_tasks(self, tasks, config=None, today=None, index=None, columns=None):
+        """Same ranking as score_tasks(), as ScoredTask records that reference the input tasks."""
+        if not isinstance(tasks, Sequence):
+            tasks = list(tasks)
+
+        records = self.evaluate_tasks(tasks, config=config, today=today, index=index, columns=columns)
+        # Sort by score desc; the sort is stable, so ties keep input order
+        records.sort(key=_record_score, reverse=True)
+        return records
+
+    def top_tasks(self, tasks, k, config=None, today=None, index=None, columns=None):
+        """
+        Returns the ScoredTask records of the k best tasks, in the same order as rank_tasks(...)[:k].
+        Strategies override this when they can select without ranking every task.
+        """
+        return self.rank_tasks(tasks, config=config, today=today, index=index, columns=columns)[:k]
+
+    def forecast_scores(self, tasks, columns, offsets, config=None, index=None):
+        """
+        Scores of the tasks on several reference dates at once, for DATE_DEPENDENT strategies.
+
+        columns: batch_scoring.TaskColumns of the tasks, built for the first date
+        offsets: NumPy array of the dates as day offsets from columns.today
+
+        returns: (scores, explain_day), the unrounded scores as a (dates x tasks)
+                 array, and explain_day(row) the explain callable of that date's records
+        """
+        raise NotImplementedError(f"{type(self).__name__} scores do not depend on the date")
 
     def _get_today(self, today=None):
         return today or date.today()
 
+    def _use_batch(self, tasks, columns):
+        return columns is not None or batch_scoring.should_use_batch(tasks)
+
+    def _get_columns(self, tasks, today, index, columns):
+        # Shared columns are reused as is; otherwise they are built for this call only
+        return columns if columns is not None else batch_scoring.TaskColumns(tasks, today, index)
+
     def _determine_priority_level(self, score, thresholds):
         if score >= thresholds.get("HIGH", 8.0):
             return "High"
@@ -23,61 +97,109 @@ class BaseScoringStrategy(ABC):
             return "Medium"
         return "Low"
 
+def _record_score(record):
+    return record.score
+
 class FastestWinsStrategy(BaseScoringStrategy):
-    def score_tasks(self, tasks, config=None, today=None):
+    EXPLANATION = "Fastest Win: {} hours estimated."
+
+    def evaluate_tasks(self, tasks, config=None, today=None, index=None, columns=None):
+        if self._use_batch(tasks, columns):
+            return self._evaluate_batch(self._get_columns(tasks, self._get_today(today), index, columns))
+
         # Prioritize low effort (estimated_hours)
         # Score = 10 - estimated_hours (clamped at 1)
         # Or simply inverse of hours.
         # Let's use a simple linear scale: 1 hour = 10 points, 10 hours = 1 point.
-        
-        scored_tasks = []
-        for task in tasks:
+
+        hours_column = []
+        explain = ColumnExplainer(self.EXPLANATION, hours_column)
+
+        records = []
+        for position, task in enumerate(tasks):
             hours = task.get('estimated_hours', 0) or 0
             if hours <= 0: hours = 0.5 # Avoid division by zero or negative
-            
+
             # Simple formula: 10 / hours, capped at 10
             raw_score = 10.0 / hours if hours > 0 else 10.0
             score = min(raw_score, 10.0)
-            
-            scored_tasks.append({
-                **task,
-                'score': round(score, 2),
-                'priority_level': self._determine_priority_level(score, {}), # Use default thresholds
-                'explanation': f"Fastest Win: {hours} hours estimated."
-            })
-        
-        # Sort by score desc
-        scored_tasks.sort(key=lambda x: x['score'], reverse=True)
-        return scored_tasks
+
+            hours_column.append(hours)
+            records.append(ScoredTask(
+                task, position,
+                round(score, 2),
+                self._determine_priority_level(score, {}), # Use default thresholds
+                explain
+            ))
+
+        return records
+
+    def _evaluate_batch(self, columns):
+        hours = np.where(columns.hours <= 0, 0.5, columns.hours)
+        scores = np.minimum(10.0 / hours, 10.0)
+        hours_column = [h if h > 0 else 0.5 for h in columns.hours_values]
+        return batch_scoring.scored_tasks(
+            columns.tasks, scores, ColumnExplainer(self.EXPLANATION, hours_column)
+        )
 
 class HighImpactStrategy(BaseScoringStrategy):
-    def score_tasks(self, tasks, config=None, today=None):
+    EXPLANATION = "High Impact: Importance {}/10."
+
+    def evaluate_tasks(self, tasks, config=None, today=None, index=None, columns=None):
+        if self._use_batch(tasks, columns):
+            return self._evaluate_batch(self._get_columns(tasks, self._get_today(today), index, columns))
+
         # Prioritize importance directly
-        scored_tasks = []
-        for task in tasks:
+        importance_column = []
+        explain = ColumnExplainer(self.EXPLANATION, importance_column)
+
+        records = []
+        for position, task in enumerate(tasks):
             importance = task.get('importance', 0) or 0
             score = float(importance)
-            
-            scored_tasks.append({
-                **task,
-                'score': round(score, 2),
-                'priority_level': self._determine_priority_level(score, {}),
-                'explanation': f"High Impact: Importance {importance}/10."
-            })
-            
-        scored_tasks.sort(key=lambda x: x['score'], reverse=True)
-        return scored_tasks
+
+            importance_column.append(importance)
+            records.append(ScoredTask(
+                task, position,
+                round(score, 2),
+                self._determine_priority_level(score, {}),
+                explain
+            ))
+
+        return records
+
+    def _evaluate_batch(self, columns):
+        return batch_scoring.scored_tasks(
+            columns.tasks, columns.importance,
+            ColumnExplainer(self.EXPLANATION, columns.importance_values)
+        )
 
 class DeadlineDrivenStrategy(BaseScoringStrategy):
-    def score_tasks(self, tasks, config=None, today=None):
+    DATE_DEPENDENT = True
+
+    NO_DUE_DATE = "No due date."
+    INVALID_DUE_DATE = "Invalid due date."
+    OVERDUE = "Overdue by {} days."
+    DUE_TODAY = "Due today."
+    DUE_IN = "Due in {} days."
+
+    def evaluate_tasks(self, tasks, config=None, today=None, index=None, columns=None):
         today = self._get_today(today)
-        scored_tasks = []
-        
-        for task in tasks:
+        if self._use_batch(tasks, columns):
+            return self._evaluate_batch(self._get_columns(tasks, today, index, columns))
+
+        # Explanations are one template per task, filled with the day count
+        templates = []
+        day_counts = []
+        explain = ColumnExplainer(templates, day_counts)
+
+        records = []
+        for position, task in enumerate(tasks):
+            days = 0
             due_date = task.get('due_date')
             if not due_date:
                 score = 0.0
-                explanation = "No due date."
+                explanation = self.NO_DUE_DATE
             else:
                 # Convert string to date if needed
                 if isinstance(due_date, str):
@@ -85,93 +207,285 @@ class DeadlineDrivenStrategy(BaseScoringStrategy):
                         due_date = date.fromisoformat(due_date)
                     except ValueError:
                         due_date = None
-                
+
                 if due_date:
                     days_until = (due_date - today).days
+                    days = abs(days_until)
                     if days_until < 0:
                         score = 10.0 # Overdue is max priority
-                        explanation = f"Overdue by {abs(days_until)} days."
+                        explanation = self.OVERDUE
                     elif days_until == 0:
                         score = 9.0
-                        explanation = "Due today."
+                        explanation = self.DUE_TODAY
                     else:
                         # Decay score as due date is further away
                         # 1 day = 8, 7 days = 2
                         score = max(0.0, 9.0 - days_until)
-                        explanation = f"Due in {days_until} days."
+                        explanation = self.DUE_IN
                 else:
                     score = 0.0
-                    explanation = "Invalid due date."
-
-            scored_tasks.append({
-                **task,
-                'score': round(score, 2),
-                'priority_level': self._determine_priority_level(score, {}),
-                'explanation': explanation
-            })
-            
-        scored_tasks.sort(key=lambda x: x['score'], reverse=True)
-        return scored_tasks
+                    explanation = self.INVALID_DUE_DATE
+
+            templates.append(explanation)
+            day_counts.append(days)
+            records.append(ScoredTask(
+                task, position,
+                round(score, 2),
+                self._determine_priority_level(score, {}),
+                explain
+            ))
+
+        return records
+
+    def _evaluate_batch(self, columns):
+        scores = batch_scoring.urgency_scores(columns, decay=1.0)
+        return batch_scoring.scored_tasks(
+            columns.tasks, scores, self._batch_explainer(columns.due_state, columns.days_until)
+        )
+
+    def forecast_scores(self, tasks, columns, offsets, config=None, index=None):
+        scores = batch_scoring.urgency_scores(columns, 1.0, offsets)
+        days_until = columns.days_until[None, :] - offsets[:, None]
+
+        def explain_day(row):
+            return self._batch_explainer(columns.due_state, days_until[row])
+        return scores, explain_day
+
+    def _batch_explainer(self, due_state, days_until):
+        templates = []
+        for state, days in zip(due_state.tolist(), days_until.tolist()):
+            if state == batch_scoring.DUE_MISSING:
+                templates.append(self.NO_DUE_DATE)
+            elif state == batch_scoring.DUE_INVALID:
+                templates.append(self.INVALID_DUE_DATE)
+            elif days < 0:
+                templates.append(self.OVERDUE)
+            elif days == 0:
+                templates.append(self.DUE_TODAY)
+            else:
+                templates.append(self.DUE_IN)
+
+        return ColumnExplainer(templates, np.abs(days_until).astype(np.int64))
 
 class SmartBalanceStrategy(BaseScoringStrategy):
-    def score_tasks(self, tasks, config=None, today=None):
+    DATE_DEPENDENT = True
+
+    EXPLANATION = "Smart Score: {:.1f} (U:{:.1f}, I:{}, E:{:.1f})"
+
+    def evaluate_tasks(self, tasks, config=None, today=None, index=None, columns=None):
         today = self._get_today(today)
+        weights = self._get_weights(config)
+
+        dependents_counts, points = self._get_dependents(tasks, config, index)
+
+        if self._use_batch(tasks, columns):
+            columns = self._get_columns(tasks, today, index, columns)
+            return self._evaluate_batch(columns, weights, dependents_counts, points)
+
+        # (total, urgency, importance, effort) per task, kept for the explanations
+        components_rows = []
+        explain = RowExplainer(self.EXPLANATION, components_rows)
+
+        records = []
+        for position, task in enumerate(tasks):
+            dependents_count = self._get_dependents_count(task, position, dependents_counts)
+            components = self._score_components(task, today, weights, dependents_count, points)
+            components_rows.append(components)
+            records.append(self._record(task, position, components[0], explain))
+
+        return records
+
+    def top_tasks(self, tasks, k, config=None, today=None, index=None, columns=None):
+        # Bounded selection: only the k winners are turned into records.
+        # Ties keep input order, exactly like rank_tasks(...)[:k].
+        today = self._get_today(today)
+        weights = self._get_weights(config)
+
+        dependents_counts, points = self._get_dependents(tasks, config, index)
+
+        if self._use_batch(tasks, columns):
+            columns = self._get_columns(tasks, today, index, columns)
+            total, urgency, effort = self._batch_components(columns, weights, dependents_counts, points)
+            explain = ColumnExplainer(self.EXPLANATION, total, urgency, columns.importance, effort)
+            rounded = batch_scoring.round_scores(total)
+            return [
+                self._record(tasks[i], i, total[i].item(), explain)
+                for i in batch_scoring.top_k_order(rounded, k)
+            ]
+
+        def candidates():
+            for position, task in enumerate(tasks):
+                dependents_count = self._get_dependents_count(task, position, dependents_counts)
+                components = self._score_components(task, today, weights, dependents_count, points)
+                yield (-round(components[0], 2), position, task, components)
+
+        winners = heapq.nsmallest(k, candidates())
+        explain = RowExplainer(
+            self.EXPLANATION, {position: components for _, position, _, components in winners}
+        )
+        return [
+            self._record(task, position, components[0], explain)
+            for _, position, task, components in winners
+        ]
+
+    def _get_weights(self, config):
         weights = config.get('weights') if config else None
         if not weights:
             from .scoring_config import DEFAULT_SMART_BALANCE_WEIGHTS
             weights = DEFAULT_SMART_BALANCE_WEIGHTS
-            
-        scored_tasks = []
-        for task in tasks:
-            # 1. Urgency Score (0-10)
-            urgency_score = 0.0
-            due_date = task.get('due_date')
+        return weights
+
+    def _get_dependents(self, tasks, config, index):
+        """
+        Input of the dependency component per task position, and its points per unit.
+
+        config['dependency_measure'] picks the input: "direct" dependents (the default),
+        "transitive" dependents, or "transitive_hours", the estimated hours of all
+        transitive dependents. Transitive measures read a ReachabilityIndex;
+        config['reachability'] can pass one already built for the same tasks.
+        """
+        measure = config.get('dependency_measure', 'direct') if config else 'direct'
+        if measure not in DEPENDENCY_POINTS:
+            raise ValueError(f"Unknown dependency measure: {measure}")
+        points = DEPENDENCY_POINTS[measure]
+
+        if measure == 'direct':
+            return (index.task_dependents_counts() if index is not None else None), points
+
+        reachability = config.get('reachability') or ReachabilityIndex.from_tasks(tasks, index=index)
+        if measure == 'transitive':
+            return reachability.task_dependents_counts(), points
+        return reachability.task_dependents_hours(), points
+
+    def _get_dependents_count(self, task, position, dependents_counts):
+        # Read from the DependencyIndex when given, else a pre-calculated 'dependents_count'.
+        if dependents_counts is not None:
+            return dependents_counts[position]
+        return task.get('dependents_count', 0)
+
+    def _score_components(self, task, today, weights, dependents_count, points=2.0):
+        # 1. Urgency Score (0-10)
+        urgency_score = 0.0
+        due_date = task.get('due_date')
+        if due_date:
+            if isinstance(due_date, str):
+                try:
+                    due_date = date.fromisoformat(due_date)
+                except ValueError:
+                    due_date = None
+
             if due_date:
-                if isinstance(due_date, str):
-                    try:
-                        due_date = date.fromisoformat(due_date)
-                    except ValueError:
-                        due_date = None
-                
-                if due_date:
-                    days_until = (due_date - today).days
-                    if days_until < 0: urgency_score = 10.0
-                    elif days_until == 0: urgency_score = 9.0
-                    else: urgency_score = max(0.0, 9.0 - (days_until * 0.5)) # Slower decay
-            
-            # 2. Importance Score (0-10)
-            importance = float(task.get('importance', 0) or 0)
-            
-            # 3. Effort Score (0-10, lower effort = higher score)
-            hours = task.get('estimated_hours', 0) or 0
-            if hours <= 0: hours = 5.0 # Default if missing
-            effort_score = max(0.0, 10.0 - (hours * 0.5)) # 20 hours = 0 score
-            
-            # 4. Dependency Score (Simple: count of dependents - tasks waiting on this)
-            # Note: This requires a pre-calculated 'dependent_count' or similar.
-            # For now, we'll assume the task dict might have it, or we ignore it.
-            # Let's assume 'dependents_count' is passed in.
-            dependents_count = task.get('dependents_count', 0)
-            dependency_score = min(10.0, dependents_count * 2.0)
-            
-            # Weighted Sum
-            total_score = (
-                (urgency_score * weights.get('urgency', 0)) +
-                (importance * weights.get('importance', 0)) +
-                (effort_score * weights.get('effort', 0)) +
-                (dependency_score * weights.get('dependencies', 0))
-            )
-            
-            # Normalize to 0-10 if weights sum is approx 1
-            # (Assuming weights sum to 1.0)
-            
-            scored_tasks.append({
-                **task,
-                'score': round(total_score, 2),
-                'priority_level': self._determine_priority_level(total_score, {}),
-                'explanation': f"Smart Score: {total_score:.1f} (U:{urgency_score:.1f}, I:{importance}, E:{effort_score:.1f})"
-            })
-            
-        scored_tasks.sort(key=lambda x: x['score'], reverse=True)
-        return scored_tasks
+                days_until = (due_date - today).days
+                if days_until < 0: urgency_score = 10.0
+                elif days_until == 0: urgency_score = 9.0
+                else: urgency_score = max(0.0, 9.0 - (days_until * 0.5)) # Slower decay
+
+        # 2. Importance Score (0-10)
+        importance = float(task.get('importance', 0) or 0)
+
+        # 3. Effort Score (0-10, lower effort = higher score)
+        hours = task.get('estimated_hours', 0) or 0
+        if hours <= 0: hours = 5.0 # Default if missing
+        effort_score = max(0.0, 10.0 - (hours * 0.5)) # 20 hours = 0 score
+
+        # 4. Dependency Score (tasks waiting on this one, or the work they hold; see _get_dependents)
+        dependency_score = min(10.0, dependents_count * points)
+
+        # Weighted Sum
+        total_score = (
+            (urgency_score * weights.get('urgency', 0)) +
+            (importance * weights.get('importance', 0)) +
+            (effort_score * weights.get('effort', 0)) +
+            (dependency_score * weights.get('dependencies', 0))
+        )
+
+        # Normalize to 0-10 if weights sum is approx 1
+        # (Assuming weights sum to 1.0)
+        return total_score, urgency_score, importance, effort_score
+
+    def _record(self, task, position, total_score, explain):
+        return ScoredTask(
+            task, position,
+            round(total_score, 2),
+            self._determine_priority_level(total_score, {}),
+            explain
+        )
+
+    def component_scores(self, columns, dependents_counts=None, points=2.0, offsets=None):
+        """
+        Unweighted (urgency, importance, effort, dependency) score columns of batch_scoring.TaskColumns.
+        With day offsets, urgency has one row per reference date (see batch_scoring.urgency_scores).
+        """
+        urgency = batch_scoring.urgency_scores(columns, 0.5, offsets)
+        effort = batch_scoring.effort_scores(columns)
+        if dependents_counts is None:
+            dependents = columns.dependents_count
+        else:
+            dependents = np.array(dependents_counts, dtype=np.float64)
+        dependency = batch_scoring.dependency_scores(dependents, points)
+        return urgency, columns.importance, effort, dependency
+
+    def _batch_components(self, columns, weights, dependents_counts=None, points=2.0):
+        urgency, importance, effort, dependency = self.component_scores(columns, dependents_counts, points)
+        return self._weighted_total(weights, urgency, importance, effort, dependency), urgency, effort
+
+    def _weighted_total(self, weights, urgency, importance, effort, dependency):
+        # Same order of additions as _score_components, so the floats match the loop
+        return (
+            (urgency * weights.get('urgency', 0)) +
+            (importance * weights.get('importance', 0)) +
+            (effort * weights.get('effort', 0)) +
+            (dependency * weights.get('dependencies', 0))
+        )
+
+    def forecast_scores(self, tasks, columns, offsets, config=None, index=None):
+        # Only urgency depends on the date: the other components are computed once
+        weights = self._get_weights(config)
+        dependents_counts, points = self._get_dependents(tasks, config, index)
+        urgency, importance, effort, dependency = self.component_scores(
+            columns, dependents_counts, points, offsets
+        )
+        total = self._weighted_total(weights, urgency, importance, effort, dependency)
+
+        def explain_day(row):
+            return ColumnExplainer(self.EXPLANATION, total[row], urgency[row], importance, effort)
+        return total, explain_day
+
+    def _evaluate_batch(self, columns, weights, dependents_counts=None, points=2.0):
+        total, urgency, effort = self._batch_components(columns, weights, dependents_counts, points)
+        explain = ColumnExplainer(self.EXPLANATION, total, urgency, columns.importance, effort)
+        return batch_scoring.scored_tasks(columns.tasks, total, explain)
+
+class CriticalPathStrategy(BaseScoringStrategy):
+    EXPLANATION = "Critical Path: slack {:.1f}h, {:.1f}h of work from here, can start after {:.1f}h."
+    # Slack is measured against the longest chain of work of the whole task list
+    COMPONENT_LOCAL = False
+    TASK_LOCAL = False
+
+    def evaluate_tasks(self, tasks, config=None, today=None, index=None, columns=None):
+        # Tasks on the longest chain of work (zero slack) score 10; the more a task
+        # can slip without delaying the whole plan, the lower its score.
+        if index is None:
+            index = DependencyIndex.from_tasks(tasks)
+        path = critical_path(index, index.node_hours(tasks))
+        task_components = [path.component_of[node] for node in index.task_nodes]
+        explain = ColumnExplainer(
+            self.EXPLANATION,
+            [path.slack[c] for c in task_components],
+            [path.remaining[c] for c in task_components],
+            [path.earliest_start[c] for c in task_components],
+        )
+
+        records = []
+        for position, task in enumerate(tasks):
+            slack = path.slack[task_components[position]]
+            score = 10.0 * (1.0 - slack / path.length) if path.length > 0 else 10.0
+
+            records.append(ScoredTask(
+                task, position,
+                round(score, 2),
+                self._determine_priority_level(score, {}),
+                explain
+            ))
 
+        return records
@@ -0,0 +1,110 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from datetime import date
+
+_NO_DATE = 0
+_MISSING = object()
+
+
+class TaskRow(Mapping):
+    """Read-only dict view of one task in a TaskColumnStore."""
+
+    __slots__ = ('_store', '_position')
+
+    def __init__(self, store, position):
+        self._store = store
+        self._position = position
+
+    def __getitem__(self, key):
+        value = self._store.value(self._position, key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self._store.value(self._position, key)
+        return default if value is _MISSING else value
+
+    def __iter__(self):
+        for key in TaskColumnStore.FIELDS:
+            if self._store.value(self._position, key) is not _MISSING:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class TaskColumnStore(Sequence):
+    """
+    Validated tasks kept as compact columns instead of one dict per task.
+
+    Numbers live in typed arrays, due dates as ordinals and dependencies as one
+    flat id array with offsets. An integer column holding a value beyond 64 bits
+    (the serializer accepts any int) falls back to a plain list. Indexing returns a TaskRow view, so strategies,
+    DependencyIndex and AnalyzeTasksUseCase read it like a list of task dicts.
+    """
+
+    FIELDS = ('id', 'title', 'due_date', 'estimated_hours', 'importance', 'dependencies')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.has_id = bytearray()
+        self.titles = []
+        self.due_ordinals = array('l')
+        self.estimated_hours = array('d')
+        self.importance = array('q')
+        self.dependency_offsets = array('q', [0])
+        self.dependency_ids = array('q')
+
+    def append(self, task):
+        t_id = task.get('id')
+        self.has_id.append(t_id is not None)
+        self._extend('ids', [t_id if t_id is not None else 0])
+        self.titles.append(task['title'])
+        due_date = task.get('due_date')
+        self.due_ordinals.append(due_date.toordinal() if due_date else _NO_DATE)
+        self.estimated_hours.append(task['estimated_hours'])
+        self._extend('importance', [task['importance']])
+        self._extend('dependency_ids', task.get('dependencies', []))
+        self.dependency_offsets.append(len(self.dependency_ids))
+
+    def _extend(self, column, values):
+        values = list(values)
+        current = getattr(self, column)
+        if isinstance(current, array):
+            try:
+                # Converted first, so a value that does not fit leaves the column untouched
+                values = array(current.typecode, values)
+            except OverflowError:
+                current = list(current)
+                setattr(self, column, current)
+        current.extend(values)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [TaskRow(self, i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return TaskRow(self, position)
+
+    def value(self, position, key):
+        if key == 'id':
+            return self.ids[position] if self.has_id[position] else _MISSING
+        elif key == 'title':
+            return self.titles[position]
+        elif key == 'due_date':
+            ordinal = self.due_ordinals[position]
+            return date.fromordinal(ordinal) if ordinal != _NO_DATE else None
+        elif key == 'estimated_hours':
+            return self.estimated_hours[position]
+        elif key == 'importance':
+            return self.importance[position]
+        elif key == 'dependencies':
+            start, end = self.dependency_offsets[position], self.dependency_offsets[position + 1]
+            return list(self.dependency_ids[start:end])
+        return _MISSING
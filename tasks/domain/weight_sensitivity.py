@@ -0,0 +1,133 @@
+from itertools import product
+
+from . import batch_scoring
+from .batch_scoring import np
+
+# SmartBalance weight vector components, in the order the strategy adds them up
+WEIGHT_COMPONENTS = ("urgency", "importance", "effort", "dependencies")
+
+# Largest score magnitude whose hundredths fit the int64 codes of batch_scoring.score_codes()
+MAX_SCORE_MAGNITUDE = 2.0 ** 62 / 100
+
+
+def weight_grid(grid, base):
+    """
+    Every combination of the values a grid ({component: [values]}) lists, as
+    weight dicts; components the grid leaves out keep their value in `base`.
+    """
+    names = [name for name in WEIGHT_COMPONENTS if name in grid]
+    return [
+        {**base, **dict(zip(names, values))}
+        for values in product(*(grid[name] for name in names))
+    ]
+
+
+def weight_matrix(weightings):
+    # One row per weight dict; missing components weigh 0, as in SmartBalanceStrategy
+    return np.array(
+        [[float(weights.get(name, 0)) for name in WEIGHT_COMPONENTS] for weights in weightings],
+        dtype=np.float64,
+    ).reshape(-1, len(WEIGHT_COMPONENTS))
+
+
+def weighted_scores(components, matrix):
+    """
+    SmartBalance totals of every task under every weighting: the (weightings x
+    tasks) product of the weight matrix and the component columns. It is added
+    up one component at a time, in the strategy's order, so every total is the
+    float SmartBalanceStrategy computes for the same weights.
+    """
+    total = None
+    for column, weights in zip(components, matrix.T):
+        term = weights[:, None] * column[None, :]
+        total = term if total is None else total + term
+    return total
+
+
+def score_bound(components, matrix):
+    """
+    Upper bound of the magnitude of every weighted_scores() total: inf when a
+    total could overflow, nan for non-finite inputs.
+    """
+    bound = 0.0
+    with np.errstate(over='ignore', invalid='ignore'):
+        for column, weights in zip(components, matrix.T):
+            bound += np.abs(weights).max(initial=0.0) * np.abs(column).max(initial=0.0)
+    return float(bound)
+
+
+class KendallTau:
+    """
+    Kendall tau-b of rankings against a reference ranking, over the tasks at the
+    head of the reference ranking. Tau counts concordant and discordant task
+    pairs, so it is quadratic in the head length: the tasks that matter are the
+    ones near the top, and a bounded head keeps hundreds of rankings cheap.
+    """
+
+    def __init__(self, reference_codes, reference_order, max_tasks):
+        self.head = reference_order[:max_tasks]
+        self.first, self.second = np.triu_indices(len(self.head), 1)
+        self.reference_signs = self._signs(reference_codes[None, self.head])[0]
+        self.reference_pairs = np.count_nonzero(self.reference_signs)
+
+    def __len__(self):
+        return len(self.head)
+
+    def taus(self, codes):
+        """Tau of every row of score codes; nan where one of the two rankings ties every pair."""
+        signs = self._signs(codes[:, self.head])
+        concordance = (signs * self.reference_signs).sum(axis=1, dtype=np.int64)
+        pairs = np.count_nonzero(signs, axis=1) * float(self.reference_pairs)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(pairs > 0, concordance / np.sqrt(pairs), np.nan)
+
+    def _signs(self, head_codes):
+        first = head_codes[:, self.first]
+        second = head_codes[:, self.second]
+        return (first > second).view(np.int8) - (first < second).view(np.int8)
+
+
+class WeightSensitivity:
+    """
+    Rank stability of a task list under many SmartBalance weightings.
+
+    The component columns (urgency, importance, effort, dependency scores) are
+    computed once; each chunk of weightings is one product with them, scored,
+    rounded and ranked as a block. Only per-task aggregates are kept across
+    chunks, so memory grows with chunk_size x tasks, not with the weightings.
+
+    tops: positions of the top_k tasks of every weighting, in rank order
+    top_counts: per task, how many weightings rank it in their top_k
+    best_ranks / worst_ranks: per task, its best and worst rank (0 = first)
+    taus: Kendall tau-b of every weighting against the reference weighting
+    """
+
+    def __init__(self, components, matrix, reference, top_k, tau_tasks, chunk_size=64):
+        task_count = len(components[0])
+        self.top_k = min(top_k, task_count)
+
+        reference_codes = batch_scoring.score_codes(weighted_scores(components, reference[None, :]))
+        reference_order = batch_scoring.rank_orders(reference_codes)[0]
+        self.reference_ranks = np.empty(task_count, dtype=np.int64)
+        self.reference_ranks[reference_order] = np.arange(task_count)
+        self.reference_top = reference_order[:self.top_k]
+        tau = KendallTau(reference_codes[0], reference_order, tau_tasks)
+        self.tau_tasks = len(tau)
+
+        self.tops = np.empty((len(matrix), self.top_k), dtype=np.int64)
+        self.taus = np.empty(len(matrix), dtype=np.float64)
+        self.best_ranks = np.full(task_count, task_count, dtype=np.int64)
+        self.worst_ranks = np.full(task_count, -1, dtype=np.int64)
+        positions = np.arange(task_count)
+        for start in range(0, len(matrix), chunk_size):
+            chunk = matrix[start:start + chunk_size]
+            codes = batch_scoring.score_codes(weighted_scores(components, chunk))
+            orders = batch_scoring.rank_orders(codes)
+            ranks = np.empty_like(orders)
+            np.put_along_axis(ranks, orders, np.broadcast_to(positions, orders.shape), axis=1)
+
+            self.tops[start:start + len(chunk)] = orders[:, :self.top_k]
+            self.taus[start:start + len(chunk)] = tau.taus(codes)
+            np.minimum(self.best_ranks, ranks.min(axis=0), out=self.best_ranks)
+            np.maximum(self.worst_ranks, ranks.max(axis=0), out=self.worst_ranks)
+        self.top_counts = np.bincount(self.tops.ravel(), minlength=task_count)
@@ -0,0 +1,54 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from tasks.benchmarks.generators import WORKLOADS
+from tasks.benchmarks.results import save_results
+from tasks.benchmarks.suites import LAYERS, run_benchmarks
+
+
+def _names(value, choices, option):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in choices]
+    if unknown or not names:
+        raise CommandError(f"{option} must be a comma separated list of: {', '.join(choices)}")
+    return names
+
+
+class Command(BaseCommand):
+    help = "Times each layer (strategies, dependency graph, use case, serializers, views) on synthetic task graphs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='benchmark.json', help="JSON file to write the results to.")
+        parser.add_argument('--layers', default=','.join(LAYERS), help="Comma separated layers to run.")
+        parser.add_argument('--workloads', default=','.join(WORKLOADS), help="Comma separated workloads to run.")
+        parser.add_argument('--sizes', default='1000,10000', help="Comma separated task counts.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the workload generators.")
+
+    def handle(self, *args, **options):
+        layers = _names(options['layers'], LAYERS, '--layers')
+        workloads = _names(options['workloads'], tuple(WORKLOADS), '--workloads')
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError("--sizes must be a comma separated list of integers")
+        if options['repeat'] < 1 or any(size < 1 for size in sizes):
+            raise CommandError("--repeat and --sizes must be positive")
+
+        if 'views' in layers:
+            # The views are called through the test client, which needs 'testserver' allowed
+            setup_test_environment()
+            # mixed_dates posts invalid tasks on purpose; don't log every 400
+            logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        def progress(key, result):
+            self.stdout.write(f"{key:<60} {result['median'] * 1000:10.2f} ms")
+
+        results = run_benchmarks(
+            layers=layers, workloads=workloads, sizes=sizes,
+            repeat=options['repeat'], seed=options['seed'], progress=progress,
+        )
+        save_results(options['output'], results, seed=options['seed'], repeat=options['repeat'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}."))
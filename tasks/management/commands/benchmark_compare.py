@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.benchmarks.results import compare_results, load_results
+
+
+def _ms(seconds):
+    return '-' if seconds is None else f"{seconds * 1000:.2f}"
+
+
+class Command(BaseCommand):
+    help = "Compares two benchmark runs and fails when a benchmark got slower than the threshold."
+
+    def add_arguments(self, parser):
+        parser.add_argument('base', help="Results of the reference run.")
+        parser.add_argument('new', help="Results of the run to check.")
+        parser.add_argument('--threshold', type=float, default=0.10,
+                            help="Slowdown, as a fraction, that counts as a regression (default 0.10).")
+        parser.add_argument('--min-delta', type=float, default=0.0005,
+                            help="Ignore differences smaller than this many seconds (default 0.0005).")
+        parser.add_argument('--stat', choices=['median', 'min', 'mean'], default='median')
+        parser.add_argument('--all', action='store_true', help="List unchanged benchmarks too.")
+
+    def handle(self, *args, **options):
+        comparisons = compare_results(
+            load_results(options['base']), load_results(options['new']),
+            threshold=options['threshold'], min_delta=options['min_delta'], stat=options['stat'],
+        )
+
+        self.stdout.write(f"{'benchmark':<60} {'base ms':>10} {'new ms':>10} {'ratio':>7}  status")
+        for comparison in comparisons:
+            if comparison.status == 'ok' and not options['all']:
+                continue
+            ratio = '-' if comparison.ratio is None else f"{comparison.ratio:.2f}x"
+            line = (f"{comparison.key:<60} {_ms(comparison.base):>10} {_ms(comparison.new):>10} "
+                    f"{ratio:>7}  {comparison.status}")
+            if comparison.status == 'regression':
+                line = self.style.ERROR(line)
+            elif comparison.status == 'improvement':
+                line = self.style.SUCCESS(line)
+            self.stdout.write(line)
+
+        regressions = sum(comparison.status == 'regression' for comparison in comparisons)
+        if regressions:
+            raise CommandError(f"{regressions} benchmark(s) regressed by more than {options['threshold']:.0%}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions in {len(comparisons)} benchmarks."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task
+from tasks.services.task_scores import (
+    backfill_missing_scores,
+    refresh_cycle_flags,
+    refresh_stale_scores,
+    refresh_task_scores,
+)
+
+
+class Command(BaseCommand):
+    help = "Refreshes the materialized TaskScore table (run once a day, after midnight)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Recompute every task and strategy instead of only stale and missing rows.",
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            refreshed = refresh_task_scores(Task.objects.values_list('id', flat=True))
+            refresh_cycle_flags()
+            self.stdout.write(self.style.SUCCESS(f"Recomputed scores for {refreshed} tasks."))
+            return
+
+        stale = refresh_stale_scores()
+        missing = backfill_missing_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {stale} date-dependent tasks, backfilled {missing} tasks."
+        ))
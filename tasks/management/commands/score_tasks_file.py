@@ -0,0 +1,75 @@
+import os
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.services.analyze_tasks import STRATEGIES
+from tasks.services.offline_scoring import ScoreTaskFileUseCase
+from tasks.task_files import FILE_FORMATS, file_format
+
+
+class Command(BaseCommand):
+    help = (
+        "Ranks a JSON, NDJSON or CSV task file too large for the API, the way /api/tasks/analyze/ "
+        "would, and writes the results as JSON, NDJSON or CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Task file: a JSON array, NDJSON (one task per line) or CSV.")
+        parser.add_argument('output', help="Result file, or - for standard output.")
+        parser.add_argument('--strategy', default='smart_balance', choices=list(STRATEGIES))
+        parser.add_argument('--input-format', choices=FILE_FORMATS, help="Default: from the file extension.")
+        parser.add_argument('--output-format', choices=FILE_FORMATS, help="Default: from the file extension, else NDJSON.")
+        parser.add_argument('--limit', type=int, help="Write only the top N results.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Scoring processes; 1 scores in this process. Default: one per CPU.")
+        parser.add_argument('--chunk-size', type=int, default=50_000, help="Tasks scored per chunk.")
+        parser.add_argument('--today', type=date.fromisoformat, help="Reference date (YYYY-MM-DD). Default: today.")
+        parser.add_argument('--temp-dir', help="Directory for the sorted runs. Default: the system temp directory.")
+
+    def handle(self, *args, **options):
+        if options['limit'] is not None and options['limit'] < 1:
+            raise CommandError("--limit must be positive")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive")
+        output = options['output']
+        try:
+            input_format = file_format(options['input'], options['input_format'])
+            if output == '-':
+                output_format = options['output_format'] or 'ndjson'
+            else:
+                output_format = file_format(output, options['output_format'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        use_case = ScoreTaskFileUseCase(
+            options['strategy'], workers=options['workers'], chunk_size=options['chunk_size'],
+            today=options['today'], temp_dir=options['temp_dir'],
+        )
+
+        def progress(stage, done, seconds):
+            self.stderr.write(f"{stage}: {done} tasks, {done / seconds:,.0f} tasks/s")
+
+        # Results go to a partial file first: a failed run leaves no half written output
+        partial = f"{output}.partial"
+        try:
+            if output == '-':
+                report = use_case.execute(options['input'], input_format, sys.stdout, output_format,
+                                          limit=options['limit'], progress=progress)
+            else:
+                with open(partial, 'w', encoding='utf-8', newline='') as file:
+                    report = use_case.execute(options['input'], input_format, file, output_format,
+                                              limit=options['limit'], progress=progress)
+                os.replace(partial, output)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        finally:
+            if output != '-' and os.path.exists(partial):
+                os.remove(partial)
+
+        stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in report.durations.items())
+        self.stderr.write(self.style.SUCCESS(
+            f"Ranked {report.tasks} tasks, wrote {report.written} results "
+            f"({report.throughput:,.0f} tasks/s; {stages})."
+        ))
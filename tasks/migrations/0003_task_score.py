@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('strategy', models.CharField(max_length=32)),
+                ('score', models.FloatField()),
+                ('priority_level', models.CharField(max_length=16)),
+                ('explanation', models.TextField()),
+                ('has_cycle', models.BooleanField(default=False)),
+                ('computed_on', models.DateField()),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='tasks.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['strategy', '-score', 'task'], name='taskscore_rank_idx'), models.Index(fields=['strategy', 'computed_on'], name='taskscore_computed_on_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'strategy'), name='unique_task_strategy_score')],
+            },
+        ),
+    ]
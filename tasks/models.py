@@ -1,5 +1,45 @@
 from django.db import models
 
+
+class TaskQuerySet(models.QuerySet):
+    def iter_task_dicts(self, chunk_size=1000):
+        """
+        Yields the same dicts as Task.to_dict() without building model instances.
+
+        Rows are read in primary-key chunks; each chunk costs two queries (task
+        columns and the dependencies through table) instead of one per task.
+        """
+        through = Task.dependencies.through
+        last_pk = None
+        while True:
+            chunk = self.order_by('pk')
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            rows = list(chunk.values('id', 'title', 'due_date', 'estimated_hours', 'importance')[:chunk_size])
+            if not rows:
+                return
+
+            by_id = {}
+            for row in rows:
+                row['dependencies'] = []
+                by_id[row['id']] = row
+
+            # A pk range instead of IN (...) keeps the query size independent of chunk_size
+            edges = through.objects.filter(
+                from_task_id__gte=rows[0]['id'], from_task_id__lte=rows[-1]['id']
+            ).order_by('id').values_list('from_task_id', 'to_task_id')
+            for from_id, to_id in edges:
+                row = by_id.get(from_id)
+                if row is not None:
+                    row['dependencies'].append(to_id)
+
+            yield from rows
+            last_pk = rows[-1]['id']
+
+    def task_dicts(self, chunk_size=1000):
+        return list(self.iter_task_dicts(chunk_size=chunk_size))
+
+
 class Task(models.Model):
     title = models.CharField(max_length=255)
     due_date = models.DateField(null=True, blank=True)
@@ -10,6 +50,14 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['due_date'], name='task_due_date_idx'),
+            models.Index(fields=['-importance'], name='task_importance_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -23,3 +71,28 @@ class Task(models.Model):
             'importance': self.importance,
             'dependencies': [d.id for d in self.dependencies.all()]
         }
+
+
+class TaskScore(models.Model):
+    """Materialized score of a stored Task under one strategy, kept fresh by tasks.signals."""
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='scores')
+    strategy = models.CharField(max_length=32)
+    score = models.FloatField()
+    priority_level = models.CharField(max_length=16)
+    explanation = models.TextField()
+    has_cycle = models.BooleanField(default=False)
+    # Reference date the score was computed for; urgency changes when the day rolls over
+    computed_on = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'strategy'], name='unique_task_strategy_score'),
+        ]
+        indexes = [
+            models.Index(fields=['strategy', '-score', 'task'], name='taskscore_rank_idx'),
+            models.Index(fields=['strategy', 'computed_on'], name='taskscore_computed_on_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id} {self.strategy}: {self.score}"
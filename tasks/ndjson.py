@@ -0,0 +1,68 @@
+from math import isfinite
+
+from .domain.task_store import TaskColumnStore
+from rest_framework.exceptions import ValidationError
+
+from .parsers import loads
+from .renderers import ScoredTaskEncoder
+from .serializers import NON_FINITE_HOURS, BulkTaskInputValidator
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# Stop reading after this many invalid lines; the error report stays small
+MAX_REPORTED_ERRORS = 100
+# Result rows rendered per chunk of the streaming response
+STREAM_CHUNK_ROWS = 1000
+
+
+def read_ndjson_tasks(lines):
+    """
+    Parses and validates one task per line into a TaskColumnStore.
+
+    Returns (store, errors); errors carry the 1-based line number and the
+    same error dict TaskInputSerializer reports for that task. Non-finite
+    hours are rejected too: results are streamed, and NaN is not JSON.
+    """
+    store = TaskColumnStore()
+    errors = []
+    validator = BulkTaskInputValidator(None)
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            item = loads(line)
+        except ValueError:
+            errors.append({'line': line_number, 'errors': {'non_field_errors': ['Invalid JSON.']}})
+        else:
+            try:
+                task = validator.validate_item(item)
+            except ValidationError as exc:
+                errors.append({'line': line_number, 'errors': exc.detail})
+            else:
+                if isfinite(task['estimated_hours']):
+                    store.append(task)
+                else:
+                    errors.append({'line': line_number, 'errors': {'estimated_hours': [NON_FINITE_HOURS]}})
+
+        if len(errors) >= MAX_REPORTED_ERRORS:
+            break
+
+    return store, errors
+
+
+def iter_ndjson_results(records):
+    """Yields ScoredTask records as AnalysisResultSerializer-shaped NDJSON rows, a chunk at a time."""
+    # Strict like the JSON renderer: NaN and infinities are not JSON, so not NDJSON either
+    encode = ScoredTaskEncoder().encode
+    rows = []
+    for record in records:
+        rows.append(encode(record))
+        if len(rows) >= STREAM_CHUNK_ROWS:
+            yield ('\n'.join(rows) + '\n').encode('utf-8')
+            rows = []
+
+    if rows:
+        yield ('\n'.join(rows) + '\n').encode('utf-8')
@@ -0,0 +1,54 @@
+import codecs
+import io
+import json
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import fast_json_enabled, orjson
+
+# orjson reads integers beyond 64 bits as floats: bodies with 19 digits in a row go to json.
+# Mapping every digit to 0 and searching for the run is much faster than a regex scan.
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+_LONG_DIGITS = b'0' * 19
+
+_REJECTED = object()
+
+
+def _orjson_loads(data):
+    # The parsed bytes, or _REJECTED when json has to parse them: orjson takes a subset of
+    # what json does (no NaN or infinities, no surrogates in the raw bytes)
+    if _LONG_DIGITS in data.translate(_DIGITS_TO_ZERO):
+        return _REJECTED
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return _REJECTED
+
+
+def loads(data):
+    """json.loads(), through orjson for bytes when the fast codec is on: same value or same error."""
+    if isinstance(data, bytes) and fast_json_enabled():
+        value = _orjson_loads(data)
+        if value is not _REJECTED:
+            return value
+    return json.loads(data)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser that parses UTF-8 bodies with orjson when FAST_JSON_CODEC is on.
+    Bodies orjson rejects or could read differently go through JSONParser, so
+    the data and the ParseError messages are the same either way.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if not fast_json_enabled() or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        data = _orjson_loads(body)
+        if data is _REJECTED:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        return data
@@ -0,0 +1,257 @@
+import json
+from datetime import date
+from json.encoder import encode_basestring, encode_basestring_ascii
+from math import isfinite
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library codec is used instead
+    orjson = None
+
+
+def fast_json_enabled():
+    """True when FAST_JSON_CODEC is on in settings and orjson is installed."""
+    return orjson is not None and getattr(settings, 'FAST_JSON_CODEC', False)
+
+
+class RenderedJSON(bytes):
+    """A response body already rendered to JSON; ScoredTaskJSONRenderer sends it as is."""
+
+
+class ScoredTaskEncoder:
+    """
+    Encodes ScoredTask records to the same JSON text as AnalysisResultSerializer
+    data passed through json.dumps, reading fields straight off the record and
+    its task instead of building a result dict per task.
+    """
+
+    def __init__(self, ensure_ascii=False, compact=True, allow_nan=False):
+        self.ensure_ascii = ensure_ascii
+        self.encode_string = encode_basestring_ascii if ensure_ascii else encode_basestring
+        self.item_separator, self.key_separator = (',', ':') if compact else (', ', ': ')
+        self.allow_nan = allow_nan
+
+        def key(name):
+            return f'"{name}"{self.key_separator}'
+
+        self.keys = {
+            name: key(name)
+            for name in ('id', 'title', 'due_date', 'estimated_hours', 'importance',
+                         'score', 'priority_level', 'explanation', 'has_cycle')
+        }
+
+    def encode(self, record):
+        task = record.task
+        keys = self.keys
+        string = self.encode_string
+        number = self._number
+        parts = []
+
+        # id is optional in AnalysisResultSerializer: left out when the task has none
+        if 'id' in task:
+            t_id = task['id']
+            parts.append(keys['id'] + ('null' if t_id is None else str(int(t_id))))
+
+        title = task['title']
+        parts.append(keys['title'] + ('null' if title is None else string(str(title))))
+
+        due_date = task.get('due_date')
+        if not due_date:
+            due_date = 'null'
+        else:
+            # DateField passes strings through unchanged
+            due_date = string(due_date if isinstance(due_date, str) else due_date.isoformat())
+        parts.append(keys['due_date'] + due_date)
+
+        hours = task['estimated_hours']
+        parts.append(keys['estimated_hours'] + ('null' if hours is None else number(float(hours))))
+        importance = task['importance']
+        parts.append(keys['importance'] + ('null' if importance is None else str(int(importance))))
+
+        parts.append(keys['score'] + number(float(record.score)))
+        parts.append(keys['priority_level'] + string(record.priority_level))
+        parts.append(keys['explanation'] + string(record.explanation))
+        parts.append(keys['has_cycle'] + ('true' if record.has_cycle else 'false'))
+
+        return '{' + self.item_separator.join(parts) + '}'
+
+    def encode_list(self, records):
+        return '[' + self.item_separator.join(map(self.encode, records)) + ']'
+
+    def encode_rankings(self, rankings):
+        # {strategy_name: records} as one JSON object of result lists
+        return '{' + self.item_separator.join(
+            self.encode_string(name) + self.key_separator + self.encode_list(records)
+            for name, records in rankings.items()
+        ) + '}'
+
+    def encode_results(self, records, fields):
+        # {**fields, "results": records}
+        return self._with_fields(fields, 'results', self.encode_list(records))
+
+    def encode_ranking_results(self, rankings, fields):
+        # {**fields, "rankings": {name: records}}
+        return self._with_fields(fields, 'rankings', self.encode_rankings(rankings))
+
+    def _with_fields(self, fields, name, encoded):
+        # fields hold plain JSON values, written as JSONRenderer writes them
+        separators = (self.item_separator, self.key_separator)
+        return '{' + self.item_separator.join([
+            *(self.encode_string(field) + self.key_separator + json.dumps(
+                value, separators=separators, ensure_ascii=self.ensure_ascii, allow_nan=self.allow_nan)
+              for field, value in fields.items()),
+            self.encode_string(name) + self.key_separator + encoded,
+        ]) + '}'
+
+    def _number(self, value):
+        if isfinite(value):
+            return float.__repr__(value)
+        # NaN and infinities: json.dumps raises or writes them, as allow_nan says
+        return json.dumps(value, allow_nan=self.allow_nan)
+
+
+class _Inexact(Exception):
+    """Raised while building orjson input that would not encode like json.dumps."""
+
+
+def _exact_float(value):
+    # orjson writes a float like repr() only in [1e-4, 1e16); outside, repr() uses an exponent
+    value = float(value)
+    if value != 0.0 and not 1e-4 <= abs(value) < 1e16:
+        raise _Inexact
+    return value
+
+
+def _exact_values(value):
+    # Plain JSON values, with every float checked by _exact_float
+    if isinstance(value, float):
+        _exact_float(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _exact_values(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _exact_values(item)
+    return value
+
+
+class OrjsonScoredTaskEncoder:
+    """
+    ScoredTaskEncoder's compact, UTF-8 output from orjson: the records become
+    AnalysisResultSerializer-shaped dicts, dates included as date objects, and
+    one orjson.dumps() call writes them all. Methods return bytes, or None when
+    the bytes could differ from json.dumps: floats repr() writes with an
+    exponent or not at all (NaN, infinities), ints beyond 64 bits, lone surrogates.
+    """
+
+    def encode_list(self, records):
+        return self._dumps(self._results, records)
+
+    def encode_rankings(self, rankings):
+        return self._dumps(lambda: {name: self._results(records) for name, records in rankings.items()})
+
+    def encode_results(self, records, fields):
+        return self._dumps(lambda: {**_exact_values(fields), 'results': self._results(records)})
+
+    def encode_ranking_results(self, rankings, fields):
+        return self._dumps(lambda: {
+            **_exact_values(fields),
+            'rankings': {name: self._results(records) for name, records in rankings.items()},
+        })
+
+    def _dumps(self, build, *args):
+        try:
+            data = orjson.dumps(build(*args))
+        except (_Inexact, TypeError):
+            return None
+        # Same JavaScript-safe escapes as JSONRenderer
+        if b'\xe2\x80' in data:
+            data = data.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return data
+
+    @staticmethod
+    def _results(records):
+        results = []
+        for record in records:
+            task = record.task
+            result = {}
+            if 'id' in task:
+                t_id = task['id']
+                result['id'] = None if t_id is None else int(t_id)
+
+            title = task['title']
+            result['title'] = None if title is None else str(title)
+
+            due_date = task.get('due_date')
+            if not due_date:
+                due_date = None
+            elif type(due_date) is not date and not isinstance(due_date, str):
+                due_date = due_date.isoformat()
+            result['due_date'] = due_date
+
+            hours = task['estimated_hours']
+            result['estimated_hours'] = None if hours is None else _exact_float(hours)
+            importance = task['importance']
+            result['importance'] = None if importance is None else int(importance)
+
+            result['score'] = _exact_float(record.score)
+            result['priority_level'] = record.priority_level
+            result['explanation'] = record.explanation
+            result['has_cycle'] = bool(record.has_cycle)
+            results.append(result)
+        return results
+
+
+class ScoredTaskJSONRenderer(JSONRenderer):
+    """JSONRenderer that also sends RenderedJSON bodies without decoding them again."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, RenderedJSON):
+            if self.get_indent(accepted_media_type, renderer_context or {}) is None:
+                return bytes(data)
+            # Pretty printing was asked for (?format=api, indent=...): render as usual
+            data = json.loads(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+    @classmethod
+    def render_records(cls, records):
+        """Renders ScoredTask records the way render() renders AnalysisResultSerializer data."""
+        return cls._encode('encode_list', records)
+
+    @classmethod
+    def render_rankings(cls, rankings):
+        """Renders {strategy_name: records} as an object of AnalysisResultSerializer lists."""
+        return cls._encode('encode_rankings', rankings)
+
+    @classmethod
+    def render_results(cls, records, **fields):
+        """Renders an object of the given fields plus "results", the records as AnalysisResultSerializer data."""
+        return cls._encode('encode_results', records, fields)
+
+    @classmethod
+    def render_ranking_results(cls, rankings, **fields):
+        """Renders an object of the given fields plus "rankings", {name: records} as in render_rankings()."""
+        return cls._encode('encode_ranking_results', rankings, fields)
+
+    @classmethod
+    def _encode(cls, method, *args):
+        # orjson only writes compact UTF-8; other output options stay with ScoredTaskEncoder
+        if cls.compact and not cls.ensure_ascii and fast_json_enabled():
+            data = getattr(OrjsonScoredTaskEncoder(), method)(*args)
+            if data is not None:
+                return RenderedJSON(data)
+        return cls._rendered(getattr(cls._encoder(), method)(*args))
+
+    @classmethod
+    def _encoder(cls):
+        return ScoredTaskEncoder(
+            ensure_ascii=cls.ensure_ascii, compact=cls.compact, allow_nan=not cls.strict
+        )
+
+    @staticmethod
+    def _rendered(ret):
+        ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return RenderedJSON(ret.encode())
@@ -0,0 +1,88 @@
+import io
+
+from rest_framework.exceptions import ParseError
+from .parsers import FastJSONParser
+from .renderers import ScoredTaskJSONRenderer
+from .serializers import DailyPlanSerializer, task_list_validator
+from .services.analyze_tasks import AnalyzeTasksUseCase, PlanTasksUseCase
+from .services.scoring_pool import JobTimer
+
+# Whole requests of the async views, from raw body to rendered JSON, as plain
+# functions: they run inline for small bodies and in the ScoringPool for large
+# ones. Each returns (status, JSON bytes, its JobTimer with the stage durations).
+
+
+def _parse_tasks(body, timer):
+    # Same parsing as the DRF views; an empty body is an empty payload
+    with timer.stage('parse'):
+        if not body:
+            return {}
+        return FastJSONParser().parse(io.BytesIO(body), 'application/json', {})
+
+
+def _validated_tasks(body, timer):
+    """(validated tasks, None) or (None, error response)."""
+    try:
+        data = _parse_tasks(body, timer)
+    except ParseError as e:
+        return None, _render(400, {'detail': e.detail}, timer)
+
+    with timer.stage('validate'):
+        serializer = task_list_validator(data)
+        if not serializer.is_valid():
+            return None, _render(400, serializer.errors, timer)
+    timer.label(task_count=len(serializer.validated_data))
+    return serializer.validated_data, None
+
+
+def _render(status, data, timer):
+    return status, ScoredTaskJSONRenderer().render(data), timer
+
+
+def validate_job(body, slot=None):
+    """Parsing and validation only: (200, b'', timer) for a valid task list, else its 400."""
+    timer = JobTimer('validate', slot)
+    _, error = _validated_tasks(body, timer)
+    return error or (200, b'', timer)
+
+
+def analyze_job(body, strategy_names, multiple, today, slot=None):
+    """POST /api/tasks/analyze/; multiple answers as ?strategies= does, keyed by strategy."""
+    timer = JobTimer('analyze', slot)
+    tasks, error = _validated_tasks(body, timer)
+    if error is not None:
+        return error
+
+    use_case = AnalyzeTasksUseCase()
+    try:
+        if multiple:
+            rankings = use_case.rank_many(tasks, strategy_names, today=today, timer=timer)
+        else:
+            results = use_case.rank(tasks, strategy_name=strategy_names[0], today=today, timer=timer)
+    except ValueError as e:
+        return _render(400, {"error": str(e)}, timer)
+
+    with timer.stage('render'):
+        if multiple:
+            content = ScoredTaskJSONRenderer.render_rankings(rankings)
+        else:
+            content = ScoredTaskJSONRenderer.render_records(results)
+    return 200, bytes(content), timer
+
+
+def suggest_job(body, limit, hours, today, slot=None):
+    """POST /api/tasks/suggest/ with a task list: the top `limit`, or a plan for `hours` when given."""
+    timer = JobTimer('suggest', slot)
+    tasks, error = _validated_tasks(body, timer)
+    if error is not None:
+        return error
+
+    if hours is not None:
+        plan = PlanTasksUseCase().execute(tasks, hours, today=today, timer=timer)
+        with timer.stage('serialize'):
+            return _render(200, DailyPlanSerializer(plan).data, timer)
+
+    records = AnalyzeTasksUseCase().rank(tasks, strategy_name="smart_balance", limit=limit, today=today, timer=timer)
+    with timer.stage('render'):
+        content = ScoredTaskJSONRenderer.render_records(records)
+    return 200, bytes(content), timer
@@ -1,6 +1,14 @@
+import math
+from datetime import date
+
 from rest_framework import serializers
+from .domain.scoring_config import MAX_SMART_BALANCE_WEIGHT
+from .domain.weight_sensitivity import WEIGHT_COMPONENTS
 from .models import Task
 
+# Task lists at least this long are validated by BulkTaskInputValidator
+BULK_VALIDATION_MIN_TASKS = 200
+
 class TaskSerializer(serializers.ModelSerializer):
     dependencies = serializers.PrimaryKeyRelatedField(
         many=True, 
@@ -22,6 +30,266 @@ class TaskInputSerializer(serializers.Serializer):
         child=serializers.IntegerField(), required=False, default=list
     )
 
+
+# Larger ints may overflow float(); leave those to FloatField
+_MAX_EXACT_FLOAT_INT = 2 ** 53
+
+
+def _is_plain_int(value):
+    return type(value) is int
+
+
+class BulkTaskInputValidator:
+    """
+    Fast stand-in for TaskInputSerializer(data=..., many=True) on large lists.
+
+    Items made only of plain, already-normalized values (int ids, ASCII titles,
+    ISO date strings, numeric hours, int lists) are validated with direct type
+    checks. Any other item goes through a real TaskInputSerializer, so
+    validated_data and errors are the same as DRF's for every input.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, data):
+        self.initial_data = data
+        self._child = TaskInputSerializer()
+        # Due dates repeat a lot across a backlog; parse each distinct string once
+        self._dates = {}
+
+    def is_valid(self):
+        data = self.initial_data
+        if type(data) is not list:
+            # Not a plain list (QueryDict, dict, None...): leave every edge case to DRF
+            serializer = TaskInputSerializer(data=data, many=True)
+            valid = serializer.is_valid()
+            self._set_result(serializer.validated_data, serializer.errors)
+            return valid
+
+        validate_fast = self.validate_item_fast
+        validated = []
+        invalid = {}
+        for position, item in enumerate(data):
+            task = validate_fast(item)
+            if task is None:
+                try:
+                    task = self._child.run_validation(item)
+                except serializers.ValidationError as exc:
+                    invalid[position] = exc.detail
+                    continue
+            validated.append(task)
+
+        if invalid:
+            # Same shape as ListSerializer: one entry per item, {} for the valid ones
+            self._set_result([], [invalid.get(position, {}) for position in range(len(data))])
+            return False
+
+        self._set_result(validated, [])
+        return True
+
+    @property
+    def validated_data(self):
+        return self._validated_data
+
+    @property
+    def errors(self):
+        return self._errors
+
+    def _set_result(self, validated_data, errors):
+        self._validated_data = validated_data
+        self._errors = errors
+
+    def validate_item(self, item):
+        """Validates one task; raises ValidationError with TaskInputSerializer's error detail."""
+        task = self.validate_item_fast(item)
+        if task is None:
+            task = self._child.run_validation(item)
+        return task
+
+    def validate_item_fast(self, item):
+        """Returns the validated dict, or None when the item needs the full serializer."""
+        if type(item) is not dict:
+            return None
+        missing = self._MISSING
+        task = {}
+
+        t_id = item.get('id', missing)
+        if t_id is not missing:
+            if type(t_id) is not int:
+                return None
+            task['id'] = t_id
+
+        title = item.get('title')
+        if type(title) is not str or not title.isascii() or '\x00' in title:
+            return None
+        title = title.strip()
+        if not title or len(title) > 255:
+            return None
+        task['title'] = title
+
+        due_date = item.get('due_date', missing)
+        if due_date is not missing:
+            if due_date is not None:
+                if type(due_date) is not str:
+                    return None
+                parsed = self._dates.get(due_date)
+                if parsed is None:
+                    try:
+                        parsed = self._dates[due_date] = date.fromisoformat(due_date)
+                    except ValueError:
+                        return None
+                due_date = parsed
+            task['due_date'] = due_date
+
+        hours = item.get('estimated_hours')
+        hours_type = type(hours)
+        if hours_type is int:
+            if not -_MAX_EXACT_FLOAT_INT <= hours <= _MAX_EXACT_FLOAT_INT:
+                return None
+            hours = float(hours)
+        elif hours_type is not float:
+            return None
+        task['estimated_hours'] = hours
+
+        importance = item.get('importance', 5)
+        if type(importance) is not int:
+            return None
+        task['importance'] = importance
+
+        dependencies = item.get('dependencies', missing)
+        if dependencies is missing:
+            task['dependencies'] = []
+        elif type(dependencies) is list and all(map(_is_plain_int, dependencies)):
+            task['dependencies'] = dependencies[:]
+        else:
+            return None
+
+        return task
+
+
+NON_FINITE_HOURS = "Must be a finite number."
+
+
+def non_finite_hours_errors(tasks):
+    """
+    Errors shaped like TaskInputSerializer(many=True) ones, {} for every valid task,
+    when some validated task has NaN or infinite hours; None when all are finite.
+    FloatField lets them through, but they cannot be stored, planned or rendered.
+    """
+    errors = [{} if math.isfinite(task['estimated_hours']) else {'estimated_hours': [NON_FINITE_HOURS]} for task in tasks]
+    return errors if any(errors) else None
+
+
+def task_list_validator(data):
+    """TaskInputSerializer(many=True) for small lists, BulkTaskInputValidator above the threshold."""
+    if type(data) is list and len(data) >= BULK_VALIDATION_MIN_TASKS:
+        return BulkTaskInputValidator(data)
+    return TaskInputSerializer(data=data, many=True)
+
+
+class SessionPatchSerializer(serializers.Serializer):
+    """
+    Body of an analysis session patch (AnalysisSession.apply() arguments).
+
+    `add` holds whole tasks. `update` items are partial: a task id and the fields
+    to change, validated merged into that task of the session (context['tasks']).
+    Dependency edges are [task_id, dependency_id] pairs.
+    """
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    add = serializers.ListField(required=False, default=list)
+    update = serializers.ListField(required=False, default=list)
+    add_dependencies = serializers.ListField(
+        child=serializers.ListField(child=serializers.IntegerField(), min_length=2, max_length=2),
+        required=False, default=list,
+    )
+    remove_dependencies = serializers.ListField(
+        child=serializers.ListField(child=serializers.IntegerField(), min_length=2, max_length=2),
+        required=False, default=list,
+    )
+
+    def validate_add(self, value):
+        validator = task_list_validator(value)
+        if not validator.is_valid():
+            raise serializers.ValidationError(validator.errors)
+        errors = non_finite_hours_errors(validator.validated_data)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return validator.validated_data
+
+    def validate_update(self, value):
+        tasks = self.context['tasks']
+        child = TaskInputSerializer()
+        validated = []
+        errors = {}
+        for position, item in enumerate(value):
+            t_id = item.get('id') if isinstance(item, dict) else None
+            if type(t_id) is not int or t_id not in tasks:
+                errors[position] = {'id': ["Unknown task id."]}
+                continue
+            try:
+                task = child.run_validation({**tasks[t_id], **item})
+            except serializers.ValidationError as exc:
+                errors[position] = exc.detail
+                continue
+            if not math.isfinite(task['estimated_hours']):
+                errors[position] = {'estimated_hours': [NON_FINITE_HOURS]}
+                continue
+            validated.append(task)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return validated
+
+
+def _check_weights(components, values):
+    unknown = sorted(set(components) - set(WEIGHT_COMPONENTS))
+    if unknown:
+        raise serializers.ValidationError(f"Unknown weight components: {', '.join(unknown)}.")
+    if not all(math.isfinite(value) for value in values):
+        raise serializers.ValidationError("Weights must be finite numbers.")
+
+
+class WeightsField(serializers.DictField):
+    """SmartBalance weights: {component: number in [0, MAX_SMART_BALANCE_WEIGHT]}, components of WEIGHT_COMPONENTS."""
+
+    child = serializers.FloatField(min_value=0, max_value=MAX_SMART_BALANCE_WEIGHT)
+
+    def to_internal_value(self, data):
+        weights = super().to_internal_value(data)
+        _check_weights(weights, weights.values())
+        return weights
+
+
+class WeightSensitivitySerializer(serializers.Serializer):
+    """
+    Body of a weight sensitivity analysis: a task list, the SmartBalance weightings
+    to rank it with (`weights`, a list of weight dicts, and/or `grid`, values per
+    component to combine), the `reference` weights rankings are compared with and `top_k`.
+    """
+    tasks = serializers.ListField()
+    weights = serializers.ListField(child=WeightsField(), required=False, default=list)
+    grid = serializers.DictField(
+        child=serializers.ListField(
+            child=serializers.FloatField(min_value=0, max_value=MAX_SMART_BALANCE_WEIGHT), min_length=1,
+        ),
+        required=False,
+    )
+    reference = WeightsField(required=False)
+    top_k = serializers.IntegerField(min_value=1, default=10)
+
+    def validate_tasks(self, value):
+        validator = task_list_validator(value)
+        if not validator.is_valid():
+            raise serializers.ValidationError(validator.errors)
+        errors = non_finite_hours_errors(validator.validated_data)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return validator.validated_data
+
+    def validate_grid(self, value):
+        _check_weights(value, [weight for values in value.values() for weight in values])
+        return value
+
+
 class AnalysisResultSerializer(serializers.Serializer):
     id = serializers.IntegerField(required=False)
     title = serializers.CharField()
@@ -32,3 +300,11 @@ class AnalysisResultSerializer(serializers.Serializer):
     priority_level = serializers.CharField()
     explanation = serializers.CharField()
     has_cycle = serializers.BooleanField(required=False, default=False)
+
+
+class DailyPlanSerializer(serializers.Serializer):
+    budget_hours = serializers.FloatField()
+    planned_hours = serializers.FloatField()
+    total_score = serializers.FloatField()
+    exact = serializers.BooleanField()
+    tasks = AnalysisResultSerializer(many=True)
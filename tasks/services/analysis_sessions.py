@@ -0,0 +1,127 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+
+from tasks.domain.analysis_session import AnalysisSession
+from tasks.services.analyze_tasks import STRATEGIES
+from tasks.services.request_metrics import NULL_TIMER
+
+
+class StoredSession:
+    """An AnalysisSession with the lock its requests hold and its strategy name."""
+
+    __slots__ = ('session_id', 'session', 'strategy_name', 'lock', 'expires_at')
+
+    def __init__(self, session_id, session, strategy_name, expires_at):
+        self.session_id = session_id
+        self.session = session
+        self.strategy_name = strategy_name
+        self.lock = threading.Lock()
+        self.expires_at = expires_at
+
+
+class AnalysisSessionStore:
+    """
+    In-process LRU store of analysis sessions.
+
+    Bounded by session count (max_sessions) and by the tasks of all sessions
+    together (max_tasks), which is what their memory grows with; the least
+    recently used sessions are evicted first. Sessions unused for ttl seconds expire.
+    """
+
+    def __init__(self, max_sessions=256, max_tasks=500_000, ttl=3600):
+        self.max_sessions = max_sessions
+        self.max_tasks = max_tasks
+        self.ttl = ttl
+
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def create(self, tasks, strategy_name="smart_balance", today=None, timer=NULL_TIMER):
+        """Creates a session over the validated tasks; raises ValueError when they do not fit one."""
+        strategy = STRATEGIES.get(strategy_name)
+        if not strategy:
+            raise ValueError(f"Unknown strategy: {strategy_name}")
+        self._check_size(len(tasks))
+
+        with timer.stage('session'):
+            session = AnalysisSession(tasks, strategy, today or date.today())
+        stored = StoredSession(uuid.uuid4().hex, session, strategy_name, time.monotonic() + self.ttl)
+        with self._lock:
+            self._sessions[stored.session_id] = stored
+            self._evict(keep=stored.session_id)
+        return stored
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            stored = self._sessions.get(session_id)
+            if stored is None:
+                return None
+            if stored.expires_at <= now:
+                del self._sessions[session_id]
+                return None
+            stored.expires_at = now + self.ttl
+            self._sessions.move_to_end(session_id)
+            return stored
+
+    def patch(self, stored, patch, today=None, timer=NULL_TIMER):
+        """Applies a validated patch (AnalysisSession.apply() arguments); call with stored.lock held."""
+        session = stored.session
+        self._check_size(len(session) + len(patch.get('add', ())) - len(patch.get('remove', ())))
+        with timer.stage('session'):
+            session.refresh(today or date.today())
+            session.apply(**patch)
+        with self._lock:
+            self._evict(keep=stored.session_id)
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'tasks': sum(len(stored.session) for stored in self._sessions.values()),
+                'evictions': self.evictions,
+                'max_sessions': self.max_sessions,
+                'max_tasks': self.max_tasks,
+                'ttl': self.ttl,
+            }
+
+    def _check_size(self, task_count):
+        if task_count > self.max_tasks:
+            raise ValueError(f"A session holds at most {self.max_tasks} tasks")
+
+    def _evict(self, keep):
+        # Least recently used first, never the session just created or patched
+        total = sum(len(stored.session) for stored in self._sessions.values())
+        while len(self._sessions) > self.max_sessions or total > self.max_tasks:
+            oldest = next(session_id for session_id in self._sessions if session_id != keep)
+            total -= len(self._sessions.pop(oldest).session)
+            self.evictions += 1
+
+
+_session_store = None
+
+
+def get_session_store():
+    global _session_store
+    if _session_store is None:
+        from django.conf import settings
+
+        options = getattr(settings, 'ANALYSIS_SESSIONS', {})
+        _session_store = AnalysisSessionStore(
+            max_sessions=options.get('MAX_SESSIONS', 256),
+            max_tasks=options.get('MAX_TASKS', 500_000),
+            ttl=options.get('TTL', 3600),
+        )
+    return _session_store
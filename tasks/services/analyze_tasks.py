@@ -1,55 +1,276 @@
+from collections.abc import Sequence
+from datetime import date
+
+from tasks.domain import batch_scoring
+from tasks.domain.batch_scoring import np
 from tasks.domain.scoring_strategies import (
     FastestWinsStrategy,
     HighImpactStrategy,
     DeadlineDrivenStrategy,
-    SmartBalanceStrategy
-)
-from tasks.domain.dependency_graph import (
-    build_dependency_graph,
-    detect_cycles,
-    calculate_dependents_count
+    SmartBalanceStrategy,
+    CriticalPathStrategy
 )
+from tasks.domain.dependency_graph import calculate_dependents_count
+from tasks.domain.dependency_index import DependencyIndex
+from tasks.domain.forecast import CROSSING_LEVELS, forecast_dates, level_crossings, threshold_crossings
+from tasks.domain.planner import plan_tasks
+from tasks.domain.scored_task import ScoredTask
+from tasks.services.request_metrics import NULL_TIMER
 
 STRATEGIES = {
     "fastest_wins": FastestWinsStrategy(),
     "high_impact": HighImpactStrategy(),
     "deadline_driven": DeadlineDrivenStrategy(),
     "smart_balance": SmartBalanceStrategy(),
+    "critical_path": CriticalPathStrategy(),
 }
 
+DEFAULT_SUGGESTION_LIMIT = 3
+MAX_FORECAST_DAYS = 90
+
 class AnalyzeTasksUseCase:
-    def execute(self, tasks, strategy_name="smart_balance", config=None):
+    # Every method takes an optional StageTimer (request_metrics) that times its
+    # stages: index, cycles, dependents, columns, score and results.
 
-        strategy = STRATEGIES.get(strategy_name)
-        if not strategy:
-            raise ValueError(f"Unknown strategy: {strategy_name}")
+    def __init__(self, partitioner=None):
+        # Optional ComponentPartitioner (services/partitioned_analysis): large task
+        # lists made of several clusters of dependent tasks are ranked per cluster
+        self.partitioner = partitioner
 
+    def execute(self, tasks, strategy_name="smart_balance", config=None, limit=None, today=None, timer=NULL_TIMER):
 
-        graph = build_dependency_graph(tasks)
-        cycle = detect_cycles(graph)
-        
+        strategy = self._get_strategy(strategy_name)
 
+        with timer.stage('index'):
+            index = DependencyIndex.from_tasks(tasks)
         
-        tasks = calculate_dependents_count(tasks)
+        with timer.stage('dependents'):
+            tasks = calculate_dependents_count(tasks, index=index)
         
+        rankings = self._partitioned({strategy_name: strategy}, tasks, index, config, limit, today, timer)
+        if rankings is not None:
+            records = rankings[strategy_name]
+        else:
+            with timer.stage('cycles'):
+                cycle_nodes = self._cycle_nodes(index)
+            records = self._rank(strategy, tasks, index, cycle_nodes, config, limit, today, timer=timer)
+        with timer.stage('results'):
+            return [record.as_dict() for record in records]
 
-        scored_tasks = strategy.score_tasks(tasks, config=config)
-        
+    def rank(self, tasks, strategy_name="smart_balance", config=None, limit=None, today=None, timer=NULL_TIMER):
+        """
+        Same analysis as execute(), as ScoredTask records in rank order instead of
+        enriched task copies. The tasks are not touched; results are rendered
+        straight from the records.
+        """
+        strategy = self._get_strategy(strategy_name)
+        with timer.stage('index'):
+            index = DependencyIndex.from_tasks(tasks)
+        rankings = self._partitioned({strategy_name: strategy}, tasks, index, config, limit, today, timer)
+        if rankings is not None:
+            return rankings[strategy_name]
+        with timer.stage('cycles'):
+            cycle_nodes = self._cycle_nodes(index)
+        return self._rank(strategy, tasks, index, cycle_nodes, config, limit, today, timer=timer)
+
+    def rank_many(self, tasks, strategy_names, config=None, limit=None, today=None, timer=NULL_TIMER):
+        """
+        rank() for several strategies over one task list, returned as
+        {strategy_name: records}. The dependency index, cycle detection and the
+        batch scoring columns (due date parsing included) are built once and
+        shared by every strategy.
+        """
+        strategies = {name: self._get_strategy(name) for name in strategy_names}
+        if not isinstance(tasks, Sequence):
+            tasks = list(tasks)
+        today = today or date.today()
+
+        with timer.stage('index'):
+            index = DependencyIndex.from_tasks(tasks)
+        rankings = self._partitioned(strategies, tasks, index, config, limit, today, timer)
+        if rankings is not None:
+            return rankings
+        with timer.stage('cycles'):
+            cycle_nodes = self._cycle_nodes(index)
+        columns = None
+        if batch_scoring.should_use_batch(tasks):
+            with timer.stage('columns'):
+                columns = batch_scoring.TaskColumns(tasks, today, index)
+
+        return {
+            name: self._rank(strategy, tasks, index, cycle_nodes, config, limit, today, columns, timer)
+            for name, strategy in strategies.items()
+        }
+
+    def forecast(self, tasks, strategy_name="smart_balance", start=None, days=7, config=None, limit=None, timer=NULL_TIMER):
+        """
+        rank() on each of `days` dates from `start` (default today). Returns
+        {'rankings': {ISO date: records}, 'crossings': [...]}, crossings being the
+        tasks whose priority level rises to Medium or High (PRIORITY_THRESHOLDS)
+        within the range, with the first date on which it does.
+
+        With NumPy, date-dependent strategies score every date in one batch: the
+        date-free components once, urgency over a (dates x tasks) array. The
+        other strategies rank once; their ranking holds on every date.
+        """
+        strategy = self._get_strategy(strategy_name)
+        if not 1 <= days <= MAX_FORECAST_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_FORECAST_DAYS}")
+        if not isinstance(tasks, Sequence):
+            tasks = list(tasks)
+        dates = forecast_dates(start or date.today(), days)
+
+        with timer.stage('index'):
+            index = DependencyIndex.from_tasks(tasks)
+        with timer.stage('cycles'):
+            cycle_nodes = self._cycle_nodes(index)
+
+        if not strategy.DATE_DEPENDENT:
+            records = self._rank(strategy, tasks, index, cycle_nodes, config, limit, dates[0], timer=timer)
+            rankings = [records] * days
+            crossings = {}
+        elif batch_scoring.is_available():
+            rankings, crossings = self._forecast_batch(strategy, tasks, index, cycle_nodes, config, limit, dates, timer)
+        else:
+            rankings = []
+            levels_by_date = []
+            for day in dates:
+                records = self._rank(strategy, tasks, index, cycle_nodes, config, None, day, timer=timer)
+                levels = [None] * len(tasks)
+                for record in records:
+                    levels[record.position] = record.priority_level
+                levels_by_date.append(levels)
+                rankings.append(records if limit is None else records[:limit])
+            crossings = level_crossings(levels_by_date)
+
+        with timer.stage('results'):
+            return {
+                'rankings': {day.isoformat(): records for day, records in zip(dates, rankings)},
+                'crossings': self._crossings(tasks, dates, crossings),
+            }
+
+    def _forecast_batch(self, strategy, tasks, index, cycle_nodes, config, limit, dates, timer):
+        with timer.stage('columns'):
+            columns = batch_scoring.TaskColumns(tasks, dates[0], index)
+        with timer.stage('score'):
+            offsets = np.arange(len(dates), dtype=np.float64)
+            scores, explain_day = strategy.forecast_scores(tasks, columns, offsets, config, index)
+            codes = batch_scoring.score_codes(scores)
+            orders = batch_scoring.rank_orders(codes)[:, :limit]
+            # Rounded scores and levels in rank order; code / 100 is the float round(score, 2) gives
+            ranked_scores = np.take_along_axis(codes, orders, axis=1) / 100
+            ranked_levels = np.take_along_axis(batch_scoring.priority_index(scores), orders, axis=1)
+            crossings = {level: rows.tolist() for level, rows in threshold_crossings(scores).items()}
 
-        if cycle:
-            cycle_set = set(cycle)
-            for task in scored_tasks:
-                if task.get('id') in cycle_set:
-                    task['has_cycle'] = True
-                    task['explanation'] = f"[CYCLE DETECTED] {task.get('explanation', '')}"
+        with timer.stage('results'):
+            task_nodes = index.task_nodes
+            labels = batch_scoring.PRIORITY_LABELS
+            rankings = []
+            for row, (order, row_scores, row_levels) in enumerate(
+                zip(orders.tolist(), ranked_scores.tolist(), ranked_levels.tolist())
+            ):
+                explain = explain_day(row)
+                records = [
+                    ScoredTask(tasks[position], position, score, labels[level], explain)
+                    for position, score, level in zip(order, row_scores, row_levels)
+                ]
+                if cycle_nodes:
+                    for record in records:
+                        if task_nodes[record.position] in cycle_nodes:
+                            record.has_cycle = True
+                rankings.append(records)
+        return rankings, crossings
 
-        return scored_tasks
+    def _crossings(self, tasks, dates, crossings):
+        # Tasks whose level rises within the range, earliest crossing first
+        first = {}
+        for rows in crossings.values():
+            for position, row in enumerate(rows):
+                if 0 < row < first.get(position, len(dates)):
+                    first[position] = row
+        return [
+            {
+                'position': position,
+                'id': tasks[position].get('id'),
+                'title': tasks[position]['title'],
+                **{
+                    level.lower(): dates[crossings[level][position]].isoformat()
+                    if crossings[level][position] > 0 else None
+                    for level, _ in CROSSING_LEVELS
+                },
+            }
+            for position in sorted(first, key=lambda position: (first[position], position))
+        ]
+
+    def _get_strategy(self, strategy_name):
+        strategy = STRATEGIES.get(strategy_name)
+        if not strategy:
+            raise ValueError(f"Unknown strategy: {strategy_name}")
+        return strategy
+
+    def _partitioned(self, strategies, tasks, index, config, limit, today, timer):
+        # {strategy_name: records} ranked per cluster, None when the partitioner is off or declines
+        if self.partitioner is None:
+            return None
+        return self.partitioner.rank(tasks, index, strategies, config, limit, today or date.today(), timer)
+
+    def _cycle_nodes(self, index):
+        return {node for group in index.find_cycles() for node in group}
+
+    def _rank(self, strategy, tasks, index, cycle_nodes, config, limit, today, columns=None, timer=NULL_TIMER):
+        with timer.stage('score'):
+            if limit is None:
+                records = strategy.rank_tasks(tasks, config=config, today=today, index=index, columns=columns)
+            else:
+                records = strategy.top_tasks(tasks, limit, config=config, today=today, index=index, columns=columns)
+
+            if cycle_nodes:
+                task_nodes = index.task_nodes
+                for record in records:
+                    if task_nodes[record.position] in cycle_nodes:
+                        record.has_cycle = True
+
+        return records
 
 class SuggestTasksUseCase:
-    def execute(self, tasks, config=None):
+    def __init__(self, partitioner=None):
+        self.partitioner = partitioner
+
+    def execute(self, tasks, config=None, limit=DEFAULT_SUGGESTION_LIMIT, timer=NULL_TIMER):
+
+        analyzer = AnalyzeTasksUseCase(partitioner=self.partitioner)
+        return analyzer.execute(tasks, strategy_name="smart_balance", config=config, limit=limit, timer=timer)
+
+    def rank(self, tasks, config=None, limit=DEFAULT_SUGGESTION_LIMIT, timer=NULL_TIMER):
+        """Same suggestions as execute(), as ScoredTask records."""
+        analyzer = AnalyzeTasksUseCase(partitioner=self.partitioner)
+        return analyzer.rank(tasks, strategy_name="smart_balance", config=config, limit=limit, timer=timer)
+
+class PlanTasksUseCase:
+    """Best scoring set of tasks that fits in a budget of hours, in working order."""
+
+    def execute(self, tasks, hours, strategy_name="smart_balance", config=None, today=None, timer=NULL_TIMER):
+        if not isinstance(tasks, Sequence):
+            tasks = list(tasks)
 
         analyzer = AnalyzeTasksUseCase()
-        scored_tasks = analyzer.execute(tasks, strategy_name="smart_balance", config=config)
-        
+        strategy = analyzer._get_strategy(strategy_name)
+        with timer.stage('index'):
+            index = DependencyIndex.from_tasks(tasks)
+        with timer.stage('cycles'):
+            cycle_nodes = analyzer._cycle_nodes(index)
+        records = analyzer._rank(strategy, tasks, index, cycle_nodes, config, None, today, timer=timer)
+
+        by_position = [None] * len(tasks)
+        for record in records:
+            by_position[record.position] = record
 
-        return scored_tasks[:3]
+        with timer.stage('plan'):
+            plan = plan_tasks(tasks, [record.score for record in by_position], hours, index=index)
+        return {
+            'budget_hours': hours,
+            'planned_hours': plan.hours,
+            'total_score': plan.score,
+            'exact': plan.exact,
+            'tasks': [by_position[position].as_dict() for position in plan.positions],
+        }
@@ -0,0 +1,268 @@
+import heapq
+import json
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+
+from rest_framework.exceptions import ValidationError
+
+from tasks.domain.dependency_index import DependencyIndex
+from tasks.domain.task_store import TaskColumnStore
+from tasks.services.analyze_tasks import STRATEGIES, AnalyzeTasksUseCase
+from tasks.task_files import ResultFileWriter, iter_task_items, render_result
+
+# Invalid tasks listed before the file is rejected
+MAX_REPORTED_ERRORS = 20
+# Rows per pickled block of a run file: what the merge holds of every run
+RUN_BLOCK_ROWS = 1000
+# Seconds between two progress reports
+PROGRESS_INTERVAL = 1.0
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        # spawn workers start from a fresh interpreter
+        django.setup()
+
+
+def score_chunk(items, start, dependents_counts, cycle_flags, strategy_name, today, output_format, limit, run_path):
+    """
+    Validates, scores and renders one chunk of raw task items of a file (the
+    positions from `start` on), with the dependents counts and cycle flags of
+    the whole list, and writes the results to run_path in rank order: blocks of
+    (-score, position, text) rows. Runs in the worker processes too.
+    """
+    # Imported here: spawn workers import this module before _init_worker sets Django up
+    from tasks.serializers import BulkTaskInputValidator
+
+    validator = BulkTaskInputValidator(None)
+    tasks = []
+    for item, count in zip(items, dependents_counts):
+        task = validator.validate_item(item)
+        # Read by strategies instead of a DependencyIndex, which would only see this chunk
+        task['dependents_count'] = count
+        tasks.append(task)
+
+    strategy = STRATEGIES[strategy_name]
+    if limit is None:
+        records = strategy.rank_tasks(tasks, today=today)
+    else:
+        records = strategy.top_tasks(tasks, limit, today=today)
+
+    rows = []
+    for record in records:
+        record.has_cycle = bool(cycle_flags[record.position])
+        rows.append((-record.score, start + record.position, render_result(output_format, record)))
+    with open(run_path, 'wb') as file:
+        for offset in range(0, len(rows), RUN_BLOCK_ROWS):
+            pickle.dump(rows[offset:offset + RUN_BLOCK_ROWS], file, pickle.HIGHEST_PROTOCOL)
+    return len(rows)
+
+
+def _read_run(path):
+    with open(path, 'rb') as file:
+        while True:
+            try:
+                rows = pickle.load(file)
+            except EOFError:
+                return
+            yield from rows
+
+
+class FileScoringReport:
+    """Task counts and per-pass durations of one file, and the progress callback they feed."""
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.tasks = 0
+        self.written = 0
+        self.durations = {}
+        self._started = time.perf_counter()
+        self._stage = None
+        self._stage_started = None
+        self._reported = 0.0
+
+    def start(self, stage):
+        self._finish_stage()
+        self._stage = stage
+        self._stage_started = self._reported = time.perf_counter()
+
+    def advance(self, done):
+        now = time.perf_counter()
+        if self.progress is not None and now - self._reported >= PROGRESS_INTERVAL:
+            self._reported = now
+            self.progress(self._stage, done, now - self._stage_started)
+
+    def finish(self):
+        self._finish_stage()
+        self.durations['total'] = time.perf_counter() - self._started
+        return self
+
+    def _finish_stage(self):
+        if self._stage is not None:
+            self.durations[self._stage] = time.perf_counter() - self._stage_started
+            self._stage = None
+
+    @property
+    def throughput(self):
+        # Tasks per second over the whole run
+        total = self.durations.get('total') or time.perf_counter() - self._started
+        return self.tasks / total if total else 0.0
+
+
+class ScoreTaskFileUseCase:
+    """
+    Ranks a task file that need not fit in memory, the way AnalyzeTasksUseCase.rank()
+    ranks the same list, and writes the results as they are merged.
+
+    Pass 1 ('index') streams the file, validates every task and builds the
+    DependencyIndex of the whole list: dependents counts and cycles are global.
+    Pass 2 ('score') streams it again in chunks that are validated, scored and
+    rendered apart, in worker processes when workers > 1, each into a sorted run
+    file on disk, and 'merge' k-way merges the runs into the output. Memory
+    holds the index and a few chunks, not the whole list. Strategies that are
+    not TASK_LOCAL (critical_path) rank the whole list in memory instead.
+    """
+
+    def __init__(self, strategy_name="smart_balance", workers=0, chunk_size=50_000, today=None, temp_dir=None):
+        if strategy_name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy_name}")
+        self.strategy_name = strategy_name
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.today = today or date.today()
+        self.temp_dir = temp_dir
+
+    def execute(self, input_path, input_format, output, output_format, limit=None, progress=None):
+        """
+        Writes the ranking (the first `limit` results when given) to the text file
+        `output`; returns the FileScoringReport. Raises ValueError for invalid files.
+        progress(stage, tasks_done, seconds) is called about once a second.
+        """
+        report = FileScoringReport(progress)
+        writer = ResultFileWriter(output, output_format)
+        if STRATEGIES[self.strategy_name].TASK_LOCAL:
+            self._rank_in_chunks(input_path, input_format, writer, limit, report)
+        else:
+            self._rank_in_memory(input_path, input_format, writer, limit, report)
+        writer.close()
+        report.written = writer.count
+        return report.finish()
+
+    def _validated(self, input_path, input_format, report):
+        # Validated tasks of the file; raises ValueError listing the first invalid ones
+        from tasks.serializers import BulkTaskInputValidator
+
+        validator = BulkTaskInputValidator(None)
+        errors = []
+        for where, item in iter_task_items(input_path, input_format):
+            try:
+                task = validator.validate_item(item)
+            except ValidationError as exc:
+                errors.append(f"{where}: {json.dumps(exc.detail)}")
+                if len(errors) >= MAX_REPORTED_ERRORS:
+                    break
+                continue
+            report.tasks += 1
+            report.advance(report.tasks)
+            yield task
+        if errors:
+            raise ValueError("Invalid tasks in the file:\n" + "\n".join(errors))
+
+    def _rank_in_memory(self, input_path, input_format, writer, limit, report):
+        report.start('read')
+        tasks = TaskColumnStore()
+        for task in self._validated(input_path, input_format, report):
+            tasks.append(task)
+
+        report.start('score')
+        records = AnalyzeTasksUseCase().rank(tasks, self.strategy_name, limit=limit, today=self.today)
+        report.start('write')
+        for record in records:
+            writer.write(render_result(writer.output_format, record))
+
+    def _rank_in_chunks(self, input_path, input_format, writer, limit, report):
+        report.start('index')
+        graph = (
+            {'id': task.get('id'), 'dependencies': task['dependencies']}
+            for task in self._validated(input_path, input_format, report)
+        )
+        index = DependencyIndex.from_tasks(graph)
+        cycle_nodes = {node for group in index.find_cycles() for node in group}
+        dependents_counts = index.task_dependents_counts()
+        cycle_flags = bytearray(node in cycle_nodes for node in index.task_nodes)
+        del index, cycle_nodes
+
+        with tempfile.TemporaryDirectory(prefix='score_tasks_', dir=self.temp_dir) as run_dir:
+            report.start('score')
+            runs = self._score_runs(
+                input_path, input_format, writer.output_format, limit,
+                dependents_counts, cycle_flags, run_dir, report,
+            )
+            del dependents_counts, cycle_flags
+
+            report.start('merge')
+            rows = heapq.merge(*[_read_run(path) for path in runs])
+            for _, _, text in (rows if limit is None else islice(rows, limit)):
+                writer.write(text)
+                report.advance(writer.count)
+
+    def _score_runs(self, input_path, input_format, output_format, limit, dependents_counts, cycle_flags, run_dir, report):
+        # Scores the file chunk by chunk into run files; returns their paths
+        def chunks():
+            items = (item for _, item in iter_task_items(input_path, input_format))
+            start = 0
+            while True:
+                chunk = list(islice(items, self.chunk_size))
+                if not chunk:
+                    return
+                end = start + len(chunk)
+                yield (
+                    chunk, start, dependents_counts[start:end], cycle_flags[start:end],
+                    self.strategy_name, self.today, output_format, limit,
+                    os.path.join(run_dir, f"run-{start}.pickle"),
+                )
+                start = end
+
+        runs = []
+        done = 0
+        if self.workers <= 1:
+            for args in chunks():
+                score_chunk(*args)
+                runs.append(args[-1])
+                done += len(args[0])
+                report.advance(done)
+            return runs
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+        with executor:
+            # Two chunks per worker in flight at most: reading never runs far ahead of scoring
+            pending = deque()
+            for args in chunks():
+                if len(pending) >= 2 * self.workers:
+                    done += self._wait(pending, runs)
+                    report.advance(done)
+                pending.append((executor.submit(score_chunk, *args), len(args[0]), args[-1]))
+            while pending:
+                done += self._wait(pending, runs)
+                report.advance(done)
+        return runs
+
+    @staticmethod
+    def _wait(pending, runs):
+        future, size, run_path = pending.popleft()
+        future.result()
+        runs.append(run_path)
+        return size
@@ -0,0 +1,186 @@
+import atexit
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from tasks.domain.partitioning import balanced_chunks, component_positions, merge_rankings, records_from_rows
+from tasks.services.analyze_tasks import AnalyzeTasksUseCase
+from tasks.services.request_metrics import NULL_TIMER
+from tasks.services.result_cache import AnalysisResultCache, analysis_cache_key
+
+
+def rank_chunk(tasks, strategy_names, config, limit, today, timer=NULL_TIMER):
+    """
+    AnalyzeTasksUseCase.rank_many() of a list of whole clusters, as {strategy_name: rows}
+    of positions in that list. Runs in the worker processes too.
+    """
+    rankings = AnalyzeTasksUseCase().rank_many(tasks, strategy_names, config, limit, today, timer)
+    return {name: [record.as_row() for record in records] for name, records in rankings.items()}
+
+
+class ComponentPartitioner:
+    """
+    Ranks large task lists per cluster of dependent tasks (weakly connected
+    component), for AnalyzeTasksUseCase(partitioner=...).
+
+    Clusters are split off in one linear pass over the dependency index, ranked
+    apart (index, cycles, dependents, score) and their rankings merged with a
+    k-way heap merge, in exactly the order one ranking of all the tasks gives.
+    With workers > 1, clusters are ranked in that many processes, in chunks of
+    similar size. With a cache, the rankings of unchanged clusters are reused
+    from earlier requests, so editing one cluster only re-ranks that one.
+    """
+
+    def __init__(self, workers=0, min_tasks=2000, cache=None, start_method='spawn'):
+        self.workers = workers
+        self.min_tasks = min_tasks
+        self.cache = cache
+        self.start_method = start_method
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.workers > 1 or self.cache is not None
+
+    def rank(self, tasks, index, strategies, config, limit, today, timer=NULL_TIMER):
+        """
+        {strategy_name: records} as AnalyzeTasksUseCase.rank_many() returns, or None
+        when partitioning does not apply: fewer than min_tasks tasks, a single
+        cluster, or a strategy whose scores depend on other clusters.
+        """
+        if not self.enabled or len(tasks) < self.min_tasks:
+            return None
+        # A prebuilt ReachabilityIndex covers the whole list, not one cluster
+        if config and 'reachability' in config:
+            return None
+        if not all(strategy.COMPONENT_LOCAL for strategy in strategies.values()):
+            return None
+
+        with timer.stage('components'):
+            components = component_positions(index)
+        if len(components) < 2:
+            return None
+
+        strategy_names = list(strategies)
+        # Row rankings of every cluster or chunk of clusters, by strategy
+        rankings = {name: [] for name in strategy_names}
+        pending = components
+        if self.cache is not None:
+            with timer.stage('cache'):
+                pending, keys = self._cached_rankings(
+                    tasks, components, strategy_names, config, limit, today, rankings
+                )
+
+        if pending:
+            # Cached rankings are cut at limit per cluster, so clusters are ranked whole first
+            chunk_limit = limit if self.cache is None else None
+            chunks = balanced_chunks(pending, max(self.workers, 1))
+            results = self._rank_chunks(tasks, chunks, strategy_names, config, chunk_limit, today, timer)
+            for positions, result in zip(chunks, results):
+                for name, rows in result.items():
+                    rankings[name].append([(positions[row[0]], *row[1:]) for row in rows])
+
+            if self.cache is not None:
+                with timer.stage('cache'):
+                    self._store_rankings(pending, keys, rankings, strategy_names, limit, len(results))
+
+        with timer.stage('merge'):
+            return {
+                name: records_from_rows(tasks, merge_rankings(rankings[name], limit))
+                for name in strategy_names
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cached_rankings(self, tasks, components, strategy_names, config, limit, today, rankings):
+        # Adds the cached cluster rankings to rankings; returns the other clusters and their keys
+        pending = []
+        keys = []
+        for positions in components:
+            key = self._cache_key([tasks[p] for p in positions], strategy_names, config, limit, today)
+            data = self.cache.get(key)
+            if data is None:
+                pending.append(positions)
+                keys.append(key)
+                continue
+            for name, rows in json.loads(data).items():
+                rankings[name].append([(positions[row[0]], *row[1:]) for row in rows])
+        return pending, keys
+
+    def _store_rankings(self, pending, keys, rankings, strategy_names, limit, chunk_count):
+        # Splits the rankings of the newly ranked chunks (the last chunk_count of every
+        # strategy) back into clusters, stored with positions local to the cluster
+        where = {}
+        for cluster, positions in enumerate(pending):
+            for local, position in enumerate(positions):
+                where[position] = (cluster, local)
+
+        cluster_rankings = [{name: [] for name in strategy_names} for _ in pending]
+        for name in strategy_names:
+            for rows in rankings[name][-chunk_count:]:
+                for row in rows:
+                    cluster, local = where[row[0]]
+                    cluster_rows = cluster_rankings[cluster][name]
+                    if limit is None or len(cluster_rows) < limit:
+                        cluster_rows.append((local, *row[1:]))
+
+        for key, ranking in zip(keys, cluster_rankings):
+            self.cache.set(key, json.dumps(ranking, separators=(',', ':')).encode('utf-8'))
+
+    def _cache_key(self, tasks, strategy_names, config, limit, today):
+        return f"component:{analysis_cache_key(tasks, strategy_names, config, today)}:{limit}"
+
+    def _rank_chunks(self, tasks, chunks, strategy_names, config, limit, today, timer):
+        chunk_tasks = [[tasks[p] for p in chunk] for chunk in chunks]
+        if len(chunks) < 2:
+            return [rank_chunk(chunk, strategy_names, config, limit, today, timer) for chunk in chunk_tasks]
+
+        with timer.stage('pool'):
+            executor = self._get_executor()
+            futures = [
+                executor.submit(rank_chunk, chunk, strategy_names, config, limit, today)
+                for chunk in chunk_tasks
+            ]
+            return [future.result() for future in futures]
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                )
+            return self._executor
+
+
+_component_partitioner = None
+
+
+def get_component_partitioner():
+    global _component_partitioner
+    if _component_partitioner is None:
+        from django.conf import settings
+
+        options = getattr(settings, 'COMPONENT_ANALYSIS', {})
+        cache = None
+        if options.get('CACHE_MAX_ENTRIES', 0) > 0:
+            cache = AnalysisResultCache(
+                max_entries=options['CACHE_MAX_ENTRIES'],
+                max_bytes=options.get('CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                ttl=options.get('CACHE_TTL', 300),
+            )
+        _component_partitioner = ComponentPartitioner(
+            workers=options.get('WORKERS', 0),
+            min_tasks=options.get('MIN_TASKS', 2000),
+            cache=cache,
+            start_method=options.get('START_METHOD', 'spawn'),
+        )
+        atexit.register(_component_partitioner.shutdown)
+    return _component_partitioner
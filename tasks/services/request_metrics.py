@@ -0,0 +1,227 @@
+import cProfile
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds, in seconds, of the stage duration histogram buckets
+DURATION_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+# Requests are grouped by number of input tasks, up to these bounds
+SIZE_BUCKETS = (100, 1000, 10000, 100000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def size_label(task_count):
+    lower = 0
+    for bound in SIZE_BUCKETS:
+        if task_count <= bound:
+            return f"{lower}-{bound}"
+        lower = bound + 1
+    return f"{lower}+"
+
+
+class StageTimer:
+    """
+    Wall time of the named stages of one request, in the order they finished.
+    A stage entered more than once adds up.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.strategy = ''
+        self.size = ''
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def label(self, strategy=None, task_count=None):
+        if strategy is not None:
+            self.strategy = strategy
+        if task_count is not None:
+            self.size = size_label(task_count)
+
+    def merge(self, stages):
+        """Adds stages timed elsewhere, e.g. by a job in another process."""
+        for name, seconds in stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self):
+        # Server-Timing durations are in milliseconds
+        return ', '.join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items())
+
+
+class _NullStageTimer:
+    """Stand-in when nothing is measured: every stage is a no-op."""
+
+    def stage(self, name):
+        return nullcontext()
+
+    def label(self, strategy=None, task_count=None):
+        pass
+
+    def merge(self, stages):
+        pass
+
+
+NULL_TIMER = _NullStageTimer()
+
+
+class DurationHistogram:
+    """Counts of durations per DURATION_BUCKETS bucket, the last one unbounded."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(DURATION_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(DURATION_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimated q-quantile, interpolated linearly inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if bucket == len(DURATION_BUCKETS):
+                    # Beyond the last bound nothing is known but the bound itself
+                    return DURATION_BUCKETS[-1]
+                lower = DURATION_BUCKETS[bucket - 1] if bucket else 0.0
+                upper = DURATION_BUCKETS[bucket]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return DURATION_BUCKETS[-1]
+
+
+class RequestMetrics:
+    """
+    In-process histograms of request stage durations, one per endpoint, stage,
+    strategy and input size bucket, exported in the Prometheus text format.
+
+    With a profile_dir, a request asking for ?profile=1 also runs under cProfile
+    and its stats are saved there, one .prof file per request.
+    """
+
+    def __init__(self, enabled=True, profile_dir=None):
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+
+        self._histograms = {}
+        self._lock = threading.Lock()
+        # Only one profiler can be active per process at a time
+        self._profile_lock = threading.Lock()
+
+    def record(self, timer):
+        with self._lock:
+            for stage, seconds in timer.stages.items():
+                key = (timer.endpoint, stage, timer.strategy, timer.size)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = DurationHistogram()
+                histogram.observe(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def wants_profile(self, request):
+        return self.profile_dir is not None and request.GET.get('profile') == '1'
+
+    def run_profiled(self, endpoint, func, *args, **kwargs):
+        """
+        Calls func under cProfile; returns (result, name of the saved .prof file).
+        When another request is being profiled, func runs plain and the name is None.
+        """
+        if not self._profile_lock.acquire(blocking=False):
+            return func(*args, **kwargs), None
+        try:
+            profiler = cProfile.Profile()
+            result = profiler.runcall(func, *args, **kwargs)
+        finally:
+            self._profile_lock.release()
+
+        name = f"{endpoint}-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}.prof"
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.profile_dir, name))
+        return result, name
+
+    def prometheus(self):
+        with self._lock:
+            snapshot = [
+                (key, list(histogram.counts), histogram.sum, histogram.count,
+                 [histogram.quantile(q) for q in QUANTILES])
+                for key, histogram in sorted(self._histograms.items())
+            ]
+
+        name = 'task_analyzer_stage_duration_seconds'
+        lines = [
+            f"# HELP {name} Time spent in each stage of an API request.",
+            f"# TYPE {name} histogram",
+        ]
+        for key, counts, total, count, _ in snapshot:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(DURATION_BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {total!r}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+
+        quantile_name = 'task_analyzer_stage_duration_quantile_seconds'
+        lines += [
+            f"# HELP {quantile_name} Stage duration quantiles estimated from the histogram buckets.",
+            f"# TYPE {quantile_name} gauge",
+        ]
+        for key, _, _, _, quantiles in snapshot:
+            labels = _labels(key)
+            for q, value in zip(QUANTILES, quantiles):
+                lines.append(f'{quantile_name}{{{labels},quantile="{q}"}} {value:.6g}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(key):
+    endpoint, stage, strategy, size = key
+    return ','.join(
+        f'{label}="{_escape(value)}"'
+        for label, value in (('endpoint', endpoint), ('stage', stage), ('strategy', strategy), ('size', size))
+    )
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_request_metrics = None
+
+
+def get_request_metrics():
+    global _request_metrics
+    if _request_metrics is None:
+        from django.conf import settings
+
+        options = getattr(settings, 'REQUEST_METRICS', {})
+        _request_metrics = RequestMetrics(
+            enabled=options.get('ENABLED', True),
+            profile_dir=options.get('PROFILE_DIR'),
+        )
+    return _request_metrics
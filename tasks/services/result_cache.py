@@ -0,0 +1,159 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot hash value of type {type(value).__name__}")
+
+
+def analysis_cache_key(tasks, strategy_name, config, today):
+    """
+    Stable content hash of one analyze request.
+
+    Tasks keep their order (it decides ties), dict keys are sorted so that
+    equivalent payloads produce the same key.
+    """
+    payload = json.dumps(
+        [tasks, strategy_name, config or {}, today],
+        sort_keys=True,
+        separators=(',', ':'),
+        default=_json_default,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AnalysisResultCache:
+    """
+    In-process LRU cache of rendered analyze responses.
+
+    Entries are evicted by age (ttl seconds), by count (max_entries) and by
+    total size in bytes of the cached bodies (max_bytes). An optional Django cache
+    backend is used as a shared second level across worker processes.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=300, backend=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, data = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return data
+                self._remove(key)
+
+        if self.backend is not None:
+            data = self.backend.get(self._backend_key(key))
+            if data is not None:
+                with self._lock:
+                    self.backend_hits += 1
+                    self.hits += 1
+                self._store(key, data, now)
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, data):
+        if self.backend is not None:
+            self.backend.set(self._backend_key(key), data, timeout=self.ttl)
+        self._store(key, data, time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'backend_hits': self.backend_hits,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+            }
+
+    def _store(self, key, data, now):
+        size = len(data)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now + self.ttl, data)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, data = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def _backend_key(self, key):
+        return f"tasks:analysis:{key}"
+
+
+_analysis_cache = None
+
+
+def get_analysis_cache():
+    global _analysis_cache
+    if _analysis_cache is None:
+        from django.conf import settings
+        from django.core.cache import caches
+
+        options = getattr(settings, 'ANALYSIS_CACHE', {})
+        backend_alias = options.get('BACKEND')
+        _analysis_cache = AnalysisResultCache(
+            max_entries=options.get('MAX_ENTRIES', 256),
+            max_bytes=options.get('MAX_BYTES', 64 * 1024 * 1024),
+            ttl=options.get('TTL', 300),
+            backend=caches[backend_alias] if backend_alias else None,
+        )
+    return _analysis_cache
+
+
+def etag_for(key):
+    return f'"{key}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
@@ -0,0 +1,150 @@
+import asyncio
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from tasks.services.request_metrics import StageTimer
+
+
+class PoolFull(Exception):
+    """Every job slot is taken: the caller should answer 429 and let the client retry."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job whose request went away."""
+
+
+# Per-slot cancel flags, shared with the worker processes (set by _init_worker)
+_cancel_flags = None
+
+
+def _init_worker(cancel_flags):
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        # spawn and forkserver workers start from a fresh interpreter
+        django.setup()
+
+
+class JobTimer(StageTimer):
+    """
+    StageTimer for scoring jobs: entering a stage first checks the job's cancel
+    flag, so a cancelled job stops at the next stage boundary (parse, validate,
+    index, cycles, score, render...).
+    """
+
+    def __init__(self, endpoint, slot=None):
+        super().__init__(endpoint)
+        self.slot = slot
+
+    @contextmanager
+    def stage(self, name):
+        if self.slot is not None and _cancel_flags[self.slot]:
+            raise JobCancelled()
+        with super().stage(name):
+            yield
+
+
+class ScoringPool:
+    """
+    Bounded ProcessPoolExecutor for CPU-heavy scoring jobs.
+
+    At most max_pending jobs are queued or running at once; run() raises PoolFull
+    beyond that. Each job holds a slot until it really ends, so a cancelled job
+    still counts while it winds down. Jobs take their slot as last argument:
+    JobTimer(endpoint, slot) makes them stop early when their request is cancelled.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, start_method='spawn'):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.start_method = start_method
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._free_slots = list(range(max_pending - 1, -1, -1))
+        self._context = multiprocessing.get_context(start_method)
+        self._cancel_flags = self._context.Array('b', max_pending, lock=False)
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self.max_pending - len(self._free_slots)
+
+    async def run(self, func, *args):
+        with self._lock:
+            if not self._free_slots:
+                raise PoolFull()
+            slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+
+        try:
+            executor = self._get_executor()
+            future = executor.submit(func, *args, slot)
+        except BaseException:
+            self._release(slot)
+            raise
+        future.add_done_callback(lambda _: self._release(slot))
+
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory): start a fresh pool for the next jobs
+            self._discard_executor(executor)
+            raise
+        except asyncio.CancelledError:
+            # The request went away: a queued job was just cancelled with it,
+            # a running one stops at its next stage
+            self._cancel_flags[slot] = 1
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self._context,
+                    initializer=_init_worker,
+                    initargs=(self._cancel_flags,),
+                )
+            return self._executor
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, slot):
+        with self._lock:
+            self._free_slots.append(slot)
+
+
+_scoring_pool = None
+
+
+def get_scoring_pool():
+    global _scoring_pool
+    if _scoring_pool is None:
+        from django.conf import settings
+
+        options = getattr(settings, 'SCORING_POOL', {})
+        _scoring_pool = ScoringPool(
+            max_workers=options.get('WORKERS', 2),
+            max_pending=options.get('MAX_PENDING', 8),
+            start_method=options.get('START_METHOD', 'spawn'),
+        )
+        atexit.register(_scoring_pool.shutdown)
+    return _scoring_pool
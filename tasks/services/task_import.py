@@ -0,0 +1,123 @@
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tasks.domain.dependency_index import DependencyIndex, dependency_id
+from tasks.models import Task
+from tasks.services.request_metrics import NULL_TIMER
+from tasks.services.task_scores import create_task_scores
+
+
+def import_edges(tasks):
+    """
+    (task position, dependency position) pairs of a task list to import, each
+    edge once. Dependencies refer to the ids tasks carry in the list, which are
+    client-side ids, not database ids. Raises ValueError for duplicate ids,
+    dependencies outside the list and dependency cycles, before anything is written.
+    """
+    position_of = {}
+    for position, task in enumerate(tasks):
+        t_id = task.get('id')
+        if t_id is None:
+            continue
+        if t_id in position_of:
+            raise ValueError(f"Duplicate task id: {t_id}")
+        position_of[t_id] = position
+
+    edges = {}
+    for position, task in enumerate(tasks):
+        for dep in task.get('dependencies', []) or []:
+            dep_id = dependency_id(dep)
+            dep_position = position_of.get(dep_id)
+            if dep_position is None:
+                raise ValueError(f"Task {task.get('id')} depends on {dep_id}, which is not in the import")
+            edges[(position, dep_position)] = None
+
+    cycles = DependencyIndex.from_tasks(tasks).find_cycle_ids()
+    if cycles:
+        groups = ', '.join(str(sorted(cycle)) for cycle in cycles[:10])
+        raise ValueError(f"Dependency cycles between tasks: {groups}")
+    return list(edges)
+
+
+class ImportTasksUseCase:
+    """
+    Stores a validated task list as Task rows, all or nothing.
+
+    Tasks and the rows of the dependencies through table go in with batched
+    bulk_create calls inside one transaction, and the TaskScore rows are
+    computed from the imported list itself, so an import costs a few queries
+    per batch_size tasks instead of a few per task and edge. bulk_create sends
+    no signals: the import writes the scores itself.
+    """
+
+    def __init__(self, batch_size=1000, max_tasks=100_000):
+        self.batch_size = batch_size
+        self.max_tasks = max_tasks
+
+    def execute(self, tasks, today=None, timer=NULL_TIMER):
+        """Returns the database ids of the new tasks, in list order; raises ValueError before writing anything."""
+        if len(tasks) > self.max_tasks:
+            raise ValueError(f"An import holds at most {self.max_tasks} tasks")
+        with timer.stage('cycles'):
+            edges = import_edges(tasks)
+
+        rows = [
+            Task(
+                title=task['title'],
+                due_date=task.get('due_date'),
+                estimated_hours=task['estimated_hours'],
+                importance=task.get('importance', 5),
+            )
+            for task in tasks
+        ]
+        through = Task.dependencies.through
+        with transaction.atomic():
+            with timer.stage('insert'):
+                self._insert_tasks(rows)
+                ids = [row.pk for row in rows]
+                through.objects.bulk_create(
+                    [through(from_task_id=ids[source], to_task_id=ids[target]) for source, target in edges],
+                    batch_size=self.batch_size,
+                )
+
+            with timer.stage('scores'):
+                # The imported tasks depend only on each other: their dependents are all in the list
+                dependents_count = [0] * len(tasks)
+                for _, target in edges:
+                    dependents_count[target] += 1
+                scored = [
+                    {**task, 'id': t_id, 'dependencies': [], 'dependents_count': count}
+                    for task, t_id, count in zip(tasks, ids, dependents_count)
+                ]
+                create_task_scores(scored, today or date.today(), batch_size=self.batch_size)
+        return ids
+
+    def _insert_tasks(self, rows):
+        if connection.features.can_return_rows_from_bulk_insert:
+            Task.objects.bulk_create(rows, batch_size=self.batch_size)
+            return
+        # Backends that cannot return the ids of a multi-row insert (MySQL) insert row by
+        # row; raw=True is how fixtures load and keeps the per-task score signal quiet.
+        # Raw saves skip pre_save, so the auto_now(_add) timestamps are set here
+        now = timezone.now()
+        for row in rows:
+            row.created_at = row.updated_at = now
+            row.save_base(raw=True, force_insert=True)
+
+
+_import_use_case = None
+
+
+def get_import_use_case():
+    global _import_use_case
+    if _import_use_case is None:
+        from django.conf import settings
+
+        options = getattr(settings, 'TASK_IMPORT', {})
+        _import_use_case = ImportTasksUseCase(
+            batch_size=options.get('BATCH_SIZE', 1000),
+            max_tasks=options.get('MAX_TASKS', 100_000),
+        )
+    return _import_use_case
@@ -0,0 +1,210 @@
+from datetime import date
+
+from django.db.models import Count
+
+from tasks.domain.dependency_graph import detect_cycles
+from tasks.models import Task, TaskScore
+from .analyze_tasks import STRATEGIES, DEFAULT_SUGGESTION_LIMIT
+
+# critical_path scores depend on the whole dependency graph, so they cannot be refreshed per task
+STORED_STRATEGIES = tuple(name for name in STRATEGIES if name != "critical_path")
+
+# Strategies whose scores move when the reference date changes
+DATE_DEPENDENT_STRATEGIES = tuple(name for name in STORED_STRATEGIES if STRATEGIES[name].DATE_DEPENDENT)
+
+# Keeps pk__in (...) lists under SQLite's bound-parameter limit
+REFRESH_CHUNK_SIZE = 500
+
+
+def refresh_task_scores(task_ids, today=None, strategies=None):
+    """
+    Recomputes the TaskScore rows of the given tasks only.
+
+    dependents_count is read from the dependencies through table, so the
+    result matches what AnalyzeTasksUseCase computes over the full task set.
+    """
+    today = today or date.today()
+    strategy_names = strategies or STORED_STRATEGIES
+    through = Task.dependencies.through
+    task_ids = sorted(set(task_ids))
+
+    refreshed = 0
+    for start in range(0, len(task_ids), REFRESH_CHUNK_SIZE):
+        chunk = task_ids[start:start + REFRESH_CHUNK_SIZE]
+        tasks = Task.objects.filter(pk__in=chunk).task_dicts()
+        counts = dict(
+            through.objects.filter(to_task_id__in=chunk)
+            .values('to_task_id')
+            .annotate(n=Count('id'))
+            .values_list('to_task_id', 'n')
+        )
+        for task in tasks:
+            task['dependents_count'] = counts.get(task['id'], 0)
+
+        TaskScore.objects.bulk_create(
+            _score_rows(tasks, strategy_names, today),
+            update_conflicts=True,
+            unique_fields=['task', 'strategy'],
+            update_fields=['score', 'priority_level', 'explanation', 'computed_on'],
+        )
+        refreshed += len(tasks)
+
+    return refreshed
+
+
+def create_task_scores(tasks, today=None, batch_size=REFRESH_CHUNK_SIZE):
+    """
+    Inserts the TaskScore rows of new tasks that have none yet, from task dicts
+    that carry their database id and dependents_count; no task rows are read.
+    """
+    today = today or date.today()
+    TaskScore.objects.bulk_create(_score_rows(tasks, STORED_STRATEGIES, today), batch_size=batch_size)
+
+
+def _score_rows(tasks, strategy_names, today):
+    rows = []
+    for name in strategy_names:
+        for result in STRATEGIES[name].score_tasks(tasks, today=today):
+            rows.append(TaskScore(
+                task_id=result['id'],
+                strategy=name,
+                score=result['score'],
+                priority_level=result['priority_level'],
+                explanation=result['explanation'],
+                computed_on=today,
+            ))
+    return rows
+
+
+def refresh_cycle_flags(dependent_ids=None, dependency_ids=None):
+    """
+    Updates TaskScore.has_cycle after dependency edges from dependent_ids to
+    dependency_ids were added or removed (or a task with such edges deleted).
+
+    Only a task on a cycle through a changed edge can change: it is reachable
+    from the dependency side and reaches the dependent side. Those tasks are
+    found by walking the through table outwards from the edge, and their
+    cycles computed on the subgraph they induce, which holds every cycle they
+    are on. Without arguments every task is recomputed from the whole edge list.
+    """
+    through = Task.dependencies.through
+    if dependent_ids is None:
+        # Cycle membership from the edge list alone (no task rows)
+        graph = {}
+        for from_id, to_id in through.objects.values_list('from_task_id', 'to_task_id'):
+            graph.setdefault(from_id, []).append(to_id)
+        _set_cycle_flags({t_id for group in detect_cycles(graph) for t_id in group})
+        return
+
+    reachable = _walk(dependency_ids, 'from_task_id', 'to_task_id')
+    touched = _walk([t_id for t_id in dependent_ids if t_id in reachable], 'to_task_id', 'from_task_id', reachable)
+    if not touched:
+        return
+    graph = {}
+    for chunk in _chunks(sorted(touched)):
+        for from_id, to_id in through.objects.filter(from_task_id__in=chunk).values_list('from_task_id', 'to_task_id'):
+            if to_id in touched:
+                graph.setdefault(from_id, []).append(to_id)
+    _set_cycle_flags({t_id for group in detect_cycles(graph) for t_id in group}, touched)
+
+
+def _walk(start_ids, column, other, within=None):
+    # Task ids reachable from start_ids over through rows (column -> other), optionally only inside `within`
+    through = Task.dependencies.through
+    seen = set(start_ids)
+    frontier = sorted(seen)
+    while frontier:
+        found = []
+        for chunk in _chunks(frontier):
+            for t_id in through.objects.filter(**{f'{column}__in': chunk}).values_list(other, flat=True):
+                if t_id not in seen and (within is None or t_id in within):
+                    seen.add(t_id)
+                    found.append(t_id)
+        frontier = found
+    return seen
+
+
+def _set_cycle_flags(on_cycle, task_ids=None):
+    # has_cycle = task in on_cycle, for task_ids (every task when None)
+    flagged = TaskScore.objects.filter(has_cycle=True)
+    if task_ids is None:
+        flagged = set(flagged.values_list('task_id', flat=True))
+    else:
+        flagged = {
+            t_id for chunk in _chunks(sorted(task_ids))
+            for t_id in flagged.filter(task_id__in=chunk).values_list('task_id', flat=True)
+        }
+    for changed, value in ((on_cycle - flagged, True), (flagged - on_cycle, False)):
+        for chunk in _chunks(sorted(changed)):
+            TaskScore.objects.filter(task_id__in=chunk).update(has_cycle=value)
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), REFRESH_CHUNK_SIZE):
+        yield ids[start:start + REFRESH_CHUNK_SIZE]
+
+
+def refresh_stale_scores(today=None):
+    """Day-rollover refresh: only tasks with a due date have date-dependent scores."""
+    today = today or date.today()
+    stale = TaskScore.objects.filter(strategy__in=DATE_DEPENDENT_STRATEGIES, computed_on__lt=today)
+
+    task_ids = stale.filter(task__due_date__isnull=False).values_list('task_id', flat=True).distinct()
+    refreshed = refresh_task_scores(list(task_ids), today=today, strategies=DATE_DEPENDENT_STRATEGIES)
+    stale.update(computed_on=today)
+    return refreshed
+
+
+def backfill_missing_scores(today=None):
+    # Tasks created without signals (bulk_create, raw SQL, rows older than the score table)
+    task_ids = list(Task.objects.filter(scores__isnull=True).values_list('id', flat=True))
+    if not task_ids:
+        return 0
+    refreshed = refresh_task_scores(task_ids, today=today)
+    refresh_cycle_flags()
+    return refreshed
+
+
+def ensure_scores_fresh(today=None):
+    today = today or date.today()
+    if TaskScore.objects.filter(strategy__in=DATE_DEPENDENT_STRATEGIES, computed_on__lt=today).exists():
+        refresh_stale_scores(today)
+    if Task.objects.filter(scores__isnull=True).exists():
+        backfill_missing_scores(today)
+
+
+class SuggestStoredTasksUseCase:
+    def execute(self, limit=DEFAULT_SUGGESTION_LIMIT, strategy_name="smart_balance", today=None):
+
+        if strategy_name not in STORED_STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy_name}")
+
+        ensure_scores_fresh(today)
+
+        rows = (
+            TaskScore.objects.filter(strategy=strategy_name)
+            .order_by('-score', 'task_id')
+            .values(
+                'task_id', 'task__title', 'task__due_date', 'task__estimated_hours',
+                'task__importance', 'score', 'priority_level', 'explanation', 'has_cycle',
+            )[:limit]
+        )
+
+        results = []
+        for row in rows:
+            result = {
+                'id': row['task_id'],
+                'title': row['task__title'],
+                'due_date': row['task__due_date'],
+                'estimated_hours': row['task__estimated_hours'],
+                'importance': row['task__importance'],
+                'score': row['score'],
+                'priority_level': row['priority_level'],
+                'explanation': row['explanation'],
+            }
+            if row['has_cycle']:
+                result['has_cycle'] = True
+                result['explanation'] = f"[CYCLE DETECTED] {result['explanation']}"
+            results.append(result)
+
+        return results
@@ -0,0 +1,127 @@
+import math
+from datetime import date
+
+from tasks.domain import batch_scoring
+from tasks.domain.batch_scoring import np
+from tasks.domain.dependency_index import DependencyIndex
+from tasks.domain.scoring_config import DEFAULT_SMART_BALANCE_WEIGHTS
+from tasks.domain.weight_sensitivity import (
+    MAX_SCORE_MAGNITUDE, WEIGHT_COMPONENTS, WeightSensitivity, score_bound, weight_grid, weight_matrix,
+)
+from tasks.services.analyze_tasks import STRATEGIES
+from tasks.services.request_metrics import NULL_TIMER
+
+
+class NumPyUnavailable(Exception):
+    """The analysis needs NumPy, which is not installed: the caller should answer 501."""
+
+
+class WeightSensitivityUseCase:
+    """
+    Ranks one task list under many SmartBalance weightings, as analyze would with
+    config={'weights': ...} for each, and reports how stable the ranking is: how
+    often each task makes the top k, its best and worst rank, and Kendall tau-b of
+    every ranking against the reference weighting over its first tau_tasks tasks.
+    """
+
+    def __init__(self, max_weightings=1000, tau_tasks=300, chunk_size=64):
+        self.max_weightings = max_weightings
+        self.tau_tasks = tau_tasks
+        self.chunk_size = chunk_size
+
+    def execute(self, tasks, weightings=(), grid=None, reference=None, top_k=10, today=None, timer=NULL_TIMER):
+        """
+        weightings: weight dicts; grid: {component: [values]}, expanded to every
+        combination, other components taken from the reference weights
+        (DEFAULT_SMART_BALANCE_WEIGHTS unless given). Raises ValueError, or
+        NumPyUnavailable without NumPy.
+        """
+        if not batch_scoring.is_available():
+            raise NumPyUnavailable("Weight sensitivity analysis needs NumPy")
+        reference = dict(reference or DEFAULT_SMART_BALANCE_WEIGHTS)
+        count = len(weightings) + (math.prod(len(values) for values in grid.values()) if grid else 0)
+        if not count:
+            raise ValueError("Give at least one weighting (weights or grid)")
+        if count > self.max_weightings:
+            raise ValueError(f"An analysis ranks at most {self.max_weightings} weightings")
+        weightings = [*weightings, *(weight_grid(grid, reference) if grid else ())]
+
+        with timer.stage('index'):
+            index = DependencyIndex.from_tasks(tasks)
+        with timer.stage('columns'):
+            columns = batch_scoring.TaskColumns(tasks, today or date.today(), index)
+            components = STRATEGIES['smart_balance'].component_scores(columns)
+        matrix = weight_matrix(weightings)
+        reference_weights = weight_matrix([reference])[0]
+        # Scores past this would overflow to inf and nan, or their integer codes, and rank as noise
+        if not score_bound(components, np.vstack([matrix, reference_weights])) <= MAX_SCORE_MAGNITUDE:
+            raise ValueError("Weights too large for these tasks: the weighted scores overflow")
+        with timer.stage('score'):
+            analysis = WeightSensitivity(
+                components, matrix, reference_weights, top_k, self.tau_tasks, self.chunk_size,
+            )
+        with timer.stage('results'):
+            return self._results(tasks, weightings, reference, analysis)
+
+    def _results(self, tasks, weightings, reference, analysis):
+        top_k = analysis.top_k
+        reference_top = analysis.reference_top.tolist()
+        reference_set = set(reference_top)
+
+        results = []
+        for weights, top, tau in zip(weightings, analysis.tops.tolist(), analysis.taus.tolist()):
+            results.append({
+                'weights': _weights(weights),
+                'top': top,
+                'top_k_overlap': round(len(reference_set.intersection(top)) / top_k, 4) if top_k else 1.0,
+                'kendall_tau': None if math.isnan(tau) else round(tau, 4),
+            })
+
+        # Tasks some weighting ranks in its top k, most often first
+        top_counts = analysis.top_counts.tolist()
+        reference_ranks = analysis.reference_ranks.tolist()
+        contenders = sorted(
+            {position for position, count in enumerate(top_counts) if count} | reference_set,
+            key=lambda position: (-top_counts[position], reference_ranks[position]),
+        )
+        best_ranks = analysis.best_ranks.tolist()
+        worst_ranks = analysis.worst_ranks.tolist()
+        return {
+            'task_count': len(tasks),
+            'top_k': top_k,
+            'tau_tasks': analysis.tau_tasks,
+            'reference': {'weights': _weights(reference), 'top': reference_top},
+            'weightings': results,
+            'tasks': [
+                {
+                    'position': position,
+                    'id': tasks[position].get('id'),
+                    'title': tasks[position]['title'],
+                    'top_k_share': round(top_counts[position] / len(weightings), 4),
+                    'reference_rank': reference_ranks[position] + 1,
+                    'best_rank': best_ranks[position] + 1,
+                    'worst_rank': worst_ranks[position] + 1,
+                }
+                for position in contenders
+            ],
+        }
+
+
+def _weights(weights):
+    return {name: float(weights.get(name, 0)) for name in WEIGHT_COMPONENTS}
+
+
+_sensitivity_use_case = None
+
+
+def get_sensitivity_use_case():
+    global _sensitivity_use_case
+    if _sensitivity_use_case is None:
+        from django.conf import settings
+
+        options = getattr(settings, 'WEIGHT_SENSITIVITY', {})
+        _sensitivity_use_case = WeightSensitivityUseCase(
+            max_weightings=options.get('MAX_WEIGHTINGS', 1000),
+            tau_tasks=options.get('TAU_TASKS', 300),
+        )
+    return _sensitivity_use_case
@@ -0,0 +1,51 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Task
+from .services.task_scores import refresh_cycle_flags, refresh_task_scores
+
+
+@receiver(post_save, sender=Task)
+def refresh_saved_task_score(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_task_scores([instance.pk])
+
+
+@receiver(m2m_changed, sender=Task.dependencies.through)
+def refresh_scores_on_dependency_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Only the dependency side of a changed edge gains or loses a dependent
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_edges = (list(instance.dependents.values_list('pk', flat=True)), [instance.pk])
+        else:
+            instance._cleared_edges = ([instance.pk], list(instance.dependencies.values_list('pk', flat=True)))
+        return
+
+    if action == 'post_clear':
+        dependent_ids, dependency_ids = getattr(instance, '_cleared_edges', ([], []))
+    elif action in ('post_add', 'post_remove'):
+        if reverse:
+            dependent_ids, dependency_ids = list(pk_set or []), [instance.pk]
+        else:
+            dependent_ids, dependency_ids = [instance.pk], list(pk_set or [])
+    else:
+        return
+
+    refresh_task_scores(dependency_ids)
+    refresh_cycle_flags(dependent_ids, dependency_ids)
+
+
+@receiver(pre_delete, sender=Task)
+def remember_deleted_task_dependencies(sender, instance, **kwargs):
+    instance._deleted_dependency_ids = list(instance.dependencies.values_list('pk', flat=True))
+    instance._deleted_dependent_ids = list(instance.dependents.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Task)
+def refresh_scores_after_delete(sender, instance, **kwargs):
+    # The deleted task's through rows and TaskScore rows are removed by cascade; only
+    # cycles that ran through it, from its dependencies back to its dependents, can break
+    dependency_ids = getattr(instance, '_deleted_dependency_ids', [])
+    refresh_task_scores(dependency_ids)
+    refresh_cycle_flags(getattr(instance, '_deleted_dependent_ids', []), dependency_ids)
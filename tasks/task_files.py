@@ -0,0 +1,201 @@
+import csv
+import io
+import json
+import os
+
+from .parsers import loads
+from .renderers import ScoredTaskEncoder
+
+# Task files read and written by the score_tasks_file command
+FILE_FORMATS = ('json', 'ndjson', 'csv')
+
+CSV_FIELDS = ('id', 'title', 'due_date', 'estimated_hours', 'importance', 'dependencies')
+CSV_RESULT_FIELDS = (
+    'id', 'title', 'due_date', 'estimated_hours', 'importance',
+    'score', 'priority_level', 'explanation', 'has_cycle',
+)
+
+# Characters read from a JSON array file at a time
+READ_CHUNK_CHARS = 1 << 20
+
+_EXTENSIONS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+
+def file_format(path, requested=None):
+    """The format asked for, else the one of the file extension; raises ValueError when unknown."""
+    name = requested or _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if name not in FILE_FORMATS:
+        raise ValueError(f"Unknown file format for {path}: use one of {', '.join(FILE_FORMATS)}")
+    return name
+
+
+def iter_task_items(path, input_format):
+    """
+    Streams the raw task items of a file as (where, item): item is the parsed
+    JSON value, or the dict of one CSV row with typed values, and `where`
+    names it in error messages ("item 3", "line 4"). Raises ValueError on malformed files.
+    """
+    if input_format == 'json':
+        with open(path, encoding='utf-8') as file:
+            for number, item in enumerate(iter_json_array(file), start=1):
+                yield f"item {number}", item
+    elif input_format == 'ndjson':
+        with open(path, 'rb') as file:
+            for number, line in enumerate(file, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = loads(line)
+                except ValueError:
+                    raise ValueError(f"line {number}: invalid JSON")
+                yield f"line {number}", item
+    else:
+        with open(path, encoding='utf-8', newline='') as file:
+            reader = csv.DictReader(file)
+            missing = {'title', 'estimated_hours'} - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError(f"CSV header lacks {', '.join(sorted(missing))}")
+            for row in reader:
+                yield f"line {reader.line_num}", csv_task_item(row)
+
+
+def iter_json_array(file):
+    """
+    Yields the items of a JSON array without reading the whole file: the array
+    is decoded one item at a time from a buffer refilled as it runs short.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill(min_chars=READ_CHUNK_CHARS):
+        nonlocal buffer, pos, eof
+        data = file.read(max(min_chars, READ_CHUNK_CHARS))
+        buffer = buffer[pos:] + data
+        pos = 0
+        eof = not data
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    skip_whitespace()
+    if buffer[pos:pos + 1] != '[':
+        raise ValueError("item 1: the file is not a JSON array")
+    pos += 1
+
+    number = 0
+    skip_whitespace()
+    if buffer[pos:pos + 1] == ']':
+        return
+    while True:
+        number += 1
+        skip_whitespace()
+        wanted = READ_CHUNK_CHARS
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"item {number}: invalid JSON")
+            else:
+                # An item reaching the end of the buffer may go on in the next chunk (numbers)
+                if end < len(buffer) or eof:
+                    break
+            fill(wanted)
+            wanted *= 2
+        yield item
+        pos = end
+
+        skip_whitespace()
+        separator = buffer[pos:pos + 1]
+        pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"item {number}: expected ',' or ']' after it")
+
+
+def csv_task_item(row):
+    """
+    One CSV row as a task item. Numbers are converted where they parse, so valid
+    rows take the validator's fast path; anything else is left for it to report.
+    Dependencies are ids separated by ';'. Empty cells are missing fields.
+    """
+    item = {}
+    for field in CSV_FIELDS:
+        value = (row.get(field) or '').strip()
+        if not value:
+            continue
+        if field in ('id', 'importance'):
+            value = _number(int, value)
+        elif field == 'estimated_hours':
+            value = _number(float, value)
+        elif field == 'dependencies':
+            value = [_number(int, dep.strip()) for dep in value.split(';') if dep.strip()]
+        item[field] = value
+    return item
+
+
+def _number(kind, value):
+    try:
+        return kind(value)
+    except ValueError:
+        return value
+
+
+_encoder = ScoredTaskEncoder()
+
+
+def render_result(output_format, record):
+    """One ScoredTask record as the text of its result in a result file."""
+    if output_format != 'csv':
+        # Escaped as the API escapes them
+        return _encoder.encode(record).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+    task = record.task
+    due_date = task.get('due_date')
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([
+        task.get('id', ''), task['title'],
+        due_date.isoformat() if hasattr(due_date, 'isoformat') else due_date or '',
+        float(task['estimated_hours']), task['importance'],
+        record.score, record.priority_level, record.explanation, 'true' if record.has_cycle else 'false',
+    ])
+    return buffer.getvalue()
+
+
+class ResultFileWriter:
+    """
+    Writes rendered results (render_result()) to a file as they come: a JSON
+    array or NDJSON rows as the API renders them, or CSV with a header row.
+    """
+
+    def __init__(self, file, output_format):
+        self.file = file
+        self.output_format = output_format
+        self.count = 0
+        if output_format == 'json':
+            file.write('[')
+        elif output_format == 'csv':
+            csv.writer(file).writerow(CSV_RESULT_FIELDS)
+
+    def write(self, text):
+        if self.output_format == 'json':
+            self.file.write(',' + text if self.count else text)
+        elif self.output_format == 'ndjson':
+            self.file.write(text + '\n')
+        else:
+            self.file.write(text)
+        self.count += 1
+
+    def close(self):
+        if self.output_format == 'json':
+            self.file.write(']')
@@ -1,3 +1,1558 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import math
+import os
+import pstats
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .benchmarks.generators import BENCHMARK_TODAY, WORKLOADS, clustered_tasks, fan_tasks, payload
+from .domain import batch_scoring, planner
+from .domain.analysis_session import AnalysisSession
+from .domain.critical_path import critical_path
+from .domain.dependency_graph import ReachabilityIndex, build_dependency_graph, calculate_dependents_count, detect_cycles
+from .domain.planner import plan_tasks
+from .domain.scored_task import CYCLE_PREFIX
+from .domain.dependency_index import DependencyIndex
+from .models import Task, TaskScore
+from .parsers import FastJSONParser
+from .renderers import ScoredTaskEncoder, ScoredTaskJSONRenderer, orjson
+from .scoring_jobs import analyze_job
+from .serializers import AnalysisResultSerializer, BulkTaskInputValidator, TaskInputSerializer
+from .services.analyze_tasks import STRATEGIES, AnalyzeTasksUseCase
+from .services.offline_scoring import ScoreTaskFileUseCase
+from .services.partitioned_analysis import ComponentPartitioner
+from .services.request_metrics import DURATION_BUCKETS, DurationHistogram, RequestMetrics, StageTimer, get_request_metrics
+from .services.result_cache import AnalysisResultCache
+from .services.scoring_pool import JobCancelled, JobTimer, PoolFull, ScoringPool
+from .services.task_import import ImportTasksUseCase
+from .services.task_scores import (
+    DATE_DEPENDENT_STRATEGIES, STORED_STRATEGIES, SuggestStoredTasksUseCase, refresh_stale_scores, refresh_task_scores,
+)
+from .services.weight_sensitivity import WeightSensitivityUseCase
+
+
+class BulkTaskInputValidatorParityTests(SimpleTestCase):
+    """BulkTaskInputValidator must agree with TaskInputSerializer(many=True) on every input."""
+
+    def assert_parity(self, data):
+        serializer = TaskInputSerializer(data=data, many=True)
+        validator = BulkTaskInputValidator(data)
+
+        self.assertEqual(validator.is_valid(), serializer.is_valid())
+        self.assertEqual(validator.validated_data, serializer.validated_data)
+        # ErrorDetail equality also compares error codes
+        self.assertEqual(validator.errors, serializer.errors)
+
+    def test_valid_tasks(self):
+        self.assert_parity([
+            {"id": 1, "title": "Task A", "estimated_hours": 2, "importance": 8, "due_date": "2025-12-01"},
+            {"id": 2, "title": "  Task B  ", "estimated_hours": 10.5, "dependencies": [1]},
+            {"title": "No id", "estimated_hours": 1, "due_date": None, "extra": "ignored"},
+            {"id": 3, "title": "x" * 255, "estimated_hours": 0, "importance": 0, "dependencies": []},
+        ])
+
+    def test_values_coerced_by_drf(self):
+        self.assert_parity([
+            {"id": "4", "title": 12, "estimated_hours": "2.5", "importance": "7"},
+            {"id": 5.0, "title": "Floats", "estimated_hours": True, "importance": "3.0"},
+            {"id": 6, "title": "Ünïcode", "estimated_hours": 1, "dependencies": ["1", 2.0]},
+            {"id": 7, "title": "Compact date", "estimated_hours": 1, "due_date": "20251201"},
+        ])
+
+    def test_invalid_tasks(self):
+        self.assert_parity([
+            {"id": 1, "title": "ok", "estimated_hours": 1},
+            {"id": "abc", "title": "", "estimated_hours": None},
+            {"title": "   ", "estimated_hours": "many", "importance": 5.5},
+            {"title": "x" * 256, "estimated_hours": 1, "due_date": "2025-13-01"},
+            {"title": "nul\x00", "estimated_hours": 1, "due_date": 20251201},
+            {"title": None, "estimated_hours": 1, "dependencies": "1,2"},
+            {"title": "deps", "estimated_hours": 1, "dependencies": [1, "x", None]},
+            {"title": "date", "estimated_hours": 1, "due_date": "2025-12-01T10:00:00"},
+            {"estimated_hours": 1},
+            "not a task",
+            None,
+            [],
+        ])
+
+    def test_non_list_payloads(self):
+        for data in [{"title": "x"}, "tasks", None, 5, []]:
+            with self.subTest(data=data):
+                self.assert_parity(data)
+
+    def test_random_payloads(self):
+        rng = random.Random(2024)
+        values = {
+            'id': [1, 2, -3, "7", 1.0, 1.5, None, True, "x", [1]],
+            'title': ["Write docs", " padded ", "", "  ", None, 5, 2.5, False, "é", "a" * 300, ["t"]],
+            'due_date': ["2025-01-31", "2025-02-30", "2025-1-5", "", None, "soon", 3, ["2025-01-01"], {"d": 1}],
+            'estimated_hours': [1, 0, -2, 3.25, "4", "4.5", "", None, False, "nan", [1]],
+            'importance': [1, 10, "5", "5.0", 5.0, 5.5, None, "", True],
+            'dependencies': [[], [1, 2], ["3"], [None], [1.0], "1", None, {"a": 1}, [[1]]],
+        }
+
+        for _ in range(50):
+            tasks = []
+            for _ in range(rng.randint(0, 20)):
+                task = {key: rng.choice(options) for key, options in values.items() if rng.random() < 0.85}
+                tasks.append(task)
+            self.assert_parity(tasks)
+
+
+class ComponentPartitionerParityTests(SimpleTestCase):
+    """Rankings done per cluster must render exactly like one ranking of all tasks."""
+
+    def setUp(self):
+        self.tasks = clustered_tasks(600, seed=7, cluster_size=40)
+        # Tasks without id and with unknown dependencies join no cluster
+        self.tasks += [
+            {"id": None, "title": "No id", "due_date": None, "estimated_hours": 2, "importance": 9, "dependencies": [3]},
+            {"id": 10_000, "title": "Unknown dependency", "due_date": None, "estimated_hours": 1, "importance": 5,
+             "dependencies": [99_999]},
+        ]
+        self.partitioner = ComponentPartitioner(min_tasks=0, cache=AnalysisResultCache())
+
+    def assert_parity(self, limit=None, config=None):
+        partitioned = AnalyzeTasksUseCase(partitioner=self.partitioner)
+        expected = AnalyzeTasksUseCase().rank_many(self.tasks, list(STRATEGIES), config, limit, BENCHMARK_TODAY)
+        # Twice: rankings first computed, then answered from the cluster cache
+        for _ in range(2):
+            rankings = partitioned.rank_many(self.tasks, list(STRATEGIES), config, limit, BENCHMARK_TODAY)
+            self.assertEqual(
+                bytes(ScoredTaskJSONRenderer.render_rankings(rankings)),
+                bytes(ScoredTaskJSONRenderer.render_rankings(expected)),
+            )
+
+    def test_local_strategies(self):
+        for name in STRATEGIES:
+            if not STRATEGIES[name].COMPONENT_LOCAL:
+                continue
+            with self.subTest(strategy=name):
+                for limit in (None, 1, 25):
+                    records = AnalyzeTasksUseCase(partitioner=self.partitioner).rank(
+                        self.tasks, name, limit=limit, today=BENCHMARK_TODAY
+                    )
+                    expected = AnalyzeTasksUseCase().rank(self.tasks, name, limit=limit, today=BENCHMARK_TODAY)
+                    self.assertEqual(
+                        bytes(ScoredTaskJSONRenderer.render_records(records)),
+                        bytes(ScoredTaskJSONRenderer.render_records(expected)),
+                    )
+
+    def test_every_strategy(self):
+        # critical_path is not component local: the whole list is ranked as one
+        self.assert_parity()
+        self.assert_parity(limit=5)
+
+    def test_transitive_dependents(self):
+        self.assert_parity(config={"dependency_measure": "transitive_hours"})
+
+    def test_one_cluster_changed(self):
+        self.assert_parity()
+        self.tasks[0] = {**self.tasks[0], "importance": 10, "estimated_hours": 0.5}
+        self.assert_parity()
+
+
+class AnalysisSessionParityTests(SimpleTestCase):
+    """A patched session must rank exactly like the patched task list ranked from scratch."""
+
+    def setUp(self):
+        self.tasks = clustered_tasks(300, seed=11, cluster_size=20)
+
+    def assert_parity(self, session, tasks, name):
+        expected = AnalyzeTasksUseCase().rank(tasks, name, today=BENCHMARK_TODAY)
+        self.assertEqual(
+            bytes(ScoredTaskJSONRenderer.render_records(session.ranked())),
+            bytes(ScoredTaskJSONRenderer.render_records(expected)),
+        )
+
+    def test_random_patches(self):
+        for name in STRATEGIES:
+            with self.subTest(strategy=name):
+                rng = random.Random(3)
+                tasks = {task["id"]: dict(task) for task in self.tasks}
+                session = AnalysisSession(list(tasks.values()), STRATEGIES[name], BENCHMARK_TODAY)
+                next_id = max(tasks) + 1
+                for _ in range(30):
+                    ids = list(tasks)
+                    removed = rng.sample(ids, 2)
+                    kept = [t_id for t_id in ids if t_id not in removed]
+                    updated = {**tasks[rng.choice(kept)], "importance": rng.randint(1, 10)}
+                    # Dependencies on removed ids stay, unknown, as in any posted list
+                    added = {"id": next_id, "title": f"Task {next_id}", "due_date": None,
+                             "estimated_hours": rng.randint(1, 8), "importance": rng.randint(1, 10),
+                             "dependencies": rng.sample(kept, 2)}
+                    source, target = rng.sample(kept, 2)
+                    next_id += 1
+
+                    session.apply(add=[added], update=[updated], remove=removed,
+                                  add_dependencies=[(source, target)])
+                    for t_id in removed:
+                        del tasks[t_id]
+                    tasks[added["id"]] = added
+                    tasks[updated["id"]] = updated
+                    tasks[source] = {**tasks[source], "dependencies": [*tasks[source]["dependencies"], target]}
+                    self.assert_parity(session, list(tasks.values()), name)
+
+    def test_cycle_made_and_broken(self):
+        name = "smart_balance"
+        tasks = [dict(task) for task in self.tasks]
+        session = AnalysisSession(tasks, STRATEGIES[name], BENCHMARK_TODAY)
+        first, second = tasks[0]["id"], tasks[1]["id"]
+        session.apply(add_dependencies=[(first, second), (second, first)])
+        self.assertTrue(all(record.has_cycle for record in session.ranked() if record.task["id"] in (first, second)))
+        self.assert_parity(session, list(session.tasks.values()), name)
+
+        session.apply(remove_dependencies=[(second, first)])
+        self.assert_parity(session, list(session.tasks.values()), name)
+
+    def test_invalid_patch_leaves_session_unchanged(self):
+        session = AnalysisSession([dict(task) for task in self.tasks], STRATEGIES["smart_balance"], BENCHMARK_TODAY)
+        before = bytes(ScoredTaskJSONRenderer.render_records(session.ranked()))
+        with self.assertRaises(ValueError):
+            session.apply(update=[{**self.tasks[0], "importance": 1}], remove=[-1])
+        self.assertEqual(bytes(ScoredTaskJSONRenderer.render_records(session.ranked())), before)
+
+    def test_patch_leaves_given_tasks_alone(self):
+        session = AnalysisSession([dict(task) for task in self.tasks], STRATEGIES["smart_balance"], BENCHMARK_TODAY)
+        first, second = self.tasks[0]["id"], self.tasks[1]["id"]
+        added = {**self.tasks[2], "id": -1, "dependencies": [first]}
+        updated = {**self.tasks[0], "importance": 1}
+        given = json.dumps([added, updated], default=str)
+
+        # Fails on its last edge, after the added and updated tasks got theirs
+        with self.assertRaises(ValueError):
+            session.apply(add=[added], update=[updated], add_dependencies=[(-1, second), (first, second)],
+                          remove_dependencies=[(-1, first), (-1, 99999)])
+        self.assertEqual(json.dumps([added, updated], default=str), given)
+
+        session.apply(add=[added], update=[updated], add_dependencies=[(-1, second), (first, second)])
+        self.assertEqual(json.dumps([added, updated], default=str), given)
+        self.assertEqual(session.tasks[-1]["dependencies"], [first, second])
+
+    def test_non_finite_hours_rejected(self):
+        tasks = payload(self.tasks[:5])
+        response = self.client.post("/api/tasks/sessions/", json.dumps([*tasks, {**tasks[0], "id": -1, "estimated_hours": "nan"}]),
+                                    content_type="application/json")
+        self.assertEqual((response.status_code, response.json()[5]), (400, {"estimated_hours": ["Must be a finite number."]}))
+
+        response = self.client.post("/api/tasks/sessions/", json.dumps(tasks), content_type="application/json")
+        location = response["Location"]
+        before = self.client.get(location).json()
+        patches = [
+            ({"update": [{"id": tasks[0]["id"], "importance": 2}, {"id": tasks[1]["id"], "estimated_hours": "nan"}]},
+             {"update": {"1": {"estimated_hours": ["Must be a finite number."]}}}),
+            ({"add": [{**tasks[0], "id": -1, "estimated_hours": "-inf"}]},
+             {"add": [{"estimated_hours": ["Must be a finite number."]}]}),
+        ]
+        for patch, errors in patches:
+            response = self.client.patch(location, json.dumps(patch), content_type="application/json")
+            self.assertEqual((response.status_code, response.json()), (400, errors))
+            self.assertEqual(self.client.get(location).json(), before)
+
+class ImportTasksUseCaseTests(TestCase):
+    """A bulk import must store what one save per task would, in a bounded number of queries."""
+
+    def setUp(self):
+        # Acyclic, dependencies listed before and after their tasks
+        self.tasks = fan_tasks(500, seed=5)
+        random.Random(5).shuffle(self.tasks)
+
+    def stored_scores(self):
+        return sorted(
+            TaskScore.objects.values_list('task_id', 'strategy', 'score', 'priority_level', 'explanation', 'has_cycle')
+        )
+
+    def test_import_matches_refreshed_scores(self):
+        with CaptureQueriesContext(connection) as queries:
+            ids = ImportTasksUseCase(batch_size=200).execute(self.tasks, today=BENCHMARK_TODAY)
+        # Batched inserts (SQLite caps a batch by its bound-parameter limit), not one per task or edge
+        self.assertLess(len(queries), 40)
+
+        id_of = {task["id"]: t_id for task, t_id in zip(self.tasks, ids)}
+        stored = {task["id"]: task for task in Task.objects.task_dicts()}
+        for task, t_id in zip(self.tasks, ids):
+            self.assertEqual(stored[t_id]["title"], task["title"])
+            self.assertEqual(sorted(stored[t_id]["dependencies"]), sorted({id_of[dep] for dep in task["dependencies"]}))
+
+        imported = self.stored_scores()
+        refresh_task_scores(ids, today=BENCHMARK_TODAY)
+        self.assertEqual(imported, self.stored_scores())
+
+    def test_without_bulk_insert_ids(self):
+        # Backends such as MySQL insert the tasks row by row
+        with mock.patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", new_callable=mock.PropertyMock, return_value=False,
+        ):
+            tasks = fan_tasks(60, seed=7)
+            ids = ImportTasksUseCase(batch_size=200).execute(tasks, today=BENCHMARK_TODAY)
+        stored = {task.pk: task for task in Task.objects.all()}
+        self.assertEqual(sorted(stored), sorted(ids))
+        for task, t_id in zip(tasks, ids):
+            self.assertEqual(stored[t_id].title, task["title"])
+            self.assertIsNotNone(stored[t_id].created_at)
+            self.assertIsNotNone(stored[t_id].updated_at)
+
+        imported = self.stored_scores()
+        refresh_task_scores(ids, today=BENCHMARK_TODAY)
+        self.assertEqual(imported, self.stored_scores())
+
+    def test_non_finite_hours_rejected(self):
+        for count in (3, 300):
+            tasks = payload(fan_tasks(count, seed=9))
+            tasks[1]["estimated_hours"] = "nan"
+            tasks[2]["estimated_hours"] = "inf"
+            response = self.client.post("/api/tasks/import/", json.dumps(tasks), content_type="application/json")
+            self.assertEqual(response.status_code, 400, count)
+            errors = response.json()
+            self.assertEqual(errors[1:3], [{"estimated_hours": ["Must be a finite number."]}] * 2)
+            self.assertFalse(any(errors[:1] + errors[3:]))
+        self.assertFalse(Task.objects.exists())
+
+    def test_rejected_before_writing(self):
+        cyclic = [dict(task) for task in self.tasks]
+        cyclic[0] = {**cyclic[0], "dependencies": [cyclic[1]["id"]]}
+        cyclic[1] = {**cyclic[1], "dependencies": [cyclic[0]["id"]]}
+        unknown = [{**self.tasks[0], "dependencies": [-1]}]
+        duplicate = [self.tasks[0], self.tasks[0]]
+        for tasks in (cyclic, unknown, duplicate):
+            with self.assertNumQueries(0), self.assertRaises(ValueError):
+                ImportTasksUseCase().execute(tasks, today=BENCHMARK_TODAY)
+        self.assertFalse(Task.objects.exists())
+
+
+@skipUnless(orjson, "orjson is not installed")
+class FastJSONCodecParityTests(SimpleTestCase):
+    """The orjson codec must parse and render exactly what the standard library does."""
+
+    def setUp(self):
+        self.tasks = clustered_tasks(300, seed=13, cluster_size=30)
+        self.tasks[0] = {**self.tasks[0], "title": "Line\u2028sep \u00e9", "estimated_hours": 0}
+        self.tasks[1] = {**self.tasks[1], "due_date": None}
+        # Written differently by orjson: these fall back to the standard library encoder
+        self.odd = [
+            {**self.tasks[2], "estimated_hours": 1e-5},
+            {**self.tasks[3], "estimated_hours": 2e17},
+            {**self.tasks[4], "id": 2 ** 70},
+        ]
+
+    def render(self, tasks, fast):
+        with override_settings(FAST_JSON_CODEC=fast):
+            records = AnalyzeTasksUseCase().rank(tasks, "smart_balance", today=BENCHMARK_TODAY)
+            rankings = AnalyzeTasksUseCase().rank_many(tasks, list(STRATEGIES), today=BENCHMARK_TODAY)
+            return (
+                bytes(ScoredTaskJSONRenderer.render_records(records)),
+                bytes(ScoredTaskJSONRenderer.render_rankings(rankings)),
+                bytes(ScoredTaskJSONRenderer.render_results(records[:10], session="s", task_count=10)),
+                ScoredTaskJSONRenderer().render(AnalysisResultSerializer([r.as_dict() for r in records], many=True).data),
+            )
+
+    def test_rendering(self):
+        rendered = self.render(self.tasks, True)
+        self.assertEqual(rendered, self.render(self.tasks, False))
+        self.assertEqual(rendered[0], rendered[3])
+        for task in self.odd:
+            tasks = [*self.tasks, task]
+            self.assertEqual(self.render(tasks, True), self.render(tasks, False))
+
+    def test_parsing(self):
+        bodies = [
+            ScoredTaskJSONRenderer().render(self.tasks, "application/json"),
+            b'[1, NaN]', b'[18446744073709551616, -9223372036854775809]', b'[1e400]',
+            b'["\\ud800"]', b'\xef\xbb\xbf[1]', b'[1,]', b'\xff', b'{"a": 1, "a": 2}',
+        ]
+        for body in bodies:
+            results = []
+            for fast in (False, True):
+                with override_settings(FAST_JSON_CODEC=fast):
+                    try:
+                        results.append(repr(FastJSONParser().parse(io.BytesIO(body), "application/json", {})))
+                    except Exception as exc:
+                        results.append(repr(exc))
+            self.assertEqual(results[0], results[1], body)
+
+
+class ScoreTaskFileUseCaseTests(SimpleTestCase):
+    """Ranking a file in chunks must write what /api/tasks/analyze/ answers for the same list."""
+
+    def setUp(self):
+        # Cycles, and dependencies across chunk boundaries
+        self.tasks = clustered_tasks(400, seed=17, cluster_size=40)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "tasks.ndjson")
+        with open(self.path, "wb") as file:
+            for task in self.tasks:
+                file.write(ScoredTaskJSONRenderer().render(task) + b"\n")
+
+    def score_file(self, strategy_name, limit=None):
+        output = io.StringIO()
+        use_case = ScoreTaskFileUseCase(strategy_name, workers=1, chunk_size=97, today=BENCHMARK_TODAY)
+        report = use_case.execute(self.path, "ndjson", output, "json", limit=limit)
+        self.assertEqual(report.tasks, len(self.tasks))
+        return output.getvalue().encode()
+
+    def test_matches_analyze(self):
+        validator = BulkTaskInputValidator(self.tasks)
+        self.assertTrue(validator.is_valid())
+        for strategy_name in STRATEGIES:
+            for limit in (None, 25):
+                records = AnalyzeTasksUseCase().rank(
+                    validator.validated_data, strategy_name, limit=limit, today=BENCHMARK_TODAY
+                )
+                expected = bytes(ScoredTaskJSONRenderer.render_records(records))
+                self.assertEqual(self.score_file(strategy_name, limit), expected, (strategy_name, limit))
+
+    def test_invalid_file(self):
+        with open(self.path, "a") as file:
+            file.write('{"title": "", "estimated_hours": 1}\n')
+        with self.assertRaisesMessage(ValueError, f"line {len(self.tasks) + 1}:"):
+            self.score_file("smart_balance")
+
+
+@skipUnless(batch_scoring.is_available(), "NumPy is not installed")
+class WeightSensitivityParityTests(SimpleTestCase):
+    """Every weighting must rank the tasks as analyze does with those weights."""
+
+    def setUp(self):
+        self.tasks = clustered_tasks(400, seed=19, cluster_size=40)
+        rng = random.Random(19)
+        self.weightings = [
+            {name: rng.choice([0, 0.05, 0.1, 0.25, rng.random()]) for name in ("urgency", "importance", "effort", "dependencies")}
+            for _ in range(30)
+        ]
+
+    def rank(self, weights):
+        records = AnalyzeTasksUseCase().rank(
+            self.tasks, "smart_balance", config={"weights": weights}, today=BENCHMARK_TODAY
+        )
+        return [record.position for record in records], {record.position: record.score for record in records}
+
+    def kendall_tau(self, head, reference_scores, scores):
+        concordance = pairs = reference_pairs = 0
+        for i, first in enumerate(head):
+            for second in head[i + 1:]:
+                a = (reference_scores[first] > reference_scores[second]) - (reference_scores[first] < reference_scores[second])
+                b = (scores[first] > scores[second]) - (scores[first] < scores[second])
+                concordance += a * b
+                pairs += b != 0
+                reference_pairs += a != 0
+        return round(concordance / (pairs * reference_pairs) ** 0.5, 4)
+
+    def test_matches_analyze(self):
+        grid = {"urgency": [0.1, 0.3, 0.5], "effort": [0.0, 0.2]}
+        use_case = WeightSensitivityUseCase(tau_tasks=60, chunk_size=7)
+        results = use_case.execute(self.tasks, self.weightings, grid=grid, top_k=12, today=BENCHMARK_TODAY)
+
+        reference_order, reference_scores = self.rank(None)
+        self.assertEqual(results["reference"]["top"], reference_order[:12])
+        head = reference_order[:60]
+        grid_weightings = [
+            {"urgency": urgency, "importance": 0.3, "effort": effort, "dependencies": 0.1}
+            for urgency in grid["urgency"] for effort in grid["effort"]
+        ]
+        counts = {}
+        for weights, result in zip(self.weightings + grid_weightings, results["weightings"]):
+            order, scores = self.rank(weights)
+            self.assertEqual(result["top"], order[:12], weights)
+            self.assertEqual(result["kendall_tau"], self.kendall_tau(head, reference_scores, scores), weights)
+            for position in order[:12]:
+                counts[position] = counts.get(position, 0) + 1
+        shares = {task["position"]: task["top_k_share"] for task in results["tasks"]}
+        self.assertEqual(shares, {
+            position: round(counts.get(position, 0) / 36, 4) for position in set(counts) | set(reference_order[:12])
+        })
+
+    def post(self, body):
+        return self.client.post("/api/tasks/sensitivity/", json.dumps(body), content_type="application/json")
+
+    def test_rejects_overflowing_weights(self):
+        tasks = payload(self.tasks[:20])
+        response = self.post({"tasks": tasks, "weights": [{"urgency": 1e308}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("urgency", response.json()["weights"]["0"])
+        response = self.post({"tasks": tasks, "grid": {"importance": [0.5, 1e7]}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("grid", response.json())
+
+        # Within the cap, but huge importances would still overflow the scores
+        tasks[3]["importance"] = 10 ** 300
+        response = self.post({"tasks": tasks, "weights": [{"importance": 1e6}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("overflow", response.json()["error"])
+        response = self.post({"tasks": tasks, "weights": [{"importance": 0, "urgency": 1e6}], "reference": {"urgency": 1}})
+        self.assertEqual(response.status_code, 200)
+
+    def test_without_numpy(self):
+        with mock.patch.object(batch_scoring, "is_available", return_value=False):
+            response = self.post({"tasks": payload(self.tasks[:5]), "weights": [{"urgency": 1}]})
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response.json(), {"error": "Weight sensitivity analysis needs NumPy"})
+
+
+class ForecastParityTests(SimpleTestCase):
+    """Every day of a forecast must rank the tasks as analyze does on that day."""
+
+    def setUp(self):
+        self.tasks = clustered_tasks(300, seed=23, cluster_size=30)
+
+    def check(self, strategy_name, limit=None):
+        forecast = AnalyzeTasksUseCase().forecast(
+            self.tasks, strategy_name, start=BENCHMARK_TODAY, days=14, limit=limit
+        )
+        crossings = {}
+        previous = None
+        for offset in range(14):
+            day = BENCHMARK_TODAY + timedelta(days=offset)
+            records = AnalyzeTasksUseCase().rank(self.tasks, strategy_name, today=day)
+            self.assertEqual(
+                [(r.position, r.score, r.priority_level, r.explanation) for r in forecast["rankings"][day.isoformat()]],
+                [(r.position, r.score, r.priority_level, r.explanation) for r in records[:limit]],
+                (strategy_name, day),
+            )
+            levels = {record.position: batch_scoring.PRIORITY_LABELS.index(record.priority_level) for record in records}
+            for position, level in levels.items():
+                for name, threshold in (("medium", 1), ("high", 2)):
+                    if previous and previous[position] < threshold <= level:
+                        crossings.setdefault((position, name), day.isoformat())
+            previous = levels
+        self.assertEqual(
+            {(c["position"], name): c[name] for c in forecast["crossings"] for name in ("medium", "high") if c[name]},
+            crossings,
+        )
+
+    def test_matches_analyze(self):
+        for strategy_name in STRATEGIES:
+            self.check(strategy_name)
+        self.check("smart_balance", limit=10)
+
+    def test_without_numpy(self):
+        with mock.patch.object(batch_scoring, "is_available", return_value=False):
+            self.check("deadline_driven")
+            self.check("smart_balance", limit=10)
+
+    def test_unknown_strategy_is_not_a_metrics_label(self):
+        metrics = get_request_metrics()
+        metrics.clear()
+        response = self.client.post(
+            '/api/tasks/forecast/?strategy=bogus"x', json.dumps(payload(self.tasks[:5])), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("bogus", metrics.prometheus())
+
+
+class NDJSONAnalyzeTests(SimpleTestCase):
+    """NDJSON requests must rank like JSON ones, or reject the line that cannot be answered."""
+
+    def post(self, body, content_type):
+        response = self.client.post("/api/tasks/analyze/?strategy=smart_balance", body, content_type=content_type)
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content
+
+    def test_matches_json(self):
+        tasks = [
+            {"id": 2 ** 70, "title": "Huge", "estimated_hours": 1, "importance": 2 ** 70, "dependencies": [2 ** 71]},
+            {"id": 2 ** 71, "title": "Dependency", "due_date": "2026-01-20", "estimated_hours": 2.5, "importance": 4},
+            {"title": "No id", "estimated_hours": 0, "importance": 7},
+        ]
+        status, content = self.post("\n".join(json.dumps(task) for task in tasks), "application/x-ndjson")
+        self.assertEqual(status, 200)
+        status, expected = self.post(json.dumps(tasks), "application/json")
+        self.assertEqual(status, 200)
+        self.assertEqual([json.loads(line) for line in content.splitlines()], json.loads(expected))
+
+    def test_non_finite_hours(self):
+        body = '{"title": "Ok", "estimated_hours": 1}\n{"title": "Bad", "estimated_hours": NaN}'
+        status, content = self.post(body, "application/x-ndjson")
+        self.assertEqual(status, 400)
+        self.assertEqual(json.loads(content), [{"line": 2, "errors": {"estimated_hours": ["Must be a finite number."]}}])
+
+
+def random_graph_tasks(rng, n, edge_chance, hours=(-2, 0, 0.25, 1, 3.5, 8, 40)):
+    """Tasks with ids 0..n-1 and random dependencies among them, cycles included."""
+    return [
+        {
+            "id": i, "title": f"Task {i}", "estimated_hours": rng.choice(hours), "importance": rng.randint(1, 10),
+            "dependencies": [j for j in range(n) if j != i and rng.random() < edge_chance],
+        }
+        for i in range(n)
+    ]
+
+
+def reachable(tasks):
+    """{id: ids it depends on, directly or not}, by depth-first search from every task."""
+    dependencies = {task["id"]: task["dependencies"] for task in tasks}
+    closure = {}
+    for start in dependencies:
+        seen = set()
+        stack = list(dependencies[start])
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                stack.extend(dependencies.get(node, ()))
+        closure[start] = seen
+    return closure
+
+
+class CycleDetectionTests(SimpleTestCase):
+    """Every task on a dependency cycle, and only those, must be flagged; however deep the graph."""
+
+    def flagged(self, tasks):
+        records = AnalyzeTasksUseCase().rank(tasks, "fastest_wins", today=BENCHMARK_TODAY)
+        return {tasks[record.position]["id"] for record in records if record.has_cycle}
+
+    def test_matches_brute_force(self):
+        rng = random.Random(67)
+        for n, edge_chance in ((1, 0.0), (8, 0.2), (30, 0.04), (60, 0.02), (60, 0.05)):
+            for _ in range(5):
+                tasks = random_graph_tasks(rng, n, edge_chance)
+                closure = reachable(tasks)
+                on_cycle = {i for i in closure if i in closure[i]}
+                self.assertEqual(self.flagged(tasks), on_cycle)
+                groups = detect_cycles(build_dependency_graph(tasks))
+                self.assertEqual(
+                    sorted(tuple(sorted(group)) for group in groups),
+                    sorted({tuple(sorted({i} | {j for j in closure[i] if i in closure[j]})) for i in on_cycle}),
+                )
+
+    def test_deep_chain(self):
+        # Far deeper than the recursion limit: task i depends on i - 1, then task 1000 on the last one
+        n = 20_000
+        tasks = [
+            {"id": i, "title": f"Task {i}", "estimated_hours": 1, "importance": 5, "dependencies": [i - 1] if i else []}
+            for i in range(n)
+        ]
+        self.assertEqual(detect_cycles(build_dependency_graph(tasks)), [])
+        self.assertEqual(self.flagged(tasks), set())
+
+        tasks[1000]["dependencies"].append(n - 1)
+        groups = detect_cycles(build_dependency_graph(tasks))
+        self.assertEqual([sorted(group) for group in groups], [list(range(1000, n))])
+        # All members of the cycle are flagged, not the tasks that merely lead into it
+        self.assertEqual(self.flagged(tasks), set(range(1000, n)))
+
+        tasks[0]["dependencies"].append(0)
+        self.assertEqual(self.flagged(tasks), {0} | set(range(1000, n)))
+
+
+class DependencyIndexTests(SimpleTestCase):
+    """DependencyIndex must count dependents as the original per-task loop did."""
+
+    def loop_counts(self, tasks):
+        # The loop DependencyIndex replaced: one dependent per listed dependency on a known id
+        dependents = {task["id"]: [] for task in tasks if task.get("id") is not None}
+        for task in tasks:
+            for dependency in task.get("dependencies", []):
+                dependency = dependency.get("id") if isinstance(dependency, dict) else dependency
+                if dependency in dependents:
+                    dependents[dependency].append(task.get("id"))
+        return [len(dependents[task["id"]]) if task.get("id") is not None else 0 for task in tasks]
+
+    def test_matches_loop(self):
+        tasks = [
+            {"id": 1, "title": "A", "dependencies": []},
+            {"id": 2, "title": "B", "dependencies": [1, 1, 99]},
+            {"id": 3, "title": "C", "dependencies": [{"id": 1}, 2, 3]},
+            {"title": "No id", "dependencies": [2, 404]},
+            {"id": 2, "title": "B again", "dependencies": [3]},
+            {"id": 4, "title": "D"},
+        ]
+        index = DependencyIndex.from_tasks(tasks)
+        self.assertEqual(index.task_dependents_counts(), [3, 2, 2, 0, 2, 0])
+        self.assertEqual(index.task_dependents_counts(), self.loop_counts(tasks))
+        # Unknown ids are dropped, duplicates kept as edges
+        self.assertEqual(index.edge_count, 7)
+        self.assertEqual(
+            [task.get("dependents_count") for task in calculate_dependents_count([dict(task) for task in tasks])],
+            [3, 2, 2, None, 2, 0],
+        )
+
+        rng = random.Random(71)
+        for _ in range(20):
+            tasks = random_graph_tasks(rng, 30, 0.1)
+            for task in tasks:
+                task["dependencies"] += [rng.randrange(40) for _ in range(rng.randint(0, 3))]
+                if rng.random() < 0.1:
+                    task["id"] = rng.choice([None, rng.randrange(30)])
+            self.assertEqual(DependencyIndex.from_tasks(tasks).task_dependents_counts(), self.loop_counts(tasks))
+
+
+class ReachabilityIndexTests(SimpleTestCase):
+    """ReachabilityIndex must count and sum the transitive dependents found by depth-first search."""
+
+    def check(self, tasks, max_bytes=None):
+        closure = reachable(tasks)
+        hours = {task["id"]: max(task["estimated_hours"], 0.0) for task in tasks}
+        dependents = {i: [j for j in closure if j != i and i in closure[j]] for i in closure}
+
+        index = DependencyIndex.from_tasks(tasks)
+        if max_bytes is None:
+            reachability = ReachabilityIndex.from_tasks(tasks, index=index)
+        else:
+            reachability = ReachabilityIndex(index, index.node_hours(tasks), max_bytes=max_bytes)
+        self.assertEqual(reachability.task_dependents_counts(), [len(dependents[task["id"]]) for task in tasks])
+        for task, total in zip(tasks, reachability.task_dependents_hours()):
+            self.assertAlmostEqual(total, sum(hours[j] for j in dependents[task["id"]]))
+
+    def test_matches_brute_force(self):
+        rng = random.Random(47)
+        for n, edge_chance in ((1, 0.0), (10, 0.25), (30, 0.05), (60, 0.03), (60, 0.08)):
+            for _ in range(5):
+                tasks = random_graph_tasks(rng, n, edge_chance)
+                self.check(tasks)
+                # The same graph without cycles: dependencies on lower ids only
+                for task in tasks:
+                    task["dependencies"] = [j for j in task["dependencies"] if j < task["id"]]
+                self.check(tasks)
+
+    def test_several_blocks(self):
+        # More components than one block holds, so the bitsets are built in several passes
+        rng = random.Random(53)
+        tasks = random_graph_tasks(rng, 300, 0.01)
+        tasks[7]["dependencies"].append(7)
+        self.check(tasks, max_bytes=1)
+        self.check(tasks)
+
+
+class CriticalPathTests(SimpleTestCase):
+    """critical_path() must agree with longest paths over the cycle-collapsed graph, found the slow way."""
+
+    def brute_force(self, tasks):
+        closure = reachable(tasks)
+        hours = {task["id"]: max(task["estimated_hours"], 0.0) for task in tasks}
+        block = {i: frozenset({i} | {j for j in closure[i] if i in closure[j]}) for i in hours}
+        block_hours = {b: sum(hours[i] for i in b) for b in block.values()}
+        dependencies = {b: set() for b in block_hours}
+        dependents = {b: set() for b in block_hours}
+        for task in tasks:
+            for dependency in task["dependencies"]:
+                if block[dependency] != block[task["id"]]:
+                    dependencies[block[task["id"]]].add(block[dependency])
+                    dependents[block[dependency]].add(block[task["id"]])
+
+        def start(b):
+            return max((start(d) + block_hours[d] for d in dependencies[b]), default=0.0)
+
+        def remaining(b):
+            return block_hours[b] + max((remaining(d) for d in dependents[b]), default=0.0)
+
+        starts = {b: start(b) for b in block_hours}
+        rests = {b: remaining(b) for b in block_hours}
+        length = max(starts[b] + rests[b] for b in block_hours)
+        return {i: (starts[block[i]], rests[block[i]], length - starts[block[i]] - rests[block[i]]) for i in hours}
+
+    def test_matches_brute_force(self):
+        rng = random.Random(29)
+        for n, edge_chance in ((1, 0.0), (8, 0.3), (25, 0.08), (40, 0.02), (40, 0.1)):
+            for _ in range(5):
+                tasks = random_graph_tasks(rng, n, edge_chance)
+                index = DependencyIndex.from_tasks(tasks)
+                path = critical_path(index, index.node_hours(tasks))
+                expected = self.brute_force(tasks)
+                for task, node in zip(tasks, index.task_nodes):
+                    component = path.component_of[node]
+                    start, rest, slack = expected[task["id"]]
+                    self.assertAlmostEqual(path.earliest_start[component], start)
+                    self.assertAlmostEqual(path.remaining[component], rest)
+                    self.assertAlmostEqual(path.slack[component], slack)
+
+    def test_huge_and_negative_hours(self):
+        tasks = [
+            {"id": 1, "title": "Huge", "estimated_hours": 1e308, "importance": 5},
+            {"id": 2, "title": "Huge too", "estimated_hours": 1e308, "importance": 5, "dependencies": [1]},
+            {"id": 3, "title": "Negative", "estimated_hours": -4.0, "importance": 5},
+            {"id": 4, "title": "After negative", "estimated_hours": 2.0, "importance": 5, "dependencies": [3]},
+        ]
+        response = self.client.post(
+            "/api/tasks/analyze/?strategy=critical_path", json.dumps(tasks), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        results = {result["id"]: result for result in response.json()}
+        self.assertEqual(results[1]["score"], 10.0)
+        # Negative estimates count as no work: task 4 can start right away
+        self.assertIn("can start after 0.0h", results[4]["explanation"])
+
+
+class PlanTasksTests(SimpleTestCase):
+    """plan_tasks() must find the best dependency-closed set of tasks in the budget, in working order."""
+
+    def units(self, task):
+        return math.ceil(max(task["estimated_hours"], 0.0) / 0.25 - 1e-9)
+
+    def best_score(self, tasks, scores, budget_hours):
+        # Every subset of the tasks that holds everything its tasks depend on
+        closure = reachable(tasks)
+        capacity = math.floor(budget_hours / 0.25 + 1e-9)
+        best = 0.0
+        for mask in range(1 << len(tasks)):
+            chosen = {task["id"] for i, task in enumerate(tasks) if mask >> i & 1}
+            if all(closure[i] <= chosen for i in chosen) and \
+                    sum(self.units(task) for task in tasks if task["id"] in chosen) <= capacity:
+                best = max(best, sum(scores[i] for i, task in enumerate(tasks) if task["id"] in chosen))
+        return round(best, 2)
+
+    def assert_valid(self, tasks, scores, budget_hours, plan):
+        closure = reachable(tasks)
+        order = {tasks[position]["id"]: k for k, position in enumerate(plan.positions)}
+        self.assertEqual(len(order), len(plan.positions))
+        for task_id, k in order.items():
+            for dependency in closure[task_id]:
+                self.assertIn(dependency, order)
+                # Dependencies come first, except within a cycle
+                if task_id not in closure[dependency]:
+                    self.assertLess(order[dependency], k)
+        chosen = [tasks[position] for position in plan.positions]
+        self.assertLessEqual(sum(self.units(task) for task in chosen), math.floor(budget_hours / 0.25 + 1e-9))
+        self.assertAlmostEqual(plan.hours, sum(max(task["estimated_hours"], 0.0) for task in chosen))
+        self.assertAlmostEqual(plan.score, round(sum(scores[position] for position in plan.positions), 2))
+
+    def random_cases(self):
+        rng = random.Random(59)
+        for n, edge_chance in ((1, 0.0), (6, 0.2), (9, 0.15), (11, 0.1), (11, 0.25)):
+            for _ in range(6):
+                tasks = random_graph_tasks(rng, n, edge_chance, hours=(-1, 0, 0.25, 0.3, 1, 2.5, 4, 9))
+                scores = [rng.choice([0.0, round(rng.uniform(0, 10), 2)]) for _ in tasks]
+                yield tasks, scores, rng.choice([0, 0.2, 1, 3.75, 8, 20])
+
+    def test_exact_matches_brute_force(self):
+        for tasks, scores, budget_hours in self.random_cases():
+            plan = plan_tasks(tasks, scores, budget_hours)
+            self.assertTrue(plan.exact)
+            self.assert_valid(tasks, scores, budget_hours, plan)
+            self.assertAlmostEqual(plan.score, self.best_score(tasks, scores, budget_hours))
+
+    def test_greedy_fallback(self):
+        with mock.patch.object(planner, "PLANNER_DP_MAX_CELLS", -1):
+            for tasks, scores, budget_hours in self.random_cases():
+                plan = plan_tasks(tasks, scores, budget_hours)
+                # Plans holding every scored task need no search and stay exact
+                everything = round(sum(score for score in scores if score > 0), 2)
+                self.assertEqual(plan.exact, math.isclose(plan.score, everything))
+                self.assert_valid(tasks, scores, budget_hours, plan)
+                self.assertLessEqual(plan.score, self.best_score(tasks, scores, budget_hours) + 1e-9)
+
+            # Best score per hour first: the quick task leaves no room for the better long one
+            tasks = [
+                {"id": 1, "title": "Quick", "estimated_hours": 1, "importance": 5},
+                {"id": 2, "title": "Long", "estimated_hours": 4, "importance": 5},
+            ]
+            plan = plan_tasks(tasks, [3.0, 8.0], 4)
+            self.assertEqual((plan.positions, plan.score, plan.exact), ([0], 3.0, False))
+        self.assertEqual(plan_tasks(tasks, [3.0, 8.0], 4), planner.Plan([1], 4.0, 8.0, True))
+
+    def test_long_chains(self):
+        def chain(n, hours):
+            return [
+                {"id": i, "title": f"Step {i}", "estimated_hours": hours, "dependencies": [i - 1] if i else []}
+                for i in range(n)
+            ]
+
+        cases = [
+            (chain(2000, 1), 1e6, 168),
+            (chain(3000, 0.25), 200, 672),
+            (chain(5000, 0), 8, 5000),
+            (chain(5000, 0) + [{"id": -1, "title": "Huge", "estimated_hours": 1000, "dependencies": []}], 8, 5000),
+            (chain(3000, 0.25) + [{"id": -1, "title": "Endless", "estimated_hours": math.inf, "dependencies": []}], 100, 400),
+        ]
+        for tasks, budget_hours, steps in cases:
+            scores = [1.0 + i % 7 for i in range(len(tasks))]
+            started = time.perf_counter()
+            plan = plan_tasks(tasks, scores, budget_hours)
+            self.assertLess(time.perf_counter() - started, 2.0)
+            # The first steps of the chain, in order, within a budget capped at a week
+            self.assertEqual(plan.positions, list(range(steps)))
+            self.assertLessEqual(plan.hours, min(budget_hours, 168))
+            self.assertAlmostEqual(plan.score, round(sum(scores[:steps]), 2))
+
+    def test_budget_limit(self):
+        response = self.client.post("/api/tasks/suggest/?hours=1000", "[]", content_type="application/json")
+        self.assertEqual((response.status_code, response.json()), (400, {"error": "hours must be at most 168"}))
+
+    def test_dependency_order(self):
+        tasks = [
+            {"id": 1, "title": "Ship", "estimated_hours": 1, "importance": 5, "dependencies": [2, 3]},
+            {"id": 2, "title": "Build", "estimated_hours": 2, "importance": 5, "dependencies": [4]},
+            {"id": 3, "title": "Review", "estimated_hours": 1, "importance": 5, "dependencies": [4]},
+            {"id": 4, "title": "Design", "estimated_hours": 1, "importance": 5, "dependencies": [99]},
+            {"id": 5, "title": "Unrelated", "estimated_hours": 8, "importance": 5},
+        ]
+        plan = plan_tasks(tasks, [9.0, 1.0, 2.0, 0.5, 5.0], 5)
+        # Unknown dependency 99 counts as done; among ready tasks the best scored goes first
+        self.assertEqual(plan.positions, [3, 2, 1, 0])
+        self.assertEqual((plan.hours, plan.score, plan.exact), (5.0, 12.5, True))
+
+
+class TaskScoreSyncTests(TestCase):
+    """Signals must keep TaskScore equal to a full analysis of the stored tasks after every change."""
+
+    def assert_in_sync(self, today=None):
+        today = today or date.today()
+        tasks = Task.objects.task_dicts()
+        for strategy_name in STORED_STRATEGIES:
+            expected = {
+                result["id"]: (result["score"], result["priority_level"], result["explanation"])
+                for result in AnalyzeTasksUseCase().execute(tasks, strategy_name, today=today)
+            }
+            stored = {
+                row.task_id: (row.score, row.priority_level, (CYCLE_PREFIX if row.has_cycle else "") + row.explanation)
+                for row in TaskScore.objects.filter(strategy=strategy_name)
+            }
+            self.assertEqual(stored, expected, strategy_name)
+
+    def create_tasks(self, rng, n):
+        today = date.today()
+        return [
+            Task.objects.create(
+                title=f"Task {i}", estimated_hours=rng.choice([0.5, 2, 8]), importance=rng.randint(1, 10),
+                due_date=rng.choice([None, today - timedelta(days=2), today, today + timedelta(days=rng.randint(1, 20))]),
+            )
+            for i in range(n)
+        ]
+
+    def test_random_changes(self):
+        rng = random.Random(31)
+        tasks = self.create_tasks(rng, 8)
+        self.assert_in_sync()
+        cycles_seen = False
+        for step in range(60):
+            task, other = rng.sample(tasks, 2)
+            action = rng.choice(
+                ["add"] * 4 + ["add_reverse"] * 2 + ["remove", "remove_reverse", "clear", "clear_reverse", "save", "delete"]
+            )
+            if action == "add":
+                task.dependencies.add(other)
+            elif action == "add_reverse":
+                task.dependents.add(other)
+            elif action == "remove":
+                task.dependencies.remove(*task.dependencies.all()[:1])
+            elif action == "remove_reverse":
+                task.dependents.remove(*task.dependents.all()[:1])
+            elif action == "clear":
+                task.dependencies.clear()
+            elif action == "clear_reverse":
+                task.dependents.clear()
+            elif action == "save":
+                task.estimated_hours = rng.choice([1, 3, 12])
+                task.due_date = date.today() + timedelta(days=rng.randint(-3, 10))
+                task.save()
+            elif len(tasks) > 4:
+                tasks.remove(task)
+                task.delete()
+                tasks.append(*self.create_tasks(rng, 1))
+            self.assert_in_sync()
+            cycles_seen = cycles_seen or TaskScore.objects.filter(has_cycle=True).exists()
+        self.assertTrue(cycles_seen)
+
+    def test_stale_dates_refreshed(self):
+        self.create_tasks(random.Random(37), 20)
+        yesterday = date.today() - timedelta(days=1)
+        refresh_task_scores(Task.objects.values_list("id", flat=True), today=yesterday)
+        self.assert_in_sync(yesterday)
+
+        refresh_stale_scores()
+        self.assert_in_sync()
+        self.assertFalse(TaskScore.objects.filter(strategy__in=DATE_DEPENDENT_STRATEGIES, computed_on=yesterday).exists())
+        self.assertEqual(set(DATE_DEPENDENT_STRATEGIES), {"deadline_driven", "smart_balance"})
+
+        expected = AnalyzeTasksUseCase().execute(Task.objects.task_dicts(), "smart_balance", limit=5)
+        self.assertEqual(
+            [(r["id"], r["score"]) for r in SuggestStoredTasksUseCase().execute(limit=5)],
+            [(r["id"], r["score"]) for r in expected],
+        )
+
+
+class BatchScoringParityTests(SimpleTestCase):
+    """The NumPy batch path must score and rank exactly like the per-task loop."""
+
+    def setUp(self):
+        rng = random.Random(41)
+        self.tasks = random_graph_tasks(rng, 300, 0.004, hours=(-3, 0, 0, 0.5, 1, 2, 2, 7.5, 40))
+        for task in self.tasks:
+            task["importance"] = rng.choice([0, 1, 5, 5, 5, 10])
+            task["due_date"] = rng.choice([
+                None, "", "2026-02-30", "not a date",
+                BENCHMARK_TODAY - timedelta(days=rng.randint(1, 30)), BENCHMARK_TODAY,
+                (BENCHMARK_TODAY + timedelta(days=rng.randint(1, 25))).isoformat(),
+                BENCHMARK_TODAY + timedelta(days=rng.randint(1, 25)),
+            ])
+        # A long cycle and a self-dependency
+        for i in range(10, 20):
+            self.tasks[i]["dependencies"].append(i + 1 if i < 19 else 10)
+        self.tasks[50]["dependencies"].append(50)
+
+    def rankings(self, batch):
+        patches = [mock.patch.object(batch_scoring, "is_available", return_value=batch)]
+        if batch:
+            patches.append(mock.patch.object(batch_scoring, "BATCH_SCORING_MIN_TASKS", 0))
+        with contextlib.ExitStack() as stack:
+            for patch in patches:
+                stack.enter_context(patch)
+            self.assertEqual(batch_scoring.should_use_batch(self.tasks), batch)
+            results = {}
+            for name, strategy in STRATEGIES.items():
+                for limit in (None, 1, 7, 299):
+                    records = AnalyzeTasksUseCase().rank(self.tasks, name, limit=limit, today=BENCHMARK_TODAY)
+                    results[name, limit] = [
+                        (r.position, r.score, r.priority_level, r.explanation, r.has_cycle) for r in records
+                    ]
+                records = strategy.evaluate_tasks(self.tasks, today=BENCHMARK_TODAY)
+                results[name, "evaluate"] = [(r.position, r.score, r.priority_level, r.explanation) for r in records]
+            return results
+
+    def test_batch_matches_loop(self):
+        loop = self.rankings(False)
+        batch = self.rankings(True)
+        for key in loop:
+            self.assertEqual(batch[key], loop[key], key)
+        scores = [score for _, score, _, _, _ in loop["smart_balance", None]]
+        self.assertGreater(len(scores), len(set(scores)))
+        self.assertTrue(any(has_cycle for *_, has_cycle in loop["smart_balance", None]))
+
+
+def _slow_job(marker, seconds, slot=None):
+    """A pool job that creates `marker` once it runs, then works in short stages for `seconds`."""
+    timer = JobTimer("test", slot)
+    open(marker, "w").close()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        with timer.stage("step"):
+            time.sleep(0.01)
+    return "done"
+
+
+class AsyncScoringTests(SimpleTestCase):
+    """The async views must answer like the DRF ones, inline or in the pool, and keep the pool bounded."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pool = ScoringPool(max_workers=1, max_pending=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+        super().tearDownClass()
+
+    def setUp(self):
+        tasks = clustered_tasks(60, seed=43, cluster_size=12)
+        tasks[3]["dependencies"].append(tasks[3]["id"])
+        self.bodies = [
+            json.dumps(payload(tasks)),
+            json.dumps(payload(tasks[:1])),
+            json.dumps([{"title": "Bad", "estimated_hours": -1, "importance": 11}]),
+            "{not json",
+        ]
+        self.queries = [
+            ("analyze", "?strategy=smart_balance"),
+            ("analyze", "?strategy=critical_path"),
+            ("analyze", "?strategies=deadline_driven,high_impact"),
+            ("analyze", "?strategy=bogus"),
+            ("suggest", "?limit=4"),
+            ("suggest", "?hours=6"),
+            ("suggest", "?hours=1000"),
+            ("suggest", "?limit=0"),
+        ]
+
+    async def check_matches_sync(self):
+        for endpoint, query in self.queries:
+            for body in self.bodies:
+                expected = await asyncio.to_thread(
+                    self.client.post, f"/api/tasks/{endpoint}/{query}", body, content_type="application/json"
+                )
+                response = await self.async_client.post(
+                    f"/api/async/tasks/{endpoint}/{query}", body, content_type="application/json"
+                )
+                self.assertEqual(
+                    (response.status_code, json.loads(response.content)),
+                    (expected.status_code, json.loads(expected.content)),
+                    (endpoint, query, body[:40]),
+                )
+
+    async def test_inline_matches_sync(self):
+        await self.check_matches_sync()
+
+    async def test_pool_matches_sync(self):
+        with override_settings(SCORING_POOL={"INLINE_MAX_BYTES": 0}), \
+                mock.patch("tasks.async_views.get_scoring_pool", return_value=self.pool):
+            await self.check_matches_sync()
+
+    async def test_full_pool(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jobs = [
+                asyncio.create_task(self.pool.run(_slow_job, os.path.join(directory, str(i)), 0.5)) for i in range(2)
+            ]
+            await asyncio.sleep(0)
+            self.assertEqual(self.pool.pending, 2)
+            with self.assertRaises(PoolFull):
+                await self.pool.run(_slow_job, os.path.join(directory, "extra"), 0)
+
+            with override_settings(SCORING_POOL={"INLINE_MAX_BYTES": 0}), \
+                    mock.patch("tasks.async_views.get_scoring_pool", return_value=self.pool):
+                response = await self.async_client.post(
+                    "/api/async/tasks/analyze/", self.bodies[0], content_type="application/json"
+                )
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response["Retry-After"], "1")
+
+            self.assertEqual(await asyncio.gather(*jobs), ["done", "done"])
+        self.assertEqual(self.pool.pending, 0)
+
+    async def test_cancelled_job_stops(self):
+        with tempfile.TemporaryDirectory() as directory:
+            marker = os.path.join(directory, "running")
+            job = asyncio.create_task(self.pool.run(_slow_job, marker, 60))
+            deadline = time.monotonic() + 60
+            while not os.path.exists(marker) and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            self.assertTrue(os.path.exists(marker))
+
+            job.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await job
+            # The job keeps its slot until it notices the cancellation at its next stage
+            deadline = time.monotonic() + 10
+            while self.pool.pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            self.assertEqual(self.pool.pending, 0)
+
+    def test_cancel_flag_checked_at_stages(self):
+        flags = [0, 1]
+        with mock.patch("tasks.services.scoring_pool._cancel_flags", flags):
+            status, _, _ = analyze_job(self.bodies[0].encode(), ["smart_balance"], False, BENCHMARK_TODAY, 0)
+            self.assertEqual(status, 200)
+            with self.assertRaises(JobCancelled):
+                analyze_job(self.bodies[0].encode(), ["smart_balance"], False, BENCHMARK_TODAY, 1)
+
+
+class RequestMetricsTests(SimpleTestCase):
+    """Stage timings must reach the Server-Timing header, the Prometheus export and ?profile=1 files."""
+
+    def post_analyze(self, metrics, query=""):
+        tasks = payload(clustered_tasks(20, seed=61, cluster_size=5))
+        # A fresh cache, so that every request is scored
+        with mock.patch("tasks.views.get_request_metrics", return_value=metrics), \
+                mock.patch("tasks.views.get_analysis_cache", return_value=AnalysisResultCache()):
+            return self.client.post(
+                f"/api/tasks/analyze/?strategy=smart_balance{query}", json.dumps(tasks), content_type="application/json"
+            )
+
+    def test_server_timing(self):
+        metrics = RequestMetrics()
+        response = self.post_analyze(metrics)
+        self.assertEqual(response.status_code, 200)
+        timings = {}
+        for entry in response["Server-Timing"].split(", "):
+            name, duration = entry.split(";dur=")
+            timings[name] = float(duration)
+        self.assertLessEqual({"total", "parse", "validate", "cache", "score", "render"}, set(timings))
+        self.assertTrue(all(0 <= duration <= timings["total"] for duration in timings.values()))
+        self.assertIn('endpoint="analyze",stage="score",strategy="smart_balance",size="0-100"', metrics.prometheus())
+
+        disabled = RequestMetrics(enabled=False)
+        self.assertNotIn("Server-Timing", self.post_analyze(disabled))
+        self.assertNotIn('endpoint="analyze"', disabled.prometheus())
+
+    def test_strategy_set_label(self):
+        metrics = RequestMetrics()
+        for query in ("&strategies=high_impact,deadline_driven", "&strategies=deadline_driven,high_impact,deadline_driven"):
+            self.assertEqual(self.post_analyze(metrics, query).status_code, 200)
+        name = "task_analyzer_stage_duration_seconds_count"
+        counts = [line for line in metrics.prometheus().splitlines() if line.startswith(name) and 'stage="score"' in line]
+        self.assertEqual(counts, [
+            f'{name}{{endpoint="analyze",stage="score",strategy="deadline_driven,high_impact",size="0-100"}} 2',
+        ])
+
+    def test_prometheus_text(self):
+        metrics = RequestMetrics()
+        timer = StageTimer("analyze")
+        timer.label(strategy='a"b\\c\nd', task_count=150)
+        timer.stages = {"score": 0.003}
+        metrics.record(timer)
+        metrics.record(timer)
+
+        lines = metrics.prometheus().splitlines()
+        labels = 'endpoint="analyze",stage="score",strategy="a\\"b\\\\c\\nd",size="101-1000"'
+        name = "task_analyzer_stage_duration_seconds"
+        self.assertEqual(lines[:2], [
+            f"# HELP {name} Time spent in each stage of an API request.", f"# TYPE {name} histogram",
+        ])
+        buckets = [line for line in lines if line.startswith(f"{name}_bucket")]
+        self.assertEqual(len(buckets), len(DURATION_BUCKETS) + 1)
+        self.assertIn(f'{name}_bucket{{{labels},le="0.0025"}} 0', buckets)
+        self.assertIn(f'{name}_bucket{{{labels},le="0.005"}} 2', buckets)
+        self.assertEqual(buckets[-1], f'{name}_bucket{{{labels},le="+Inf"}} 2')
+        self.assertIn(f"{name}_sum{{{labels}}} 0.006", lines)
+        self.assertIn(f"{name}_count{{{labels}}} 2", lines)
+        self.assertIn(f'task_analyzer_stage_duration_quantile_seconds{{{labels},quantile="0.5"}} 0.00375', lines)
+        # Every sample line parses as labels and a value
+        for line in lines:
+            if not line.startswith("#"):
+                self.assertRegex(line, r'^\w+\{(\w+="([^"\\\n]|\\.)*",?)+\} \S+$')
+
+        metrics.clear()
+        self.assertNotIn('endpoint="analyze"', metrics.prometheus())
+
+    def test_quantiles(self):
+        histogram = DurationHistogram()
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        for _ in range(10):
+            histogram.observe(0.003)
+        # Interpolated inside the (0.0025, 0.005] bucket
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.00375)
+        self.assertAlmostEqual(histogram.quantile(0.99), 0.0025 + 0.0025 * 0.99)
+
+        histogram = DurationHistogram()
+        for _ in range(90):
+            histogram.observe(0.0001)
+        for _ in range(10):
+            histogram.observe(100.0)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.0001 * 50 / 90)
+        # Past the last bucket bound only the bound is known
+        self.assertEqual(histogram.quantile(0.95), DURATION_BUCKETS[-1])
+        self.assertEqual((histogram.count, histogram.sum), (100, 90 * 0.0001 + 1000.0))
+
+    def test_profile(self):
+        self.assertNotIn("X-Profile", self.post_analyze(RequestMetrics(), "&profile=1"))
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = RequestMetrics(profile_dir=directory)
+            self.assertNotIn("X-Profile", self.post_analyze(metrics))
+            self.assertEqual(os.listdir(directory), [])
+
+            response = self.post_analyze(metrics, "&profile=1")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(os.listdir(directory), [response["X-Profile"]])
+            self.assertTrue(response["X-Profile"].startswith("analyze-"))
+            stats = pstats.Stats(os.path.join(directory, response["X-Profile"]))
+            self.assertTrue(any(function == "rank" for _, _, function in stats.stats))
+
+
+class TopTasksTests(SimpleTestCase):
+    """A limited ranking must be the head of the full one, ties in the same order."""
+
+    def test_matches_full_sort(self):
+        rng = random.Random(73)
+        tasks = random_graph_tasks(rng, 200, 0.005, hours=(0, 1, 2))
+        for task in tasks:
+            # Few distinct values, so most scores tie
+            task["importance"] = rng.choice([3, 7])
+            task["due_date"] = rng.choice([None, BENCHMARK_TODAY, BENCHMARK_TODAY + timedelta(days=4)])
+        for batch in (False, True):
+            with mock.patch.object(batch_scoring, "is_available", return_value=batch and batch_scoring.is_available()), \
+                    mock.patch.object(batch_scoring, "BATCH_SCORING_MIN_TASKS", 0):
+                for name in STRATEGIES:
+                    ranking = [
+                        (r.position, r.score, r.explanation)
+                        for r in AnalyzeTasksUseCase().rank(tasks, name, today=BENCHMARK_TODAY)
+                    ]
+                    scores = [score for _, score, _ in ranking]
+                    self.assertGreater(len(scores), 3 * len(set(scores)), name)
+                    for limit in (1, 3, 10, 64, 199, 200, 500):
+                        top = AnalyzeTasksUseCase().rank(tasks, name, limit=limit, today=BENCHMARK_TODAY)
+                        self.assertEqual([(r.position, r.score, r.explanation) for r in top], ranking[:limit], (name, limit, batch))
+
+
+class TaskDictsTests(TestCase):
+    """Stored tasks must load as Task.to_dict() would, in two queries per chunk."""
+
+    def setUp(self):
+        rng = random.Random(79)
+        self.tasks = [
+            Task.objects.create(
+                title=f"Task {i}", estimated_hours=rng.choice([0.5, 2, 8]), importance=rng.randint(1, 10),
+                due_date=rng.choice([None, date(2026, 3, rng.randint(1, 31))]),
+            )
+            for i in range(25)
+        ]
+        for task in self.tasks:
+            task.dependencies.add(*rng.sample(self.tasks, rng.randint(0, 4)))
+
+    def expected(self, queryset):
+        return [{**task.to_dict(), "dependencies": sorted(task.to_dict()["dependencies"])} for task in queryset.order_by("pk")]
+
+    def load(self, queryset, chunk_size):
+        with CaptureQueriesContext(connection) as queries:
+            tasks = queryset.task_dicts(chunk_size=chunk_size)
+        return [{**task, "dependencies": sorted(task["dependencies"])} for task in tasks], len(queries)
+
+    def test_matches_to_dict(self):
+        expected = self.expected(Task.objects.all())
+        self.assertTrue(any(task["dependencies"] for task in expected))
+        # Two queries per chunk, and one more to find that no rows are left
+        for chunk_size, query_count in ((10, 7), (25, 3), (1000, 3), (1, 51)):
+            self.assertEqual(self.load(Task.objects, chunk_size), (expected, query_count), chunk_size)
+
+    def test_filtered(self):
+        queryset = Task.objects.filter(importance__gte=5)
+        self.assertEqual(self.load(queryset, 4)[0], self.expected(queryset))
+        self.assertEqual(self.load(Task.objects.none(), 4), ([], 0))
+
+
+class AnalysisCacheTests(SimpleTestCase):
+    """Analyze answers must come from the cache only for the same tasks, strategy and day."""
+
+    def setUp(self):
+        self.cache = AnalysisResultCache()
+        self.tasks = payload(clustered_tasks(30, seed=83, cluster_size=6))
+
+    def post(self, tasks, query="?strategy=smart_balance", **headers):
+        with mock.patch("tasks.views.get_analysis_cache", return_value=self.cache):
+            return self.client.post(f"/api/tasks/analyze/{query}", json.dumps(tasks), content_type="application/json", headers=headers)
+
+    def test_hit_and_etag(self):
+        first = self.post(self.tasks)
+        self.assertEqual((first.status_code, first["X-Cache"]), (200, "MISS"))
+        etag = first["ETag"]
+
+        second = self.post(self.tasks)
+        self.assertEqual((second["X-Cache"], second["ETag"], second.content), ("HIT", etag, first.content))
+        # Same payload with its keys in another order
+        reordered = [dict(reversed(list(task.items()))) for task in self.tasks]
+        self.assertEqual(self.post(reordered)["X-Cache"], "HIT")
+
+        for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            response = self.post(self.tasks, If_None_Match=if_none_match)
+            self.assertEqual((response.status_code, response.content, response["ETag"]), (304, b"", etag), if_none_match)
+        self.assertEqual(self.post(self.tasks, If_None_Match='"other"').status_code, 200)
+        # 304s are answered from the key alone
+        self.assertEqual(self.cache.stats()["hits"], 3)
+
+    def test_invalidation(self):
+        first = self.post(self.tasks)
+        changed = [dict(task) for task in self.tasks]
+        changed[4]["importance"] = 10 if changed[4]["importance"] != 10 else 1
+        etags = {first["ETag"]}
+        for response in (
+            self.post(changed),
+            self.post(self.tasks[::-1]),
+            self.post(self.tasks, "?strategy=fastest_wins"),
+            self.post(self.tasks, "?strategies=smart_balance,fastest_wins"),
+        ):
+            self.assertEqual(response["X-Cache"], "MISS")
+            etags.add(response["ETag"])
+        self.assertEqual(len(etags), 5)
+        self.assertEqual(self.post(changed, If_None_Match=first["ETag"]).status_code, 200)
+
+        # A new day gives new urgency scores
+        with mock.patch("tasks.views.date") as today:
+            today.today.return_value = date.today() + timedelta(days=1)
+            response = self.post(self.tasks)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+    def test_eviction(self):
+        cache = AnalysisResultCache(max_entries=2, max_bytes=10, ttl=60)
+        with mock.patch("tasks.services.result_cache.time.monotonic", return_value=1000.0) as monotonic:
+            cache.set("a", b"1234")
+            cache.set("b", b"1234")
+            self.assertEqual(cache.get("a"), b"1234")
+            cache.set("c", b"12")
+            # Least recently used first
+            self.assertEqual((cache.get("b"), cache.get("a"), cache.get("c")), (None, b"1234", b"12"))
+            cache.set("d", b"12345678")
+            self.assertEqual((cache.get("a"), cache.get("c"), cache.get("d")), (None, b"12", b"12345678"))
+            # Larger than max_bytes: not stored at all
+            cache.set("e", b"12345678901")
+            self.assertIsNone(cache.get("e"))
+            self.assertEqual(cache.stats()["bytes"], 10)
+
+            monotonic.return_value = 1061.0
+            self.assertEqual((cache.get("c"), cache.get("d")), (None, None))
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+    def test_backend(self):
+        from django.core.cache.backends.locmem import LocMemCache
+
+        backend = LocMemCache("analysis-test", {})
+        AnalysisResultCache(backend=backend).set("key", b"data")
+        other = AnalysisResultCache(backend=backend)
+        self.assertEqual(other.get("key"), b"data")
+        self.assertEqual((other.stats()["backend_hits"], other.stats()["entries"]), (1, 1))
+
+
+@override_settings(FAST_JSON_CODEC=False)
+class ScoredTaskRendererTests(SimpleTestCase):
+    """Records rendered straight to JSON must match their AnalysisResultSerializer dicts through JSONRenderer."""
+
+    def setUp(self):
+        tasks = payload(clustered_tasks(40, seed=89, cluster_size=8))
+        tasks[5]["dependencies"].append(tasks[5]["id"])
+        self.tasks = tasks + [
+            {"title": "No id \u00e9 \u2028 \"quoted\" \U0001f600", "estimated_hours": 0, "importance": 1},
+            {"id": None, "title": "Null id", "estimated_hours": 2.5, "importance": 3, "due_date": None},
+            {"id": 2 ** 70, "title": "Big", "estimated_hours": 1e-5, "importance": 2 ** 64, "due_date": ""},
+            {"id": 7, "title": 12, "estimated_hours": 2e17, "importance": 4, "due_date": date(2026, 1, 2)},
+        ]
+        self.records = AnalyzeTasksUseCase().rank(self.tasks, "smart_balance", today=BENCHMARK_TODAY)
+        self.assertTrue(any(record.has_cycle for record in self.records))
+
+    def data(self, records):
+        return AnalysisResultSerializer([record.as_dict() for record in records], many=True).data
+
+    def test_matches_serializer(self):
+        renderer = ScoredTaskJSONRenderer()
+        self.assertEqual(bytes(ScoredTaskJSONRenderer.render_records(self.records)), renderer.render(self.data(self.records)))
+
+        rankings = AnalyzeTasksUseCase().rank_many(self.tasks, list(STRATEGIES), today=BENCHMARK_TODAY)
+        self.assertEqual(
+            bytes(ScoredTaskJSONRenderer.render_rankings(rankings)),
+            renderer.render({name: self.data(records) for name, records in rankings.items()}),
+        )
+        fields = {"session": "s\u00e9", "task_count": len(self.tasks), "ratio": 0.5}
+        self.assertEqual(
+            bytes(ScoredTaskJSONRenderer.render_results(self.records[:5], **fields)),
+            renderer.render({**fields, "results": self.data(self.records[:5])}),
+        )
+        self.assertEqual(
+            bytes(ScoredTaskJSONRenderer.render_ranking_results(rankings, **fields)),
+            renderer.render({**fields, "rankings": {name: self.data(records) for name, records in rankings.items()}}),
+        )
+
+    def test_encoder_options(self):
+        data = self.data(self.records)
+        for ensure_ascii in (False, True):
+            for compact in (False, True):
+                encoder = ScoredTaskEncoder(ensure_ascii=ensure_ascii, compact=compact)
+                separators = (",", ":") if compact else (", ", ": ")
+                self.assertEqual(
+                    encoder.encode_list(self.records),
+                    json.dumps(data, ensure_ascii=ensure_ascii, separators=separators),
+                    (ensure_ascii, compact),
+                )
+
+
+class MultipleStrategiesTests(SimpleTestCase):
+    """?strategies= must answer {strategy: results}, each ranking as ?strategy= gives it."""
+
+    def setUp(self):
+        self.body = json.dumps(payload(clustered_tasks(50, seed=97, cluster_size=10)))
+
+    def post(self, query):
+        with mock.patch("tasks.views.get_analysis_cache", return_value=AnalysisResultCache()):
+            return self.client.post(f"/api/tasks/analyze/{query}", self.body, content_type="application/json")
+
+    def test_output_shape(self):
+        response = self.post("?strategies=critical_path, fastest_wins,critical_path,,smart_balance")
+        self.assertEqual(response.status_code, 200)
+        rankings = response.json()
+        # Names in request order, without duplicates or blanks
+        self.assertEqual(list(rankings), ["critical_path", "fastest_wins", "smart_balance"])
+        for name, results in rankings.items():
+            self.assertEqual(results, self.post(f"?strategy={name}").json(), name)
+
+        self.assertEqual(self.post("?strategies=high_impact").json(), {"high_impact": self.post("?strategy=high_impact").json()})
+        # ?strategies= wins over ?strategy=
+        self.assertEqual(list(self.post("?strategy=fastest_wins&strategies=deadline_driven").json()), ["deadline_driven"])
+
+    def test_invalid(self):
+        for query, error in (
+            ("?strategies=", "strategies must name at least one strategy"),
+            ("?strategies=,%20,", "strategies must name at least one strategy"),
+            ("?strategies=smart_balance,bogus", "Unknown strategy: bogus"),
+        ):
+            response = self.post(query)
+            self.assertEqual((response.status_code, response.json()), (400, {"error": error}), query)
+
+
+class BenchmarkGeneratorTests(SimpleTestCase):
+    """A workload must be the same task list for the same seed, on every run and machine."""
+
+    # sha256 prefixes of payload(workload(300, seed=5)) as JSON; a change makes old results incomparable
+    FINGERPRINTS = {
+        "chain": "488beff80d483043",
+        "fan": "89df1d3a0ffb12ba",
+        "cycles": "e8ecfeb5c0396343",
+        "mixed_dates": "0114b144ac3f8bd6",
+        "clusters": "bbc5d0050a46fd10",
+    }
+
+    def fingerprint(self, tasks):
+        return hashlib.sha256(json.dumps(payload(tasks)).encode()).hexdigest()[:16]
+
+    def test_deterministic(self):
+        self.assertEqual(set(WORKLOADS), set(self.FINGERPRINTS))
+        for name, workload in WORKLOADS.items():
+            tasks = workload(300, seed=5)
+            self.assertEqual(tasks, workload(300, seed=5), name)
+            self.assertEqual(self.fingerprint(tasks), self.FINGERPRINTS[name], name)
+            self.assertNotEqual(tasks, workload(300, seed=6), name)
+
+            ids = [task["id"] for task in tasks]
+            self.assertEqual(sorted(ids), list(range(1, 301)), name)
+            self.assertTrue(all(set(task["dependencies"]) <= set(ids) for task in tasks), name)
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+    """loadtest.py must send the same seeded request mix on every run and report it correctly."""
+
+    def generator(self, bodies, seed, requests=40):
+        import loadtest
+
+        return loadtest.LoadGenerator(
+            self.live_server_url, {"analyze": 3, "suggest": 1}, {"smart_balance": 2, "fastest_wins": 1}, [5, 20],
+            bodies, concurrency=1, duration=0, requests=requests, timeout=30, seed=seed,
+        )
+
+    def test_seeded_mix(self):
+        import loadtest
+
+        bodies = loadtest.RequestBodies("fan", [5, 20], seed=3, cached=False)
+        self.assertEqual(json.loads(bodies.body(5, 1)), [
+            {**payload(fan_tasks(5, seed=3))[0], "title": "Task 1 #1"}, *payload(fan_tasks(5, seed=3))[1:],
+        ])
+        self.assertNotEqual(bodies.body(20, 1), bodies.body(20, 2))
+        cached = loadtest.RequestBodies("fan", [1], seed=3, cached=True)
+        self.assertEqual(json.loads(cached.body(1, 7)), payload(fan_tasks(1, seed=3)))
+
+        runs = []
+        for _ in range(2):
+            load = self.generator(bodies, seed=11)
+            elapsed = load.run()
+            runs.append([sample[:4] for sample in load.samples])
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(len(runs[0]), 40)
+        self.assertEqual({status for *_, status in runs[0]}, {200})
+        self.assertEqual({endpoint for endpoint, *_ in runs[0]}, {"analyze", "suggest"})
+        other = self.generator(bodies, seed=12)
+        other.run()
+        self.assertNotEqual(runs[0], [sample[:4] for sample in other.samples])
+
+        result = loadtest.report(load.samples, elapsed)
+        self.assertEqual(result["overall"]["requests"], 40)
+        self.assertEqual(result["overall"]["error_rate"], 0.0)
+        self.assertEqual(sum(group["requests"] for group in result["groups"].values()), 40)
+
+    def test_summary_and_regressions(self):
+        import loadtest
+
+        self.assertEqual(loadtest.percentile([], 50), None)
+        values = [i / 100 for i in range(1, 101)]
+        self.assertEqual([loadtest.percentile(values, p) for p in (1, 50, 95, 99, 100)], [0.01, 0.5, 0.95, 0.99, 1.0])
+
+        samples = [("analyze", "smart_balance", 10, 200, 0.01 * i, None) for i in range(1, 10)]
+        samples.append(("suggest", "smart_balance", 10, None, 1.0, "ConnectionResetError"))
+        result = loadtest.report(samples, 2.0)
+        self.assertEqual(
+            {key: result["overall"][key] for key in ("requests", "throughput_rps", "error_rate", "errors", "p50_ms", "max_ms")},
+            {"requests": 10, "throughput_rps": 5.0, "error_rate": 0.1, "errors": {"ConnectionResetError": 1},
+             "p50_ms": 50.0, "max_ms": 1000.0},
+        )
+        self.assertEqual(list(result["groups"]), ["analyze/smart_balance/10", "suggest/smart_balance/10"])
+
+        self.assertEqual(loadtest.regressions(result, result, 0.1), [])
+        slower = loadtest.report([(*sample[:4], sample[4] * 1.5, sample[5]) for sample in samples], 2.5)
+        found = loadtest.regressions(result, slower, 0.1)
+        self.assertIn("overall: throughput 5.0 -> 4.0 req/s", found)
+        self.assertTrue(any(line.startswith("analyze/smart_balance/10: p95") for line in found))
+        self.assertEqual(loadtest.regressions(result, slower, 0.6), [])
@@ -1,9 +1,23 @@
 from django.urls import path
-from .views import AnalyzeTasksView, SuggestTasksView
+from .views import (
+    AnalyzeTasksView, SuggestTasksView, AnalysisCacheStatsView, MetricsView,
+    AnalysisSessionsView, AnalysisSessionView, ImportTasksView, WeightSensitivityView, ForecastTasksView,
+)
 from django.views.generic import TemplateView
+from .async_views import AsyncAnalyzeTasksView, AsyncSuggestTasksView
 
 urlpatterns = [
     path('', TemplateView.as_view(template_name='tasks/index.html'), name='index'),
     path('api/tasks/analyze/', AnalyzeTasksView.as_view(), name='analyze_tasks'),
+    path('api/tasks/analyze/cache/', AnalysisCacheStatsView.as_view(), name='analysis_cache_stats'),
     path('api/tasks/suggest/', SuggestTasksView.as_view(), name='suggest_tasks'),
+    path('api/tasks/forecast/', ForecastTasksView.as_view(), name='forecast_tasks'),
+    path('api/tasks/import/', ImportTasksView.as_view(), name='import_tasks'),
+    path('api/tasks/sensitivity/', WeightSensitivityView.as_view(), name='weight_sensitivity'),
+    path('api/tasks/sessions/', AnalysisSessionsView.as_view(), name='analysis_sessions'),
+    path('api/tasks/sessions/<str:session_id>/', AnalysisSessionView.as_view(), name='analysis_session'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    # Async variants, for ASGI servers: large payloads are scored in a process pool
+    path('api/async/tasks/analyze/', AsyncAnalyzeTasksView.as_view(), name='analyze_tasks_async'),
+    path('api/async/tasks/suggest/', AsyncSuggestTasksView.as_view(), name='suggest_tasks_async'),
 ]
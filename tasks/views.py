@@ -1,31 +1,330 @@
+from datetime import date
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .services.analyze_tasks import AnalyzeTasksUseCase, SuggestTasksUseCase
-from .serializers import TaskInputSerializer, AnalysisResultSerializer
+from .services.analyze_tasks import (
+    AnalyzeTasksUseCase, PlanTasksUseCase, SuggestTasksUseCase, DEFAULT_SUGGESTION_LIMIT, MAX_FORECAST_DAYS, STRATEGIES,
+)
+from .domain.scoring_config import PLANNER_MAX_HOURS
+from .services.analysis_sessions import get_session_store
+from .services.partitioned_analysis import get_component_partitioner
+from .services.request_metrics import NULL_TIMER, PROMETHEUS_CONTENT_TYPE, StageTimer, get_request_metrics
+from .services.result_cache import analysis_cache_key, etag_for, etag_matches, get_analysis_cache
+from .services.task_import import get_import_use_case
+from .services.task_scores import SuggestStoredTasksUseCase
+from .services.weight_sensitivity import NumPyUnavailable, get_sensitivity_use_case
+from .ndjson import NDJSON_CONTENT_TYPE, iter_ndjson_results, read_ndjson_tasks
+from .renderers import ScoredTaskJSONRenderer
+from .models import Task
+from .serializers import (
+    AnalysisResultSerializer, DailyPlanSerializer, SessionPatchSerializer, WeightSensitivitySerializer,
+    non_finite_hours_errors, task_list_validator,
+)
+
+def requested_strategies(query_params):
+    """
+    Strategy names asked for by ?strategy=name (default smart_balance) or
+    ?strategies=a,b,c, which returns every ranking at once keyed by strategy
+    name. Returns (names, True for ?strategies=); raises ValueError when invalid.
+    """
+    strategy_names = [query_params.get('strategy', 'smart_balance')]
+    strategies = query_params.get('strategies')
+    if strategies is not None:
+        strategy_names = list(dict.fromkeys(name.strip() for name in strategies.split(',') if name.strip()))
+        if not strategy_names:
+            raise ValueError("strategies must name at least one strategy")
+    for name in strategy_names:
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {name}")
+    return strategy_names, strategies is not None
+
+
+def requested_limit(query_params):
+    try:
+        limit = int(query_params.get('limit', DEFAULT_SUGGESTION_LIMIT))
+    except ValueError:
+        limit = -1
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return limit
+
+
+def requested_hours(query_params):
+    """The ?hours= budget of a suggest request, None without one; at most PLANNER_MAX_HOURS."""
+    if 'hours' not in query_params:
+        return None
+    try:
+        hours = float(query_params['hours'])
+    except ValueError:
+        hours = -1.0
+    if not 0 < hours < float('inf'):
+        raise ValueError("hours must be a positive number")
+    if hours > PLANNER_MAX_HOURS:
+        raise ValueError(f"hours must be at most {PLANNER_MAX_HOURS}")
+    return hours
+
+
+def requested_session_limit(query_params):
+    """The ?limit= of a session request; without one the whole ranking is returned."""
+    if 'limit' not in query_params:
+        return None
+    return requested_limit(query_params)
+
+
+def requested_forecast(query_params):
+    """(start, days) of a forecast request: ?start=YYYY-MM-DD (default today) and ?days=n (default 7)."""
+    try:
+        start = date.fromisoformat(query_params['start']) if 'start' in query_params else date.today()
+    except ValueError:
+        raise ValueError("start must be a date (YYYY-MM-DD)")
+    try:
+        days = int(query_params.get('days', 7))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= MAX_FORECAST_DAYS:
+        raise ValueError(f"days must be an integer between 1 and {MAX_FORECAST_DAYS}")
+    return start, days
+
+
+class StageTimingMixin:
+    """
+    Times the stages of every request with self.timer: the durations go out in a
+    Server-Timing header and into the histograms served by MetricsView.
+    ?profile=1 runs the request under cProfile when REQUEST_METRICS has a PROFILE_DIR.
+    """
+    metrics_endpoint = None
+    timer = NULL_TIMER
+
+    def dispatch(self, request, *args, **kwargs):
+        metrics = get_request_metrics()
+        if not metrics.enabled:
+            return super().dispatch(request, *args, **kwargs)
+
+        self.timer = timer = StageTimer(self.metrics_endpoint)
+        profile = None
+        with timer.stage('total'):
+            if metrics.wants_profile(request):
+                response, profile = metrics.run_profiled(
+                    self.metrics_endpoint, super().dispatch, request, *args, **kwargs
+                )
+            else:
+                response = super().dispatch(request, *args, **kwargs)
+
+        response['Server-Timing'] = timer.server_timing()
+        if profile is not None:
+            response['X-Profile'] = profile
+        metrics.record(timer)
+        return response
+
+    def request_data(self, request):
+        with self.timer.stage('parse'):
+            return request.data
+
+    def validated_tasks(self, request):
+        """Parses and validates the task list body; returns (serializer, is_valid)."""
+        data = self.request_data(request)
+        with self.timer.stage('validate'):
+            serializer = task_list_validator(data)
+            return serializer, serializer.is_valid()
+
+
+class AnalyzeTasksView(StageTimingMixin, APIView):
+    # Results are rendered straight from the scored records, not through AnalysisResultSerializer
+    renderer_classes = [ScoredTaskJSONRenderer, BrowsableAPIRenderer]
+    metrics_endpoint = 'analyze'
 
-class AnalyzeTasksView(APIView):
     def post(self, request):
+        if request.content_type.startswith(NDJSON_CONTENT_TYPE):
+            return self._post_ndjson(request)
+
         # 1. Validate Input
-        serializer = TaskInputSerializer(data=request.data, many=True)
-        if not serializer.is_valid():
+        serializer, valid = self.validated_tasks(request)
+        if not valid:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         tasks_data = serializer.validated_data
+        try:
+            strategy_names, multiple = requested_strategies(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        strategy = strategy_names[0]
+        # In one order, so that a set of strategies makes one metrics series
+        self.timer.label(strategy=','.join(sorted(strategy_names)), task_count=len(tasks_data))
+
+        # 2. Same tasks, strategy and day give the same result: answer from cache when possible
+        today = date.today()
+        with self.timer.stage('cache'):
+            cache_key = analysis_cache_key(
+                tasks_data, strategy_names if multiple else strategy, None, today
+            )
+            etag = etag_for(cache_key)
+            if etag_matches(request.headers.get('If-None-Match'), etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+            cache = get_analysis_cache()
+            data = cache.get(cache_key)
+        cache_status = 'HIT'
+        if data is None:
+            cache_status = 'MISS'
+            # 3. Execute Use Case
+            use_case = AnalyzeTasksUseCase(partitioner=get_component_partitioner())
+            try:
+                if not multiple:
+                    results = use_case.rank(tasks_data, strategy_name=strategy, today=today, timer=self.timer)
+                else:
+                    # One dependency index, cycle check and date parse shared by all strategies
+                    rankings = use_case.rank_many(tasks_data, strategy_names, today=today, timer=self.timer)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                
+            # 4. Render Output
+            with self.timer.stage('render'):
+                if not multiple:
+                    data = ScoredTaskJSONRenderer.render_records(results)
+                else:
+                    data = ScoredTaskJSONRenderer.render_rankings(rankings)
+            cache.set(cache_key, data)
+
+        return Response(data, headers={'ETag': etag, 'X-Cache': cache_status})
+
+    def _post_ndjson(self, request):
+        # One task per line in, one result per line out; tasks are held as compact columns only
         strategy = request.query_params.get('strategy', 'smart_balance')
-        
-        # 2. Execute Use Case
-        use_case = AnalyzeTasksUseCase()
+        if strategy not in STRATEGIES:
+            return Response({"error": f"Unknown strategy: {strategy}"}, status=status.HTTP_400_BAD_REQUEST)
+        if 'strategies' in request.query_params:
+            return Response({"error": "strategies is not supported for NDJSON input"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Results are rendered while streaming, after the Server-Timing header is sent
+        with self.timer.stage('parse'):
+            tasks, errors = read_ndjson_tasks(request.stream or [])
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        self.timer.label(strategy=strategy, task_count=len(tasks))
+
+        results = AnalyzeTasksUseCase().rank(tasks, strategy_name=strategy, timer=self.timer)
+        return StreamingHttpResponse(
+            iter_ndjson_results(results), content_type=NDJSON_CONTENT_TYPE
+        )
+
+class ForecastTasksView(StageTimingMixin, APIView):
+    """
+    Ranks a task list on every day of a date range (?start=, ?days=, ?strategy=,
+    ?limit= per day) and lists the tasks whose priority level rises to Medium or
+    High within it, with the day they do.
+    """
+    renderer_classes = [ScoredTaskJSONRenderer, BrowsableAPIRenderer]
+    metrics_endpoint = 'forecast'
+
+    def post(self, request):
+        strategy = request.query_params.get('strategy', 'smart_balance')
+        try:
+            if strategy not in STRATEGIES:
+                raise ValueError(f"Unknown strategy: {strategy}")
+            start, days = requested_forecast(request.query_params)
+            limit = requested_session_limit(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Labels only ever hold known strategy names: every label value is a metrics series
+        self.timer.label(strategy=strategy)
+
+        serializer, valid = self.validated_tasks(request)
+        if not valid:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        tasks = serializer.validated_data
+        self.timer.label(task_count=len(tasks))
+
+        try:
+            forecast = AnalyzeTasksUseCase().forecast(
+                tasks, strategy_name=strategy, start=start, days=days, limit=limit, timer=self.timer
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with self.timer.stage('render'):
+            data = ScoredTaskJSONRenderer.render_ranking_results(
+                forecast['rankings'],
+                strategy=strategy, start=start.isoformat(), days=days, crossings=forecast['crossings'],
+            )
+        return Response(data)
+
+class ImportTasksView(StageTimingMixin, APIView):
+    """
+    Stores a task list (JSON array, or NDJSON with Content-Type application/x-ndjson)
+    as Task rows in one transaction. Task ids and dependencies in the body are the
+    client's own; the response maps them, in list order, to the new database ids.
+    """
+    metrics_endpoint = 'import'
+
+    def post(self, request):
+        if request.content_type.startswith(NDJSON_CONTENT_TYPE):
+            with self.timer.stage('parse'):
+                tasks, errors = read_ndjson_tasks(request.stream or [])
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            serializer, valid = self.validated_tasks(request)
+            if not valid:
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            tasks = serializer.validated_data
+            # Rejected like NDJSON lines: NaN cannot be stored, infinite hours break plans
+            errors = non_finite_hours_errors(tasks)
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        self.timer.label(task_count=len(tasks))
+
+        try:
+            ids = get_import_use_case().execute(tasks, timer=self.timer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"created": len(ids), "ids": ids}, status=status.HTTP_201_CREATED)
+
+class WeightSensitivityView(StageTimingMixin, APIView):
+    """
+    Ranks one task list under many SmartBalance weightings (WeightSensitivitySerializer)
+    and answers how stable the ranking is: per weighting its top k and Kendall tau
+    against the reference weights, per contending task how often it makes the top k.
+    """
+    metrics_endpoint = 'sensitivity'
+
+    def post(self, request):
+        data = self.request_data(request)
+        with self.timer.stage('validate'):
+            serializer = WeightSensitivitySerializer(data=data)
+            valid = serializer.is_valid()
+        if not valid:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        body = serializer.validated_data
+        self.timer.label(strategy='smart_balance', task_count=len(body['tasks']))
+
         try:
-            results = use_case.execute(tasks_data, strategy_name=strategy)
+            results = get_sensitivity_use_case().execute(
+                body['tasks'], body['weights'], grid=body.get('grid'), reference=body.get('reference'),
+                top_k=body['top_k'], timer=self.timer,
+            )
+        except NumPyUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-            
-        # 3. Serialize Output
-        output_serializer = AnalysisResultSerializer(results, many=True)
-        return Response(output_serializer.data)
+        return Response(results)
+
+class AnalysisCacheStatsView(APIView):
+    def get(self, request):
+        return Response(get_analysis_cache().stats())
+
+class MetricsView(APIView):
+    def get(self, request):
+        # Prometheus text exposition format
+        return HttpResponse(get_request_metrics().prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+class SuggestTasksView(StageTimingMixin, APIView):
+    renderer_classes = [ScoredTaskJSONRenderer, BrowsableAPIRenderer]
+    metrics_endpoint = 'suggest'
 
-class SuggestTasksView(APIView):
     def post(self, request):
         # Using POST to accept a list of tasks to analyze on the fly, 
         # or we could make it GET and read from DB. 
@@ -33,21 +332,144 @@ class SuggestTasksView(APIView):
         # It implies it might work on stored tasks, but the analyze endpoint works on input.
         # Let's support both: if body has tasks, use them. If not, use DB.
         
-        tasks_data = []
-        if request.data:
-            serializer = TaskInputSerializer(data=request.data, many=True)
-            if not serializer.is_valid():
+        try:
+            limit = requested_limit(request.query_params)
+            hours = requested_hours(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        self.timer.label(strategy='smart_balance')
+        if hours is not None:
+            return self._post_plan(request, hours)
+
+        if self.request_data(request):
+            serializer, valid = self.validated_tasks(request)
+            if not valid:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            tasks_data = serializer.validated_data
+            self.timer.label(task_count=len(serializer.validated_data))
+            use_case = SuggestTasksUseCase(partitioner=get_component_partitioner())
+            records = use_case.rank(serializer.validated_data, limit=limit, timer=self.timer)
+            with self.timer.stage('render'):
+                return Response(ScoredTaskJSONRenderer.render_records(records))
         else:
-            # Fetch from DB
-            from .models import Task
-            db_tasks = Task.objects.all()
-            # Convert to dicts
-            tasks_data = [t.to_dict() for t in db_tasks]
-
-        use_case = SuggestTasksUseCase()
-        results = use_case.execute(tasks_data)
+            # Stored tasks: indexed ORDER BY score LIMIT k over the materialized TaskScore table
+            use_case = SuggestStoredTasksUseCase()
+            with self.timer.stage('query'):
+                results = use_case.execute(limit=limit)
         
-        output_serializer = AnalysisResultSerializer(results, many=True)
-        return Response(output_serializer.data)
+        with self.timer.stage('serialize'):
+            output_serializer = AnalysisResultSerializer(results, many=True)
+            return Response(output_serializer.data)
+
+    def _post_plan(self, request, hours):
+        # ?hours=h: the best scoring set of tasks that fits in h hours, dependencies included
+        if self.request_data(request):
+            serializer, valid = self.validated_tasks(request)
+            if not valid:
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            tasks = serializer.validated_data
+        else:
+            with self.timer.stage('query'):
+                tasks = Task.objects.task_dicts()
+        self.timer.label(task_count=len(tasks))
+
+        plan = PlanTasksUseCase().execute(tasks, hours, timer=self.timer)
+        with self.timer.stage('serialize'):
+            return Response(DailyPlanSerializer(plan).data)
+
+class SessionResponseMixin:
+    renderer_classes = [ScoredTaskJSONRenderer, BrowsableAPIRenderer]
+    metrics_endpoint = 'session'
+
+    def session_response(self, stored, limit, status=status.HTTP_200_OK, headers=None):
+        # Call with stored.lock held: the records are the session's own
+        session = stored.session
+        self.timer.label(strategy=stored.strategy_name, task_count=len(session))
+        with self.timer.stage('render'):
+            data = ScoredTaskJSONRenderer.render_results(
+                session.ranked(limit),
+                session=stored.session_id, strategy=stored.strategy_name, task_count=len(session),
+            )
+        return Response(data, status=status, headers=headers)
+
+class AnalysisSessionsView(SessionResponseMixin, StageTimingMixin, APIView):
+    """
+    POST a task list to open an analysis session; its ranking comes back with the
+    session id. Patches to /api/tasks/sessions/<id>/ then only rescore what they touch.
+    GET returns the session store counters.
+    """
+
+    def get(self, request):
+        return Response(get_session_store().stats())
+
+    def post(self, request):
+        serializer, valid = self.validated_tasks(request)
+        if not valid:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # A session renders its tasks again on every request: NaN hours would break them all
+        errors = non_finite_hours_errors(serializer.validated_data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = requested_session_limit(request.query_params)
+            stored = get_session_store().create(
+                serializer.validated_data, request.query_params.get('strategy', 'smart_balance'), timer=self.timer
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        location = reverse('analysis_session', args=[stored.session_id])
+        with stored.lock:
+            return self.session_response(stored, limit, status=status.HTTP_201_CREATED, headers={'Location': location})
+
+class AnalysisSessionView(SessionResponseMixin, StageTimingMixin, APIView):
+    """
+    GET the current ranking of a session, PATCH it with task and dependency
+    changes (SessionPatchSerializer) to get the new ranking, DELETE it when done.
+    """
+
+    def get(self, request, session_id):
+        try:
+            limit = requested_session_limit(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        stored = get_session_store().get(session_id)
+        if stored is None:
+            return self._not_found()
+
+        with stored.lock:
+            with self.timer.stage('session'):
+                stored.session.refresh(date.today())
+            return self.session_response(stored, limit)
+
+    def patch(self, request, session_id):
+        try:
+            limit = requested_session_limit(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        store = get_session_store()
+        stored = store.get(session_id)
+        if stored is None:
+            return self._not_found()
+
+        data = self.request_data(request)
+        with stored.lock:
+            with self.timer.stage('validate'):
+                serializer = SessionPatchSerializer(data=data, context={'tasks': stored.session.tasks})
+                valid = serializer.is_valid()
+            if not valid:
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                store.patch(stored, serializer.validated_data, timer=self.timer)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return self.session_response(stored, limit)
+
+    def delete(self, request, session_id):
+        if not get_session_store().delete(session_id):
+            return self._not_found()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _not_found(self):
+        return Response({"error": "Unknown or expired session"}, status=status.HTTP_404_NOT_FOUND)
+